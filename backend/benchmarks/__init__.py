@@ -0,0 +1,6 @@
+# Benchmarks are run from the backend directory, e.g. `python -m benchmarks.cache_codec`
+# They import the application modules, so provide the settings a local run needs
+import os
+
+os.environ.setdefault("REDIS_CONNECTION_URL", "redis://localhost:6379")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "molyneux_backend.settings")
@@ -0,0 +1,81 @@
+"""
+Size and speed of every cache codec on realistic search results.
+
+Usage (from the backend directory):
+    python -m benchmarks.cache_codec [--items 1000] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from utils import codec
+
+from .payloads import ITEM_FACTORIES, fake_items
+
+
+# Median duration of `repeat` calls in milliseconds, and the last result
+def measure(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started_at)
+    return statistics.median(durations) * 1000, result
+
+
+# Encode and decode the cached value of a search the way the cache service does
+def benchmark_codecs(search_type: str, count: int, repeat: int):
+    value = fake_items(search_type, count)
+    raw_size = len(json.dumps(value).encode())
+    results = []
+    for codec_name in codec.CODECS:
+        encode_ms, payload = measure(
+            lambda: codec.encode(json.dumps(value).encode(), codec_name), repeat
+        )
+        decode_ms, _ = measure(lambda: json.loads(codec.decode(payload)), repeat)
+        results.append(
+            {
+                "search_type": search_type,
+                "items": count,
+                "codec": codec_name,
+                "bytes": len(payload),
+                "ratio": round(raw_size / len(payload), 2),
+                "encode_ms": round(encode_ms, 3),
+                "decode_ms": round(decode_ms, 3),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    results = [
+        result
+        for search_type in ITEM_FACTORIES
+        for result in benchmark_codecs(search_type, args.items, args.repeat)
+    ]
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(
+        f"{'type':<6}{'codec':<8}{'bytes':>12}{'ratio':>8}"
+        f"{'encode ms':>12}{'decode ms':>12}"
+    )
+    for result in results:
+        print(
+            f"{result['search_type']:<6}{result['codec']:<8}{result['bytes']:>12}"
+            f"{result['ratio']:>8}{result['encode_ms']:>12}{result['decode_ms']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
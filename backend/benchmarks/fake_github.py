@@ -0,0 +1,211 @@
+"""
+Local stand-in for the GitHub search API, for offline benchmarks and load tests.
+
+Usage (from the backend directory):
+    python -m benchmarks.fake_github [--port 8765] [--latency-ms 50] [--total-count 1000]
+                                     [--rate-limit 30] [--rate-limited-share 0.01]
+
+Point the backend at it with GITHUB_API_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+from .payloads import fake_search_page
+
+SEARCH_PATHS = {
+    "/search/users": "user",
+    "/search/repositories": "repo",
+    "/search/issues": "issue",
+}
+
+
+class FakeGitHubConfig(NamedTuple):
+    latency_ms: float = 0  # Added to every response
+    latency_jitter_ms: float = 0  # Spread of the latency, uniform
+    total_count: int = 1000  # Results of every search
+    # Primary rate limit: requests per window (0 for none), answered 403 past it
+    rate_limit: int = 0
+    rate_limit_window: int = 60  # Seconds
+    # Share of the requests answered 403 with Retry-After (secondary rate limit)
+    rate_limited_share: float = 0
+    retry_after: int = 1  # Seconds, sent with the secondary rate limit
+    seed: int = 0
+
+
+# Serialized search page and its ETag, every search gets the same pages so that
+# generating them doesn't weigh on the measures
+@lru_cache(maxsize=256)
+def search_page_body(
+    search_type: str, page: int, per_page: int, total_count: int, seed: int
+):
+    body = json.dumps(
+        fake_search_page(search_type, page, total_count, per_page, seed)
+    ).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeGitHubConfig):
+        super().__init__(address, FakeGitHubHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.window_reset = 0  # Epoch seconds
+        self.window_used = 0
+        self.responses: Dict[int, int] = {}  # Count by status
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Count a request against the primary rate limit
+    # Returns whether it is allowed, and the rate limit headers of the response
+    def take_budget(self):
+        config = self.config
+        now = time.time()
+        with self.lock:
+            if now >= self.window_reset:
+                self.window_reset = int(now) + config.rate_limit_window
+                self.window_used = 0
+            allowed = not config.rate_limit or self.window_used < config.rate_limit
+            if allowed:
+                self.window_used += 1
+            limit = config.rate_limit or 1000000
+            headers = {
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": str(max(limit - self.window_used, 0)),
+                "X-RateLimit-Reset": str(self.window_reset),
+                "X-RateLimit-Used": str(self.window_used),
+                "X-RateLimit-Resource": "search",
+            }
+        return allowed, headers
+
+    def latency(self):
+        config = self.config
+        with self.lock:
+            jitter = self.rng.uniform(-1, 1) * config.latency_jitter_ms
+        return max(config.latency_ms + jitter, 0) / 1000
+
+    def is_secondary_rate_limited(self):
+        with self.lock:
+            return self.rng.random() < self.config.rate_limited_share
+
+    def count(self, status: int):
+        with self.lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server: FakeGitHubServer
+    protocol_version = "HTTP/1.1"  # Keep-alive, like api.github.com
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        search_type = SEARCH_PATHS.get(url.path)
+        if search_type is None:
+            return self.respond(404, {"message": "Not Found"})
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if not query.get("q"):
+            return self.respond(422, {"message": "Validation Failed"})
+
+        time.sleep(self.server.latency())
+        if self.server.is_secondary_rate_limited():
+            return self.respond(
+                403,
+                {"message": "You have exceeded a secondary rate limit."},
+                {"Retry-After": str(self.server.config.retry_after)},
+            )
+        allowed, headers = self.server.take_budget()
+        if not allowed:
+            return self.respond(
+                403, {"message": "API rate limit exceeded for 127.0.0.1."}, headers
+            )
+
+        per_page = min(int(query.get("per_page", 30)), 100)
+        page = int(query.get("page", 1))
+        body, etag = search_page_body(
+            search_type,
+            page,
+            per_page,
+            self.server.config.total_count,
+            self.server.config.seed,
+        )
+        headers["ETag"] = etag
+        if self.headers.get("If-None-Match") == etag:
+            return self.respond(304, None, headers)
+        self.respond(200, body, headers)
+
+    def respond(self, status: int, body, headers=None):
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+        self.server.count(status)
+
+    def log_message(self, format, *args):  # Requests would drown the measures
+        pass
+
+
+# Serve the fake GitHub API in a background thread, yields the server
+@contextmanager
+def run_fake_github(config: FakeGitHubConfig = FakeGitHubConfig(), port: int = 0):
+    server = FakeGitHubServer(("127.0.0.1", port), config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--total-count", type=int, default=1000)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-limit-window", type=int, default=60)
+    parser.add_argument("--rate-limited-share", type=float, default=0)
+    args = parser.parse_args()
+
+    config = FakeGitHubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        total_count=args.total_count,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        rate_limited_share=args.rate_limited_share,
+    )
+    with run_fake_github(config, args.port) as server:
+        print(f"Fake GitHub search API on {server.url}, Ctrl+C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        print(f"Responses by status: {server.responses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Load test of the search API at a realistic query mix, against a local fake GitHub API.
+
+Concurrent clients send searches whose keywords follow a Zipf popularity (a few
+keywords make most searches), with an occasional cache clear. The report has the
+throughput, latency percentiles by endpoint, statuses, the cache hit ratio by tier
+(from GET /metrics) and the GitHub calls per search. Needs the Redis server of
+REDIS_CONNECTION_URL.
+
+Usage (from the backend directory):
+    python -m benchmarks.load [--clients 16] [--duration 30] [--keywords 1000]
+                              [--zipf 1.1] [--types user,repo,issue]
+                              [--clear-share 0.001] [--latency-ms 50] [--json]
+
+The app is served in-process by default. To load a running server instead, start the
+fake API (`python -m benchmarks.fake_github --port 8765`), run the server with
+GITHUB_API_URL=http://127.0.0.1:8765, and pass `--target http://host:port
+--fake-github-port 8765` so the same fake API is used.
+"""
+
+import argparse
+import bisect
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, NamedTuple
+from unittest.mock import patch
+
+import requests
+
+from github.service import GitHubSearchService
+
+from .fake_github import FakeGitHubConfig, run_fake_github
+from .search import percentile
+
+SEARCH_TYPES = ("user", "repo", "issue")
+LOOKUP_SAMPLE = re.compile(
+    r'^github_search_cache_lookups_total\{outcome="(\w+)",tier="(\w+)"\} (\S+)$',
+    re.MULTILINE,
+)
+
+
+class Sample(NamedTuple):
+    endpoint: str  # search or clear-cache
+    status: int  # 0 when the request failed
+    seconds: float
+
+
+class ZipfKeywords:
+    # Keywords by popularity: the keyword of rank r is searched in proportion to
+    # 1 / r^exponent
+    def __init__(self, count: int, exponent: float):
+        self.keywords = [f"load {rank}" for rank in range(1, count + 1)]
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, count + 1):
+            total += 1 / rank**exponent
+            self.cumulative.append(total)
+
+    def pick(self, rng: random.Random) -> str:
+        index = bisect.bisect_left(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.keywords[min(index, len(self.keywords) - 1)]
+
+
+# Serve the app in a background thread, yields its URL
+@contextmanager
+def run_app():
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):  # Requests would drown the report
+            pass
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Cache lookups counted by every worker so far, by (tier, outcome)
+def cache_lookups(target: str) -> Counter:
+    response = requests.get(f"{target}/metrics", timeout=10)
+    response.raise_for_status()
+    return Counter(
+        {
+            (tier, outcome): float(value)
+            for outcome, tier, value in LOOKUP_SAMPLE.findall(response.text)
+        }
+    )
+
+
+# Send requests until the deadline, appending one sample per request
+def client(target, keywords, types, clear_share, deadline, rng, samples: List[Sample]):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        if rng.random() < clear_share:
+            endpoint, url, params = "clear-cache", f"{target}/api/clear-cache", None
+        else:
+            endpoint, url = "search", f"{target}/api/search"
+            params = {"type": rng.choice(types), "keyword": keywords.pick(rng)}
+        started = time.perf_counter()
+        try:
+            # Query strings are canonical (type then keyword), no redirect to follow
+            status = session.get(url, params=params, timeout=60).status_code
+        except requests.RequestException:
+            status = 0
+        samples.append(Sample(endpoint, status, time.perf_counter() - started))
+
+
+def summarize(samples: List[Sample]):
+    durations = [sample.seconds for sample in samples]
+    return {
+        "requests": len(samples),
+        "p50_ms": round(statistics.median(durations) * 1000, 3),
+        "p90_ms": round(percentile(durations, 0.9) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3),
+    }
+
+
+def run_load(args, target: str, fake_server):
+    keywords = ZipfKeywords(args.keywords, args.zipf)
+    types = args.types.split(",")
+    lookups_before = cache_lookups(target)
+    upstream_before = Counter(fake_server.responses)
+
+    samples: List[Sample] = []  # list.append is atomic, clients share the list
+    deadline = time.monotonic() + args.duration
+    clients = [
+        threading.Thread(
+            target=client,
+            args=(
+                target,
+                keywords,
+                types,
+                args.clear_share,
+                deadline,
+                random.Random(args.seed + index),
+                samples,
+            ),
+        )
+        for index in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    lookups = cache_lookups(target)
+    lookups.subtract(lookups_before)
+    # A search looks in L1 first (when enabled) and in Redis when L1 misses
+    hits = sum(count for (_, outcome), count in lookups.items() if outcome != "miss")
+    searched = hits + lookups[("redis", "miss")]
+    upstream = Counter(fake_server.responses)
+    upstream.subtract(upstream_before)
+    upstream_calls = sum(upstream.values())
+    searches = [sample for sample in samples if sample.endpoint == "search"]
+
+    return {
+        "settings": {key: value for key, value in vars(args).items() if key != "json"},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "statuses": dict(Counter(str(sample.status) for sample in samples)),
+        "latency": {
+            endpoint: summarize(
+                [sample for sample in samples if sample.endpoint == endpoint]
+            )
+            for endpoint in ("search", "clear-cache")
+            if any(sample.endpoint == endpoint for sample in samples)
+        },
+        "cache_lookups": {
+            f"{tier}_{outcome}": int(count)
+            for (tier, outcome), count in lookups.items()
+        },
+        "cache_hit_ratio": round(hits / (searched or 1), 4),
+        "upstream_calls": upstream_calls,
+        "upstream_calls_per_search": round(upstream_calls / (len(searches) or 1), 4),
+        "upstream_statuses": {
+            str(status): count for status, count in upstream.items() if count
+        },
+    }
+
+
+@contextmanager
+def run_target(args, fake_server):
+    if args.target:
+        yield args.target.rstrip("/")
+        return
+    # The in-process app calls the fake API
+    with patch.object(GitHubSearchService, "BASE_API", fake_server.url):
+        with run_app() as target:
+            yield target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", help="URL of a running server, else in-process")
+    parser.add_argument("--fake-github-port", type=int, default=0)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--keywords", type=int, default=1000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--types", default=",".join(SEARCH_TYPES))
+    parser.add_argument("--clear-share", type=float, default=0.001)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=10)
+    parser.add_argument("--total-count", type=int, default=300)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+    for search_type in args.types.split(","):
+        if search_type not in SEARCH_TYPES:
+            parser.error(f"Unknown search type {search_type}")
+
+    fake_config = FakeGitHubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        total_count=args.total_count,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    with run_fake_github(fake_config, args.fake_github_port) as fake_server:
+        with run_target(args, fake_server) as target:
+            report = run_load(args, target, fake_server)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['throughput_rps']} requests/s over {report['elapsed_s']} s")
+    print(f"Statuses: {report['statuses']}")
+    print(f"{'endpoint':<14}{'requests':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for endpoint, latency in report["latency"].items():
+        print(
+            f"{endpoint:<14}{latency['requests']:>10}{latency['p50_ms']:>10}"
+            f"{latency['p90_ms']:>10}{latency['p99_ms']:>10}"
+        )
+    print(f"Cache hit ratio: {report['cache_hit_ratio']} {report['cache_lookups']}")
+    print(
+        f"GitHub calls: {report['upstream_calls']} "
+        f"({report['upstream_calls_per_search']} per search)"
+    )
+
+
+if __name__ == "__main__":
+    main()
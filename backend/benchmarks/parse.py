@@ -0,0 +1,87 @@
+"""
+Parsing speed of GitHub search responses: legacy model path vs the parse pipeline.
+
+Usage (from the backend directory):
+    python -m benchmarks.parse [--pages 10] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+
+from github.parsers import get_parser
+from github.schemas import (
+    FIELD_PROFILES,
+    FieldProfile,
+    GitHubSearchResponse,
+    SearchType,
+)
+
+from .cache_codec import measure
+from .payloads import fake_search_page
+
+SEARCH_TYPES = {
+    "user": SearchType.USER,
+    "repo": SearchType.REPO,
+}
+
+
+# Path used before the parse pipeline: json.loads, sniffing model, dump back to dicts
+def legacy_parse(raw: bytes):
+    return GitHubSearchResponse(**json.loads(raw)).model_dump(mode="json")["items"]
+
+
+# Parse `pages` raw search pages of the given search type with every parse path
+def benchmark_parsers(search_type: str, pages: int, repeat: int):
+    raw_pages = [
+        json.dumps(fake_search_page(search_type, page, pages * 100)).encode()
+        for page in range(1, pages + 1)
+    ]
+    parser = get_parser(SEARCH_TYPES[search_type])
+    card = FIELD_PROFILES[FieldProfile.CARD][SEARCH_TYPES[search_type]]
+    paths = {
+        "legacy": legacy_parse,
+        "parse": lambda raw: parser.parse(raw).items,
+        "parse+card": lambda raw: parser.parse(raw, card).items,
+    }
+    results = []
+    for path, parse in paths.items():
+        duration_ms, _ = measure(lambda: [parse(raw) for raw in raw_pages], repeat)
+        results.append(
+            {
+                "search_type": search_type,
+                "items": pages * 100,
+                "path": path,
+                "ms": round(duration_ms, 3),
+                "us_per_item": round(duration_ms * 1000 / (pages * 100), 3),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    results = [
+        result
+        for search_type in SEARCH_TYPES
+        for result in benchmark_parsers(search_type, args.pages, args.repeat)
+    ]
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'type':<6}{'path':<14}{'ms':>12}{'us/item':>12}")
+    for result in results:
+        print(
+            f"{result['search_type']:<6}{result['path']:<14}"
+            f"{result['ms']:>12}{result['us_per_item']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+API = "https://api.github.com"
+WEB = "https://github.com"
+
+WORDS = [
+    "django", "react", "api", "client", "server", "async", "cache", "redis",
+    "search", "graph", "python", "rust", "kit", "tools", "web", "cli", "core",
+    "data", "stream", "auth", "ui", "lib", "engine", "proxy", "parser", "sdk",
+]  # fmt: skip
+LANGUAGES = [
+    "Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C++", None,
+]  # fmt: skip
+LICENSES = [
+    ("mit", "MIT License", "MIT"),
+    ("apache-2.0", "Apache License 2.0", "Apache-2.0"),
+    ("bsd-3-clause", 'BSD 3-Clause "New" or "Revised" License', "BSD-3-Clause"),
+]
+EPOCH = datetime(2012, 1, 1, tzinfo=timezone.utc)
+
+
+def _timestamp(rng: random.Random):
+    moment = EPOCH + timedelta(seconds=rng.randint(0, 12 * 365 * 24 * 3600))
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _node_id(rng: random.Random):
+    return "".join(
+        rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnop0123456789", k=16)
+    )
+
+
+# A search result item of /search/users, shaped like the GitHub API response
+def fake_user(rng: random.Random, index: int):
+    login = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}{index}"
+    url = f"{API}/users/{login}"
+    return {
+        "login": login,
+        "id": 1000 + index,
+        "node_id": _node_id(rng),
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{1000 + index}?v=4",
+        "gravatar_id": "",
+        "url": url,
+        "html_url": f"{WEB}/{login}",
+        "followers_url": f"{url}/followers",
+        "following_url": f"{url}/following{{/other_user}}",
+        "gists_url": f"{url}/gists{{/gist_id}}",
+        "starred_url": f"{url}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"{url}/subscriptions",
+        "organizations_url": f"{url}/orgs",
+        "repos_url": f"{url}/repos",
+        "events_url": f"{url}/events{{/privacy}}",
+        "received_events_url": f"{url}/received_events",
+        "type": rng.choice(["User", "Organization"]),
+        "site_admin": False,
+        "score": 1.0,
+    }
+
+
+# A search result item of /search/repositories, shaped like the GitHub API response
+def fake_repository(rng: random.Random, index: int):
+    owner = fake_user(rng, index)
+    name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}"
+    full_name = f"{owner['login']}/{name}"
+    url = f"{API}/repos/{full_name}"
+    stars = int(rng.paretovariate(1.2) * 10)
+    license_key, license_name, spdx_id = rng.choice(LICENSES)
+    return {
+        "id": 100000 + index,
+        "node_id": _node_id(rng),
+        "name": name,
+        "full_name": full_name,
+        "private": False,
+        "owner": owner,
+        "html_url": f"{WEB}/{full_name}",
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(3, 15))),
+        "fork": rng.random() < 0.1,
+        "url": url,
+        "forks_url": f"{url}/forks",
+        "keys_url": f"{url}/keys{{/key_id}}",
+        "collaborators_url": f"{url}/collaborators{{/collaborator}}",
+        "teams_url": f"{url}/teams",
+        "hooks_url": f"{url}/hooks",
+        "issue_events_url": f"{url}/issues/events{{/number}}",
+        "events_url": f"{url}/events",
+        "assignees_url": f"{url}/assignees{{/user}}",
+        "branches_url": f"{url}/branches{{/branch}}",
+        "tags_url": f"{url}/tags",
+        "blobs_url": f"{url}/git/blobs{{/sha}}",
+        "git_tags_url": f"{url}/git/tags{{/sha}}",
+        "git_refs_url": f"{url}/git/refs{{/sha}}",
+        "trees_url": f"{url}/git/trees{{/sha}}",
+        "statuses_url": f"{url}/statuses/{{sha}}",
+        "languages_url": f"{url}/languages",
+        "stargazers_url": f"{url}/stargazers",
+        "contributors_url": f"{url}/contributors",
+        "subscribers_url": f"{url}/subscribers",
+        "subscription_url": f"{url}/subscription",
+        "commits_url": f"{url}/commits{{/sha}}",
+        "git_commits_url": f"{url}/git/commits{{/sha}}",
+        "comments_url": f"{url}/comments{{/number}}",
+        "issue_comment_url": f"{url}/issues/comments{{/number}}",
+        "contents_url": f"{url}/contents/{{+path}}",
+        "compare_url": f"{url}/compare/{{base}}...{{head}}",
+        "merges_url": f"{url}/merges",
+        "archive_url": f"{url}/{{archive_format}}{{/ref}}",
+        "downloads_url": f"{url}/downloads",
+        "issues_url": f"{url}/issues{{/number}}",
+        "pulls_url": f"{url}/pulls{{/number}}",
+        "milestones_url": f"{url}/milestones{{/number}}",
+        "notifications_url": f"{url}/notifications{{?since,all,participating}}",
+        "labels_url": f"{url}/labels{{/name}}",
+        "releases_url": f"{url}/releases{{/id}}",
+        "deployments_url": f"{url}/deployments",
+        "created_at": _timestamp(rng),
+        "updated_at": _timestamp(rng),
+        "pushed_at": _timestamp(rng),
+        "git_url": f"git://github.com/{full_name}.git",
+        "ssh_url": f"git@github.com:{full_name}.git",
+        "clone_url": f"{WEB}/{full_name}.git",
+        "svn_url": f"{WEB}/{full_name}",
+        "homepage": rng.choice(["", f"https://{name}.readthedocs.io"]),
+        "size": rng.randint(10, 500000),
+        "stargazers_count": stars,
+        "watchers_count": stars,
+        "language": rng.choice(LANGUAGES),
+        "has_issues": True,
+        "has_projects": rng.random() < 0.5,
+        "has_downloads": True,
+        "has_wiki": rng.random() < 0.5,
+        "has_pages": rng.random() < 0.2,
+        "has_discussions": rng.random() < 0.2,
+        "forks_count": stars // 5,
+        "mirror_url": None,
+        "archived": rng.random() < 0.05,
+        "disabled": False,
+        "open_issues_count": rng.randint(0, 500),
+        "license": {
+            "key": license_key,
+            "name": license_name,
+            "spdx_id": spdx_id,
+            "url": f"{API}/licenses/{license_key}",
+            "node_id": _node_id(rng),
+        },
+        "allow_forking": True,
+        "is_template": False,
+        "web_commit_signoff_required": False,
+        "topics": rng.sample(WORDS, k=rng.randint(0, 6)),
+        "visibility": "public",
+        "forks": stars // 5,
+        "open_issues": rng.randint(0, 500),
+        "watchers": stars,
+        "default_branch": rng.choice(["main", "master"]),
+        "score": 1.0,
+    }
+
+
+# A search result item of /search/issues, shaped like the GitHub API response
+def fake_issue(rng: random.Random, index: int):
+    repository = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}/{rng.choice(WORDS)}"
+    repository_url = f"{API}/repos/{repository}"
+    number = rng.randint(1, 50000)
+    url = f"{repository_url}/issues/{number}"
+    state = rng.choice(["open", "closed"])
+    created_at = _timestamp(rng)
+    return {
+        "url": url,
+        "repository_url": repository_url,
+        "labels_url": f"{url}/labels{{/name}}",
+        "comments_url": f"{url}/comments",
+        "events_url": f"{url}/events",
+        "html_url": f"{WEB}/{repository}/issues/{number}",
+        "id": 5000000 + index,
+        "node_id": _node_id(rng),
+        "number": number,
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(3, 10))),
+        "user": fake_user(rng, index),
+        "labels": [
+            {
+                "id": rng.randint(1, 10**9),
+                "node_id": _node_id(rng),
+                "url": f"{repository_url}/labels/{label}",
+                "name": label,
+                "color": f"{rng.randint(0, 0xFFFFFF):06x}",
+                "default": False,
+                "description": None,
+            }
+            for label in rng.sample(WORDS, k=rng.randint(0, 3))
+        ],
+        "state": state,
+        "locked": False,
+        "assignee": None,
+        "assignees": [],
+        "comments": rng.randint(0, 200),
+        "created_at": created_at,
+        "updated_at": max(created_at, _timestamp(rng)),
+        "closed_at": _timestamp(rng) if state == "closed" else None,
+        "author_association": rng.choice(["NONE", "CONTRIBUTOR", "MEMBER", "OWNER"]),
+        "body": " ".join(rng.choices(WORDS, k=rng.randint(10, 200))),
+        "draft": None,
+        "score": 1.0,
+    }
+
+
+ITEM_FACTORIES = {
+    "user": fake_user,
+    "repo": fake_repository,
+    "issue": fake_issue,
+}
+
+
+# `count` search result items of the given search type ("user", "repo" or "issue")
+def fake_items(search_type: str, count: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    factory = ITEM_FACTORIES[search_type]
+    return [factory(rng, index) for index in range(count)]
+
+
+# Body of one page of a GitHub search response
+def fake_search_page(
+    search_type: str,
+    page: int,
+    total_count: int,
+    page_size: int = 100,
+    seed: int = 0,
+):
+    first_index = (page - 1) * page_size
+    count = max(0, min(page_size, total_count - first_index))
+    rng = random.Random(f"{seed}|{search_type}|{page}")
+    factory = ITEM_FACTORIES[search_type]
+    return {
+        "total_count": total_count,
+        "incomplete_results": False,
+        "items": [factory(rng, first_index + index) for index in range(count)],
+    }
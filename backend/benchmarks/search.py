@@ -0,0 +1,215 @@
+"""
+Benchmark suite of the search pipeline against a local fake GitHub search API.
+
+Measures the latency of a cold miss (every page fetched from the fake API, parsed and
+cached) and of a cache hit, the peak memory of a cold miss, the parse cost and the
+cache codec cost. Needs the Redis server of REDIS_CONNECTION_URL.
+
+Usage (from the backend directory):
+    python -m benchmarks.search [--latency-ms 50] [--total-count 1000] [--repeat 5]
+                                [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from config import Config
+from github.schemas import GitHubSearchParams, SearchType
+from github.service import GitHubSearchService
+
+from .cache_codec import benchmark_codecs
+from .fake_github import FakeGitHubConfig, run_fake_github
+from .parse import SEARCH_TYPES as PARSED_TYPES
+from .parse import benchmark_parsers
+
+SEARCH_TYPES = {
+    "user": SearchType.USER,
+    "repo": SearchType.REPO,
+    "issue": SearchType.ISSUE,
+}
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def summarize(durations):
+    return {
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+    }
+
+
+def timed(func):
+    started_at = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started_at, result
+
+
+# Searches nobody made before, so the first search of each is a cold miss
+def fresh_searches(search_type: str, count: int):
+    run_id = uuid.uuid4().hex[:8]
+    return [
+        GitHubSearchParams(
+            type=SEARCH_TYPES[search_type], keyword=f"bench {run_id} {index}"
+        )
+        for index in range(count)
+    ]
+
+
+# Latency of cold misses, then of hits on the results they cached
+def benchmark_search(service: GitHubSearchService, search_type: str, repeat: int):
+    searches = fresh_searches(search_type, repeat)
+    misses = [timed(lambda: service.search_raw(search))[0] for search in searches]
+    hits = [
+        timed(lambda: service.search_raw(search))[0]
+        for search in searches
+        for _ in range(10)
+    ]
+    payload_size = len(service.search_raw(searches[0]))
+    return [
+        {"benchmark": "cold_miss", "search_type": search_type, **summarize(misses)},
+        {
+            "benchmark": "hit",
+            "search_type": search_type,
+            "payload_bytes": payload_size,
+            **summarize(hits),
+        },
+    ]
+
+
+# Peak of the memory allocated by Python during a cold miss
+def benchmark_memory(service: GitHubSearchService, search_type: str):
+    (search,) = fresh_searches(search_type, 1)
+    tracemalloc.start()
+    try:
+        service.search_raw(search)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "benchmark": "cold_miss_memory",
+        "search_type": search_type,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_suite(args):
+    fake_config = FakeGitHubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        total_count=args.total_count,
+    )
+    results = []
+    with run_fake_github(fake_config) as server:
+        with patch.object(GitHubSearchService, "BASE_API", server.url):
+            service = GitHubSearchService()
+            for search_type in SEARCH_TYPES:
+                results.extend(benchmark_search(service, search_type, args.repeat))
+                results.append(benchmark_memory(service, search_type))
+    for search_type in PARSED_TYPES:
+        for result in benchmark_parsers(search_type, 10, args.repeat):
+            results.append({"benchmark": "parse", **result})
+    for search_type in SEARCH_TYPES:
+        for result in benchmark_codecs(search_type, 1000, args.repeat):
+            results.append({"benchmark": "codec", **result})
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "latency_ms": args.latency_ms,
+            "latency_jitter_ms": args.latency_jitter_ms,
+            "total_count": args.total_count,
+            "repeat": args.repeat,
+            "cache_codec": Config.CACHE_CODEC,
+            "l1_cache": Config.L1_CACHE_ENABLED,
+            "concurrency": Config.GITHUB_SEARCH_CONCURRENCY,
+        },
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Identity of a result (its text fields) and its measures (its numbers)
+def split_result(result):
+    identity = tuple(
+        (name, value) for name, value in result.items() if isinstance(value, str)
+    )
+    measures = {
+        name: value
+        for name, value in result.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    return identity, measures
+
+
+# Change of every measure found in both runs, in percent of the baseline
+def compare(baseline, report):
+    baseline_results = dict(split_result(result) for result in baseline["results"])
+    rows = []
+    for result in report["results"]:
+        identity, measures = split_result(result)
+        previous = baseline_results.get(identity)
+        if previous is None:
+            continue
+        for name, value in measures.items():
+            before = previous.get(name)
+            if not before or name == "items":
+                continue
+            change = (value - before) / before * 100
+            label = " ".join(str(value) for _, value in identity)
+            rows.append((label, name, before, value, change))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=10)
+    parser.add_argument("--total-count", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    for result in report["results"]:
+        print(json.dumps(result))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"\nChanges since {baseline.get('commit')}:")
+        for label, name, before, value, change in compare(baseline, report):
+            print(f"{label:<40}{name:<16}{before:>12}{value:>12}{change:>+9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,89 @@
 import os
+import tempfile
 
 
 class Config:
     CACHE_EXPIRY = 7200  # 7200 sec: 2 hr
+    # Random spread of CACHE_EXPIRY (fraction), so entries cached together expire apart
+    CACHE_EXPIRY_JITTER = float(os.getenv("CACHE_EXPIRY_JITTER", "0.1"))
+    # Extra time an expired search result is served while it is refreshed in the background
+    CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "1800"))
+    # Maximum number of GitHub search pages fetched in parallel per worker
+    GITHUB_SEARCH_CONCURRENCY = int(os.getenv("GITHUB_SEARCH_CONCURRENCY", "4"))
+    # Batch searches: most searches per batch, and missing searches fetched in parallel
+    GITHUB_SEARCH_BATCH_LIMIT = int(os.getenv("GITHUB_SEARCH_BATCH_LIMIT", "50"))
+    GITHUB_SEARCH_BATCH_CONCURRENCY = int(
+        os.getenv("GITHUB_SEARCH_BATCH_CONCURRENCY", "4")
+    )
+    # Compression of the cached search results, see utils.codec.CODECS
+    CACHE_CODEC = os.getenv("CACHE_CODEC", "zlib")
+    # Redis lock letting a single worker fetch a missing search result
+    CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "30"))  # Lock auto-expiry
+    CACHE_LOCK_WAIT = int(os.getenv("CACHE_LOCK_WAIT", "30"))  # Max wait for the lock
+    # Optional per-worker in-memory cache in front of Redis for hot keys
+    L1_CACHE_ENABLED = os.getenv("L1_CACHE_ENABLED", "false").lower() == "true"
+    L1_CACHE_TTL = int(os.getenv("L1_CACHE_TTL", "60"))  # Capped by the Redis TTL
+    L1_CACHE_MAX_ITEMS = int(os.getenv("L1_CACHE_MAX_ITEMS", "128"))
+    L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Longest a GitHub request waits for the rate limit budget (seconds), a request that
+    # can't be sent before it fails fast with MaxRetryExceedException
+    GITHUB_RATE_LIMIT_DEADLINE = float(os.getenv("GITHUB_RATE_LIMIT_DEADLINE", "10"))
+    # Popularity of the searches: half-life of a search (seconds) and share of the
+    # searches counted (every counted search weighs 1 / rate)
+    SEARCH_POPULARITY_HALF_LIFE = int(os.getenv("SEARCH_POPULARITY_HALF_LIFE", "21600"))
+    SEARCH_POPULARITY_SAMPLE_RATE = float(
+        os.getenv("SEARCH_POPULARITY_SAMPLE_RATE", "1")
+    )
+    # Every worker adds the searches it counted to Redis this often (seconds)
+    SEARCH_POPULARITY_FLUSH_INTERVAL = float(
+        os.getenv("SEARCH_POPULARITY_FLUSH_INTERVAL", "10")
+    )
+    # Cache warmer (manage.py warm_search_cache): number of popular searches kept warm,
+    # how long before the end of their fresh period they are re-fetched (seconds), and
+    # the share of the remaining GitHub rate limit budget it may spend per run
+    CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+    CACHE_WARM_AHEAD = int(os.getenv("CACHE_WARM_AHEAD", "600"))
+    CACHE_WARM_BUDGET_SHARE = float(os.getenv("CACHE_WARM_BUDGET_SHARE", "0.25"))
+    # Longest a worker may use outdated cache generations (seconds) when it misses the
+    # message of a bump, and number of keys deleted per UNLINK once they are outdated
+    CACHE_GENERATION_TTL = float(os.getenv("CACHE_GENERATION_TTL", "5"))
+    CACHE_SWEEP_BATCH_SIZE = int(os.getenv("CACHE_SWEEP_BATCH_SIZE", "500"))
+    # GET searches: smallest body sent gzip-compressed (bytes), and the per-worker cache
+    # of the compressed bodies (by ETag, their content can't change)
+    HTTP_GZIP_MIN_SIZE = int(os.getenv("HTTP_GZIP_MIN_SIZE", "1024"))
+    HTTP_GZIP_CACHE_TTL = int(os.getenv("HTTP_GZIP_CACHE_TTL", "600"))
+    HTTP_GZIP_CACHE_MAX_ITEMS = int(os.getenv("HTTP_GZIP_CACHE_MAX_ITEMS", "256"))
+    HTTP_GZIP_CACHE_MAX_BYTES = int(
+        os.getenv("HTTP_GZIP_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+    )
+    # Every worker adds its metrics to the samples shared in Redis this often (seconds)
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+    # Time spent by every request in each stage (Redis, GitHub, parsing, rendering) is
+    # reported in a Server-Timing header
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    # cProfile dumps of chosen requests: a share of them, and those sent with an
+    # X-Profile header holding PROFILE_TOKEN (no token, no header)
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_DIR = os.getenv(
+        "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "molyneux-profiles")
+    )
+    # GitHub API the searches are sent to, e.g. a local stand-in for benchmarks
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
     GITHUB_PAT = os.getenv("_GITHUB_PAT", None)
+    # Connections to GitHub kept open per worker; with GITHUB_POOL_BLOCK it also bounds
+    # the concurrent requests, which wait for a free connection instead of opening more
+    GITHUB_POOL_MAXSIZE = int(os.getenv("GITHUB_POOL_MAXSIZE", "16"))
+    GITHUB_POOL_BLOCK = os.getenv("GITHUB_POOL_BLOCK", "false").lower() == "true"
+    # Time allowed to connect to GitHub, and to wait for data once connected (seconds)
+    GITHUB_CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "3.05"))
+    GITHUB_READ_TIMEOUT = float(os.getenv("GITHUB_READ_TIMEOUT", "10"))
+    # Idle connections to GitHub are probed with TCP keep-alives after this many
+    # seconds, and closed after it by the async client
+    GITHUB_KEEPALIVE_IDLE = float(os.getenv("GITHUB_KEEPALIVE_IDLE", "60"))
+    # A booting worker opens its Redis pool and its GitHub connections (one per page
+    # fetched in parallel) before its first request, each attempt bounded (seconds)
+    WARM_UP_ON_BOOT = os.getenv("WARM_UP_ON_BOOT", "true").lower() == "true"
+    WARM_UP_TIMEOUT = float(os.getenv("WARM_UP_TIMEOUT", "5"))
     DEV_STAGE = os.getenv("DEV_STAGE", "prod").lower() in ["dev", "development"]
     REDIS_CONNECTION_URL = os.environ["REDIS_CONNECTION_URL"]
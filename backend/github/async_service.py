@@ -0,0 +1,417 @@
+import asyncio
+import json
+import logging
+import math
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import aiohttp
+import redis.asyncio as aioredis
+from pydantic_core import to_json
+from redis.exceptions import LockError
+from rest_framework.status import HTTP_304_NOT_MODIFIED
+
+from config import Config
+from utils import AbstractGlobalInstance, AsyncSingleFlight, LoopLocal
+from utils.exceptions import MaxRetryExceedException
+from utils.timing import span
+
+from .constants import GITHUB_SEARCH_RESULT_LIMIT, GITHUB_SEARCH_REDIS_CACHE_PREFIX
+from .metrics import (
+    GITHUB_API_RESPONSE_BYTES,
+    SEARCH_CACHE_SECONDS,
+    observe_github_request,
+)
+from .parsers import get_parser
+from .popularity import AsyncGitHubSearchPopularity
+from .ratelimit import AsyncGitHubRateLimiter
+from .result_index import generate_index_key, index_results
+from .schemas import GitHubSearchParams
+from .service import (
+    BaseGitHubSearchCacheService,
+    CacheEntry,
+    GitHubSearchService,
+    generate_etags_key,
+    get_cache_outcome,
+    github_search_backoff,
+    merge_revalidated_pages,
+    serialize_results,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Failures of a page that leave out its results, see PAGE_FETCH_ERRORS
+ASYNC_PAGE_FETCH_ERRORS = (
+    MaxRetryExceedException,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+class AsyncGitHubSearchService(AbstractGlobalInstance):
+    # Asyncio counterpart of GitHubSearchService
+    # Waiting on GitHub or Redis never holds a thread, so one process can serve
+    # many concurrent searches under ASGI
+
+    def __init__(self):
+        self.__cache = (
+            AsyncGitHubSearchCacheService()
+        )  # Cache service to store search results
+        # HTTP sessions are bound to the event loop that created them
+        self.__sessions = LoopLocal(self.__create_session)
+        # Request budget shared with every worker, see GitHubRateLimiter
+        self.__rate_limiter = AsyncGitHubRateLimiter()
+        # Concurrent cache misses for the same key share a single fetch
+        self.__single_flight = AsyncSingleFlight()
+        # Background refreshes of stale results, by cache key, bound to their event loop
+        self.__refreshes = LoopLocal(dict)
+        self.__popularity = AsyncGitHubSearchPopularity()  # Decayed search counts
+
+    # Main search method that retrieves results from cache or fetches fresh data from GitHub API
+    async def search(self, search_params: GitHubSearchParams):
+        return json.loads(await self.search_raw(search_params))
+
+    # Same as search, but returns the results serialized as a JSON array
+    async def search_raw(self, search_params: GitHubSearchParams) -> bytes:
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        entry = await self.__get_cached(search_params, cache_key)  # Check the cache
+        await self.__popularity.record(search_params, get_cache_outcome(entry))
+        if entry is not None:
+            return entry.data
+
+        # Perform search if not cached, later callers in this process wait for it
+        return await self.__single_flight.do(
+            cache_key, self.__search_and_cache, search_params, cache_key
+        )
+
+    # Cached entry of a search, a stale entry is returned and refreshed in the background
+    async def __get_cached(self, search_params: GitHubSearchParams, cache_key: str):
+        entry = await self.__cache.get_entry(cache_key)
+        if entry is None:
+            return None
+        refreshes = self.__refreshes.get()
+        if entry.is_stale and cache_key not in refreshes:
+            # Keep a reference to the task until it is done, at most one per key
+            refreshes[cache_key] = asyncio.create_task(
+                self.__refresh(search_params, cache_key)
+            )
+            refreshes[cache_key].add_done_callback(
+                lambda _: refreshes.pop(cache_key, None)
+            )
+        return entry
+
+    async def __refresh(self, search_params: GitHubSearchParams, cache_key: str):
+        try:
+            await self.refresh(search_params, min_ttl=Config.CACHE_STALE_TTL)
+        except Exception as e:  # The stale result is served until the next attempt
+            logger.warning("Failed to refresh search %s: %r", cache_key, e)
+
+    # Fetch and cache the result of a search unless it has more than `min_ttl` seconds
+    # left, see GitHubSearchService.refresh
+    async def refresh(self, search_params: GitHubSearchParams, min_ttl: float) -> bool:
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        async with self.__cache.lock(cache_key, blocking=False) as acquired:
+            if not acquired:
+                return False
+            if await self.__cache.get_ttl(cache_key) > min_ttl * 1000:
+                return False
+            if await self.__revalidate(search_params, cache_key):
+                return True
+            search_result, is_complete, etags = await self.__search_engine(
+                search_params
+            )
+            if is_complete:
+                await self.__cache.store_cache_raw(
+                    cache_key,
+                    serialize_results(search_result),
+                    index=index_results(search_params.type, search_result),
+                    etags=etags,
+                )
+            return is_complete
+
+    # Revalidate the pages of a cached result with their ETags, see
+    # GitHubSearchService.__revalidate
+    async def __revalidate(self, search_params: GitHubSearchParams, cache_key: str):
+        etags = await self.__cache.get_etags(cache_key)
+        if not etags:  # Cached without ETags
+            return False
+        include = search_params.item_include()
+        semaphore = asyncio.Semaphore(Config.GITHUB_SEARCH_CONCURRENCY)
+
+        async def fetch_page(page: int, etag: str):
+            async with semaphore:
+                return await self.__fetch_page(search_params, page, include, etag)
+
+        pages = await asyncio.gather(
+            *(fetch_page(page, etag) for page, etag in enumerate(etags, start=1))
+        )
+        if all(page is None for page in pages):  # Nothing changed
+            return await self.__cache.extend_cache(cache_key)
+
+        cached = await self.__cache.get_cache_raw(cache_key)
+        merged = cached and merge_revalidated_pages(
+            search_params.type, cached, pages, etags, GitHubSearchService.PAGE_SIZE
+        )
+        if not merged:
+            return False
+        data, index, etags = merged
+        await self.__cache.store_cache_raw(cache_key, data, index=index, etags=etags)
+        return True
+
+    # Fetch and cache a search result while holding the Redis lock on its key
+    async def __search_and_cache(
+        self, search_params: GitHubSearchParams, cache_key: str
+    ):
+        async with self.__cache.lock(cache_key):
+            # Another worker may have stored the result while we were waiting
+            cache_data = await self.__cache.get_cache_raw(cache_key)
+            if cache_data is not None:
+                return cache_data
+
+            search_result, is_complete, etags = await self.__search_engine(
+                search_params
+            )
+            serialized_result = serialize_results(search_result)
+            # Only cache complete results, so a failed page is retried on the next search
+            if is_complete:
+                await self.__cache.store_cache_raw(
+                    cache_key,
+                    serialized_result,
+                    index=index_results(search_params.type, search_result),
+                    etags=etags,
+                )
+
+            return serialized_result
+
+    # Fetch every page and combine the items
+    # Returns the combined items, whether every page was fetched successfully and the
+    # ETags of the pages
+    async def __search_engine(self, search_params: GitHubSearchParams):
+        search_results = []
+        etags = []
+        is_complete = True
+        for chunk in await self.__fetch_all(search_params):
+            if chunk is None:  # The page failed, keep the pages that succeeded
+                is_complete = False
+                continue
+            search_results.extend(chunk.items)
+            etags.append(chunk.etag)
+        return search_results, is_complete, etags
+
+    # Fetch all pages for the search query, a page that failed is returned as None
+    async def __fetch_all(self, search_params: GitHubSearchParams):
+        # The projection is applied while parsing, dropped fields are never serialized
+        include = search_params.item_include()
+        first_page = await self.__fetch_page(search_params, 1, include)
+        # GitHub limits results to 1000, calculate valid pages accordingly
+        number_of_result = min(first_page.total_count, GITHUB_SEARCH_RESULT_LIMIT)
+        valid_page_count = math.ceil(number_of_result / GitHubSearchService.PAGE_SIZE)
+
+        # Fetch remaining pages concurrently, bounded like the sync service
+        semaphore = asyncio.Semaphore(Config.GITHUB_SEARCH_CONCURRENCY)
+
+        async def fetch_page(page: int):
+            async with semaphore:
+                try:
+                    return await self.__fetch_page(search_params, page, include)
+                except ASYNC_PAGE_FETCH_ERRORS as e:
+                    logger.warning("Failed to fetch search page %s: %r", page, e)
+                    return None
+
+        pages = await asyncio.gather(
+            *(fetch_page(page) for page in range(2, valid_page_count + 1))
+        )
+        return [first_page, *pages]
+
+    # Fetch a specific page of results from GitHub API with backoff handling
+    # None is returned when the page didn't change since `etag` (304 Not Modified)
+    @github_search_backoff()
+    async def __fetch_page(
+        self,
+        search_params: GitHubSearchParams,
+        page: int,
+        include: Optional[dict] = None,
+        etag: Optional[str] = None,
+    ):
+        params = {
+            "q": search_params.canonical_keyword(),
+            "per_page": GitHubSearchService.PAGE_SIZE,  # Number of results per page
+            "page": page,
+        }
+        # Wait for the shared budget, or fail fast. A revalidation answered with a 304
+        # doesn't count against the budget, it takes nothing from it
+        await self.__rate_limiter.acquire(conditional=etag is not None)
+        with observe_github_request(search_params.type) as request_labels:
+            async with self.__sessions.get().get(
+                GitHubSearchService.get_api_for_type(search_params.type),
+                params=params,
+                headers=None if etag is None else {"If-None-Match": etag},
+            ) as res:
+                request_labels["status"] = res.status
+                await self.__rate_limiter.update(res.headers)
+                if res.status == HTTP_304_NOT_MODIFIED:
+                    return None
+                res.raise_for_status()  # Raise an error for HTTP errors
+                raw = await res.read()
+        GITHUB_API_RESPONSE_BYTES.observe(len(raw), type=search_params.type.value)
+        # Validate the raw body in one pass with the parser of the search type
+        parsed_page = get_parser(search_params.type).parse(raw, include)
+        return parsed_page._replace(etag=res.headers.get("ETag"))
+
+    # Connections are limited and timed out like those of GitHubClient. Idle ones are
+    # closed after GITHUB_KEEPALIVE_IDLE seconds (aiohttp probes them with TCP
+    # keep-alives already)
+    @staticmethod
+    def __create_session():
+        headers = {}
+        if Config.GITHUB_PAT is not None:  # Use personal access token if available
+            headers["Authorization"] = f"Bearer {Config.GITHUB_PAT}"
+        connector = aiohttp.TCPConnector(
+            limit_per_host=(
+                Config.GITHUB_POOL_MAXSIZE if Config.GITHUB_POOL_BLOCK else 0
+            ),
+            keepalive_timeout=Config.GITHUB_KEEPALIVE_IDLE,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=Config.GITHUB_CONNECT_TIMEOUT,
+            sock_read=Config.GITHUB_READ_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            headers=headers, connector=connector, timeout=timeout
+        )
+
+
+class AsyncGitHubSearchCacheService(BaseGitHubSearchCacheService):
+    # Cache service using redis.asyncio, keys and values match GitHubSearchCacheService
+    def __init__(self, cache_prefix=GITHUB_SEARCH_REDIS_CACHE_PREFIX):
+        super().__init__(cache_prefix)
+        # Connection pools are bound to the event loop that created them
+        self.__redis_clients = LoopLocal(
+            lambda: aioredis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        )
+
+    # Redis key of a cache key. The first one waits for the cache generations, read in a
+    # thread (see GitHubSearchCacheGenerations.load_async), later ones don't wait
+    async def __redis_key(self, key):
+        await self._generations.load_async()
+        return self._format_key(key)
+
+    # Store search results in Redis with a key and expiration time
+    async def store_cache(self, key, value):
+        await self.store_cache_raw(key, self._serialize(value))
+
+    # Store already serialized JSON, optionally with the index of the results and the
+    # ETags of its pages
+    async def store_cache_raw(
+        self,
+        key,
+        data: bytes,
+        index: Optional[bytes] = None,
+        etags: Optional[List[str]] = None,
+    ):
+        expiry = self._expiry()
+        pipeline = self.__redis_clients.get().pipeline(transaction=False)
+        pipeline.set(
+            name=await self.__redis_key(key),
+            value=self._compress_payload(data),
+            ex=expiry,  # Set cache expiry time
+        )
+        if index is not None:
+            index_key = generate_index_key(key)
+            pipeline.set(
+                name=await self.__redis_key(index_key),
+                value=self._compress(index),
+                ex=expiry,
+            )
+            self._remember(index_key, index, expiry * 1000)
+        if self._has_etags(etags):
+            pipeline.set(
+                name=await self.__redis_key(generate_etags_key(key)),
+                value=self._compress(to_json(etags)),
+                ex=expiry,
+            )
+        with SEARCH_CACHE_SECONDS.time(operation="store"), span("redis"):
+            await pipeline.execute()
+        self._remember(key, data, expiry * 1000)
+
+    # ETags of the GitHub pages of a cached result, None when they aren't known
+    async def get_etags(self, key) -> Optional[List[str]]:
+        redis_key = await self.__redis_key(generate_etags_key(key))
+        with span("redis"):
+            cache = await self.__redis_clients.get().get(redis_key)
+        return None if cache is None else json.loads(self._decompress(cache))
+
+    # Keep a cached result for another expiry, see GitHubSearchCacheService.extend_cache
+    async def extend_cache(self, key) -> bool:
+        expiry = self._expiry()
+        pipeline = self.__redis_clients.get().pipeline(transaction=False)
+        for name in (key, generate_index_key(key), generate_etags_key(key)):
+            pipeline.expire(await self.__redis_key(name), expiry)
+        with span("redis"):
+            return bool((await pipeline.execute())[0])
+
+    # Retrieve cached result from the L1 cache or Redis
+    async def get_cache(self, key):
+        data = await self.get_cache_raw(key)
+        return None if data is None else json.loads(data)
+
+    # Retrieve the serialized JSON of a cached result, without parsing it
+    async def get_cache_raw(self, key):
+        if self._l1_cache is not None:
+            entry = await self.get_entry(key)
+            return None if entry is None else entry.data
+
+        redis_key = await self.__redis_key(key)
+        with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+            cache: bytes = await self.__redis_clients.get().get(redis_key)
+        return None if cache is None else self._decompress(cache)
+
+    # Milliseconds left before a cached result expires, negative when it is missing
+    async def get_ttl(self, key) -> int:
+        redis_key = await self.__redis_key(key)
+        with span("redis"):
+            return await self.__redis_clients.get().pttl(redis_key)
+
+    # Retrieve the serialized JSON of a cached result and whether it is stale
+    async def get_entry(self, key) -> Optional[CacheEntry]:
+        entry = self._recall_entry(key)
+        if entry is not None:
+            return entry
+
+        # Fetch the remaining TTL with the value, it tells whether the value is stale
+        redis_key = await self.__redis_key(key)
+        pipeline = self.__redis_clients.get().pipeline(transaction=False)
+        pipeline.get(redis_key)
+        pipeline.pttl(redis_key)
+        with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+            cache, ttl_ms = await pipeline.execute()
+        if cache is None:
+            self._count_lookup("redis", None)
+            return None
+        data = self._decompress(cache)
+        self._remember(key, data, ttl_ms)
+        entry = self._entry(data, ttl_ms)
+        self._count_lookup("redis", entry)
+        return entry
+
+    # Hold a short-lived Redis lock on a key, see GitHubSearchCacheService.lock
+    @asynccontextmanager
+    async def lock(self, key, blocking=True):
+        lock = self.__redis_clients.get().lock(
+            self._format_lock_key(key),
+            timeout=Config.CACHE_LOCK_TIMEOUT,
+            blocking_timeout=Config.CACHE_LOCK_WAIT,
+        )
+        with span("redis"):  # Waiting for another worker's lock included
+            acquired = await lock.acquire(blocking=blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    with span("redis"):
+                        await lock.release()
+                except LockError:  # The lock expired while its key was fetched
+                    pass
@@ -0,0 +1,68 @@
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from config import Config
+
+
+# Options of the sockets to GitHub: idle connections are probed with TCP keep-alives
+# after GITHUB_KEEPALIVE_IDLE seconds, so NATs and load balancers don't drop them
+def keepalive_socket_options():
+    options = [*HTTPConnection.default_socket_options]
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, "TCP_KEEPIDLE"):  # Linux
+        idle = max(int(Config.GITHUB_KEEPALIVE_IDLE), 1)
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, idle))
+    return options
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", keepalive_socket_options())
+        super().init_poolmanager(*args, **kwargs)
+
+
+class GitHubClient:
+    # HTTP client of the GitHub API, shared by the threads of a worker
+    # Every thread gets its own session (sessions hold cookies and headers, they
+    # aren't thread-safe) but they share one connection pool, so a connection opened
+    # by a thread is reused by the others instead of paying another TLS handshake.
+    # GITHUB_POOL_MAXSIZE connections are kept open per host; past it, extra
+    # connections are closed after use, or waited for with GITHUB_POOL_BLOCK
+    def __init__(self, headers=None):
+        self.__adapter = KeepAliveHTTPAdapter(
+            pool_connections=1,  # GitHub is the only host
+            pool_maxsize=Config.GITHUB_POOL_MAXSIZE,
+            pool_block=Config.GITHUB_POOL_BLOCK,
+            max_retries=0,  # Retries back off in github_search_backoff
+        )
+        self.__headers = dict(headers or {})
+        self.__local = threading.local()
+        self.timeout = (Config.GITHUB_CONNECT_TIMEOUT, Config.GITHUB_READ_TIMEOUT)
+
+    # Session of the calling thread
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self.__local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.__headers)
+            session.mount("https://", self.__adapter)
+            session.mount("http://", self.__adapter)
+            self.__local.session = session
+        return session
+
+    def get(self, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.head(url, **kwargs)
+
+
+__all__ = ["GitHubClient", "KeepAliveHTTPAdapter", "keepalive_socket_options"]
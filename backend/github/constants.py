@@ -4,3 +4,21 @@ GITHUB_SEARCH_RESULT_LIMIT = 1000
 GITHUB_RATE_LIMIT_ERROR_REASON = "rate limit exceeded"
 
 GITHUB_SEARCH_REDIS_CACHE_PREFIX = "MOLYNEUX_GITHUB_SEARCH_CACHE"
+# Channel used to tell every worker to drop its in-memory (L1) cache entries
+GITHUB_SEARCH_L1_INVALIDATION_CHANNEL = (
+    f"{GITHUB_SEARCH_REDIS_CACHE_PREFIX}|L1_INVALIDATION"
+)
+
+# Generations of the cache keys, and the channel telling every worker about a bump,
+# see github/generations.py. Kept out of the cache prefix, so sweeps never match them
+GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY = "MOLYNEUX_GITHUB_SEARCH_GENERATIONS"
+GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL = (
+    f"{GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY}|BUMP"
+)
+
+# Budget of GitHub API requests shared by every worker, see github/ratelimit.py
+GITHUB_RATE_LIMIT_REDIS_PREFIX = "MOLYNEUX_GITHUB_RATE_LIMIT"
+# Decayed popularity of the searches, see github/popularity.py
+GITHUB_SEARCH_POPULARITY_REDIS_PREFIX = "MOLYNEUX_GITHUB_SEARCH_POPULARITY"
+# Cache hits, stale hits and misses of the searches, by search type
+GITHUB_SEARCH_CACHE_STATS_REDIS_KEY = "MOLYNEUX_GITHUB_SEARCH_CACHE_STATS"
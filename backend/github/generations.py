@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import redis
+
+from config import Config
+from utils import AbstractGlobalInstance
+
+from .constants import (
+    GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL,
+    GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY,
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_GENERATION = "*"  # Field of the generation shared by every search type
+
+
+class GitHubSearchCacheGenerations(AbstractGlobalInstance):
+    # Generations of the search cache, global and by search type, counted in a Redis hash
+    # Every cache key holds the generations of its search type (see `tag`), so bumping a
+    # generation makes the entries written before unreachable at once, whatever their
+    # number. They are deleted afterwards, see GitHubSearchCacheService.sweep.
+    # Workers keep a copy of the counters, read once (see `load`) then kept current by
+    # background threads: reloaded when any worker bumps one (pub/sub) and every
+    # CACHE_GENERATION_TTL seconds, in case a message was lost. Reading a tag never
+    # touches Redis once they are loaded, the event loop of the async service included
+    def __init__(self):
+        self.__redis_client = redis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        self.__generations: Dict[str, int] = {}
+        self.__loaded = False  # Loaded on first use, creating it doesn't touch Redis
+        self.__lock = threading.RLock()
+
+    # Version segment of the cache keys of a search type, e.g. "v3.1"
+    def tag(self, search_type: str) -> str:
+        if not self.__loaded:
+            self.load()
+        generations = self.__generations
+        return f"v{generations.get(GLOBAL_GENERATION, 0)}.{generations.get(search_type, 0)}"
+
+    # Read the counters, once per process, and start keeping them current
+    def load(self):
+        with self.__lock:
+            if self.__loaded:
+                return
+            self.__listen()  # Before the counters are read, so no bump is missed
+            self.reload()
+            threading.Thread(
+                target=self.__reload_forever,
+                name="cache-generations-reload",
+                daemon=True,
+            ).start()
+            self.__loaded = True
+
+    # Same as load, the counters are read in a thread instead of on the event loop
+    async def load_async(self):
+        if not self.__loaded:
+            await asyncio.to_thread(self.load)
+
+    # Make every cache entry unreachable (optional: only those of a search type)
+    def bump(self, search_type: Optional[str] = None):
+        pipeline = self.__redis_client.pipeline()  # MULTI, no worker misses the bump
+        pipeline.hincrby(
+            GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY, search_type or GLOBAL_GENERATION
+        )
+        pipeline.publish(GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL, "")
+        pipeline.execute()
+        self.reload()
+
+    # Read the counters from Redis
+    # Loads are serialized, so an older read never replaces a newer one
+    def reload(self):
+        with self.__lock:
+            generations = self.__redis_client.hgetall(
+                GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY
+            )
+            self.__generations = {
+                field.decode(): int(value) for field, value in generations.items()
+            }
+
+    # Subscribe to the bumps
+    def __listen(self):
+        pubsub = self.__redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL: self.__on_bump})
+        pubsub.run_in_thread(
+            sleep_time=1,
+            daemon=True,
+            exception_handler=self.__on_listener_error,
+        )
+
+    def __on_bump(self, message):
+        self.reload()
+
+    # Bumps may be missed while disconnected from Redis, the periodic reload makes up
+    # for them
+    def __on_listener_error(self, e, pubsub, thread):
+        logger.warning("Cache generation listener failed: %r", e)
+        time.sleep(1)  # Don't spin while Redis is unreachable
+
+    def __reload_forever(self):
+        while True:
+            time.sleep(Config.CACHE_GENERATION_TTL)
+            try:
+                self.reload()
+            except Exception as e:  # Kept until the next reload
+                logger.warning("Failed to reload cache generations: %r", e)
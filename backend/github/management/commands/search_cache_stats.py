@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from github.popularity import GitHubSearchPopularity
+
+
+class Command(BaseCommand):
+    help = "Show the cache hit ratio of the searches, by search type"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Start counting from zero after showing the counters",
+        )
+
+    def handle(self, *args, **options):
+        popularity = GitHubSearchPopularity()
+        for search_type, counts in sorted(popularity.cache_stats().items()):
+            lookups = sum(counts.values())
+            # Stale hits are served from the cache as well
+            hit_ratio = (counts["hit"] + counts["stale"]) / lookups if lookups else 0
+            self.stdout.write(
+                f"{search_type}: {lookups} searches, {counts['hit']} hits, "
+                f"{counts['stale']} stale hits, {counts['miss']} misses, "
+                f"hit ratio {hit_ratio:.1%}"
+            )
+        if options["reset"]:
+            popularity.reset_cache_stats()
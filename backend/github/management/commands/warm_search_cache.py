@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from config import Config
+from github.warmer import GitHubSearchCacheWarmer
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-fetch the most popular searches shortly before their cached results expire"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=Config.CACHE_WARM_TOP_N,
+            help="Number of popular searches kept warm",
+        )
+        parser.add_argument(
+            "--budget-share",
+            type=float,
+            default=Config.CACHE_WARM_BUDGET_SHARE,
+            help="Share of the remaining GitHub rate limit budget a run may spend",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=None,
+            help="Keep running, one run every INTERVAL seconds",
+        )
+
+    def handle(self, *args, **options):
+        warmer = GitHubSearchCacheWarmer()
+        while True:
+            warmed = warmer.run(options["top"], options["budget_share"])
+            self.stdout.write(f"Warmed {warmed} searches")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
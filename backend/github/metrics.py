@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+
+from utils.metrics import SIZE_BUCKETS, Counter, Histogram
+from utils.timing import span
+
+from .schemas import SearchType
+
+# Cache layer
+SEARCH_CACHE_LOOKUPS = Counter(
+    "github_search_cache_lookups_total",
+    "Lookups of cached search results, by tier (l1, redis) and outcome",
+)
+SEARCH_CACHE_SECONDS = Histogram(
+    "github_search_cache_operation_seconds",
+    "Duration of the Redis round-trips of the search cache, by operation",
+)
+SEARCH_CACHE_PAYLOAD_BYTES = Histogram(
+    "github_search_cache_payload_bytes",
+    "Size of the cached search results, raw and compressed",
+    buckets=SIZE_BUCKETS,
+)
+
+# GitHub API
+GITHUB_API_SECONDS = Histogram(
+    "github_api_request_duration_seconds",
+    "Duration of the GitHub search requests, by search type and status",
+)
+GITHUB_API_RESPONSE_BYTES = Histogram(
+    "github_api_response_bytes",
+    "Size of the GitHub search pages, by search type",
+    buckets=SIZE_BUCKETS,
+)
+GITHUB_API_RETRIES = Counter(
+    "github_api_retries_total", "Rate-limited GitHub requests retried after a backoff"
+)
+GITHUB_API_BACKOFF_SECONDS = Counter(
+    "github_api_backoff_seconds_total",
+    "Time spent waiting before retrying rate-limited GitHub requests",
+)
+GITHUB_API_MAX_RETRY_EXCEEDED = Counter(
+    "github_api_max_retry_exceeded_total",
+    "GitHub requests given up on (MaxRetryExceedException), by reason (retries, "
+    "deadline, budget)",
+)
+
+
+# Time a GitHub request, also as a span of the request it serves. The status is
+# "error" unless the caller sets the status of the response in the yielded labels
+@contextmanager
+def observe_github_request(search_type: SearchType):
+    labels = {"type": search_type.value, "status": "error"}
+    started = time.perf_counter()
+    try:
+        with span("github"):
+            yield labels
+    finally:
+        GITHUB_API_SECONDS.observe(time.perf_counter() - started, **labels)
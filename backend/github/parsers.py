@@ -0,0 +1,100 @@
+from datetime import datetime
+from functools import lru_cache
+from types import UnionType
+from typing import (
+    Annotated,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, Field, HttpUrl, StringConstraints, TypeAdapter
+from pydantic_core import Url
+from typing_extensions import TypedDict
+
+from utils.timing import span
+
+from .schemas import SEARCH_ITEM_MODELS, GitHubSearchPage, SearchType, project_item
+
+
+class ParsedSearchPage(NamedTuple):
+    total_count: int
+    incomplete_results: bool
+    items: List[dict]  # JSON-ready items
+    etag: Optional[str] = None  # ETag of the GitHub response, to revalidate the page
+
+
+# GitHub URLs and timestamps (ISO 8601) are checked as strings and kept as sent,
+# building Url and datetime objects only to dump them again is most of the parse time
+URL_STRING = Annotated[str, StringConstraints(pattern=r"^https?://[^\s/$.?#][^\s]*$")]
+DATETIME_STRING = Annotated[
+    str,
+    StringConstraints(
+        pattern=r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?(Z|[+-]\d\d:\d\d)?$"
+    ),
+]
+
+
+# Annotation of a field of a GitHub item: URLs and datetimes become checked strings,
+# nested models become TypedDicts
+def _item_annotation(annotation):
+    if annotation in (HttpUrl, Url):
+        return URL_STRING
+    if annotation is datetime:
+        return DATETIME_STRING
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return item_typed_dict(annotation)
+    origin = get_origin(annotation)
+    if origin is Annotated:  # e.g. HttpUrl nested in Optional, drop its constraints
+        return _item_annotation(get_args(annotation)[0])
+    if origin in (Union, UnionType):
+        return Union[tuple(_item_annotation(arg) for arg in get_args(annotation))]
+    if origin is list:
+        return List[_item_annotation(get_args(annotation)[0])]
+    return annotation
+
+
+# TypedDict mirroring a model, required fields and defaults included
+# Validating into a TypedDict returns plain JSON-ready dicts, nothing has to be dumped
+@lru_cache(maxsize=None)
+def item_typed_dict(model: type):
+    name = "Item" + "".join(char for char in model.__name__ if char.isalnum())
+    fields = {}
+    for field_name, field in model.model_fields.items():
+        annotation = _item_annotation(field.annotation)
+        if not field.is_required():
+            annotation = Annotated[annotation, Field(default=field.default)]
+        fields[field_name] = annotation
+    return TypedDict(name, fields)
+
+
+# Parse pipeline of the responses of one GitHub search endpoint
+# The item type is selected by the search type, so items are never sniffed, and the
+# raw response bytes are parsed and validated in a single pass by pydantic-core
+class GitHubSearchResponseParser:
+    def __init__(self, search_type: SearchType):
+        item_model = SEARCH_ITEM_MODELS[search_type]
+        self.__page = TypeAdapter(item_typed_dict(GitHubSearchPage[item_model]))
+
+    # Parse the raw JSON of a search page into JSON-ready items
+    # `include` projects the items (pydantic include spec)
+    def parse(self, raw: bytes, include: Optional[dict] = None):
+        with span("validate"):
+            page = self.__page.validate_json(raw)
+        items = page["items"]
+        if include is not None:
+            items = [project_item(item, include) for item in items]
+        return ParsedSearchPage(page["total_count"], page["incomplete_results"], items)
+
+
+PARSERS: Dict[SearchType, GitHubSearchResponseParser] = {
+    search_type: GitHubSearchResponseParser(search_type) for search_type in SearchType
+}
+
+
+def get_parser(search_type: SearchType) -> GitHubSearchResponseParser:
+    return PARSERS[search_type]
@@ -0,0 +1,178 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from config import Config
+from utils import AbstractGlobalInstance
+
+from .constants import (
+    GITHUB_SEARCH_CACHE_STATS_REDIS_KEY,
+    GITHUB_SEARCH_POPULARITY_REDIS_PREFIX,
+)
+from .schemas import GitHubSearchParams
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of the cache lookup of a search
+CACHE_OUTCOMES = ("hit", "stale", "miss")
+
+
+class BaseGitHubSearchPopularity:
+    # How often every search is made, decayed over time in a Redis sorted set
+    # Forward decay: a search made `age` seconds into the current era adds
+    # 2 ** (age / half life) to its score, so the scores never have to be rewritten and a
+    # search weighs half as much as the same search made one half-life later.
+    # Every era (ERA_HALF_LIVES half-lives) has its own key to keep the weights bounded,
+    # the previous era is merged in with its weights scaled down to the current era
+    ERA_HALF_LIVES = 64
+
+    def __init__(self):
+        self._era_length = self.ERA_HALF_LIVES * Config.SEARCH_POPULARITY_HALF_LIFE
+
+    def _format_key(self, era: int):
+        return f"{GITHUB_SEARCH_POPULARITY_REDIS_PREFIX}|{era}"
+
+    # Key, member and score increment of a search made now, None when not sampled
+    # Spellings of the same query count as one search, see canonicalize_query
+    def _increment(self, search_params: GitHubSearchParams):
+        sample_rate = Config.SEARCH_POPULARITY_SAMPLE_RATE
+        if sample_rate < 1 and random.random() >= sample_rate:
+            return None
+        era, age = divmod(time.time(), self._era_length)
+        weight = 2 ** (age / Config.SEARCH_POPULARITY_HALF_LIFE) / sample_rate
+        member = search_params.model_copy(
+            update={"keyword": search_params.canonical_keyword()}
+        ).model_dump_json()
+        return self._format_key(int(era)), member, weight
+
+    # Keys of the current and the previous era with the weights merging them
+    def _union_weights(self):
+        era = int(time.time() // self._era_length)
+        return {
+            self._format_key(era): 1,
+            self._format_key(era - 1): 2.0**-self.ERA_HALF_LIVES,
+        }
+
+
+class GitHubSearchPopularity(BaseGitHubSearchPopularity, AbstractGlobalInstance):
+    # Recording a search only touches memory: the counts are summed by search and
+    # added to Redis by a background thread every SEARCH_POPULARITY_FLUSH_INTERVAL
+    # seconds, in one round-trip, so a cache hit doesn't wait on Redis to be counted
+    def __init__(self):
+        super().__init__()
+        self.__redis_client = redis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        self.__lock = threading.Lock()
+        self.__scores: Dict[Tuple[str, str], float] = {}  # Weights by key and member
+        self.__outcomes: Dict[str, int] = {}  # Cache lookup outcomes by field
+        self.__flusher: Optional[threading.Thread] = None
+
+    # Count a search and the outcome of its cache lookup
+    def record(
+        self, search_params: GitHubSearchParams, cache_outcome: Optional[str] = None
+    ):
+        self.record_many([(search_params, cache_outcome)])
+
+    # Count several searches with their cache outcome
+    def record_many(self, searches: List[Tuple[GitHubSearchParams, Optional[str]]]):
+        increments = [
+            (self._increment(search_params), search_params.type.value, cache_outcome)
+            for search_params, cache_outcome in searches
+        ]
+        with self.__lock:
+            for increment, search_type, cache_outcome in increments:
+                if increment is not None:
+                    key, member, weight = increment
+                    score = self.__scores.get((key, member), 0)
+                    self.__scores[(key, member)] = score + weight
+                if cache_outcome is not None:  # Never sampled, the ratio stays exact
+                    field = f"{search_type}|{cache_outcome}"
+                    self.__outcomes[field] = self.__outcomes.get(field, 0) + 1
+        self.__start()
+
+    # Add the counts recorded since the last flush to Redis
+    # All of them or nothing is added (MULTI), what failed is added again next time
+    def flush(self):
+        with self.__lock:
+            scores, self.__scores = self.__scores, {}
+            outcomes, self.__outcomes = self.__outcomes, {}
+        if not scores and not outcomes:
+            return
+        pipeline = self.__redis_client.pipeline()
+        for (key, member), weight in scores.items():
+            pipeline.zincrby(key, weight, member)
+        for key in {key for key, _ in scores}:
+            # Kept while it is the previous era
+            pipeline.expire(key, 2 * self._era_length)
+        for field, count in outcomes.items():
+            pipeline.hincrby(GITHUB_SEARCH_CACHE_STATS_REDIS_KEY, field, count)
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            with self.__lock:
+                for search, weight in scores.items():
+                    self.__scores[search] = self.__scores.get(search, 0) + weight
+                for field, count in outcomes.items():
+                    self.__outcomes[field] = self.__outcomes.get(field, 0) + count
+            raise
+
+    # The `count` most popular searches with their score, most popular first
+    def top(self, count: int) -> List[Tuple[GitHubSearchParams, float]]:
+        self.flush()  # Include what this worker just counted
+        searches = self.__redis_client.zunion(self._union_weights(), withscores=True)
+        return [
+            (GitHubSearchParams.model_validate_json(member), score)
+            for member, score in reversed(searches[-count:] if count > 0 else [])
+        ]
+
+    # Cache lookup outcomes counted by search type, e.g. {"repo": {"hit": 3, ...}}
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        self.flush()  # Include what this worker just counted
+        stats = {}
+        counters = self.__redis_client.hgetall(GITHUB_SEARCH_CACHE_STATS_REDIS_KEY)
+        for field, count in counters.items():
+            search_type, outcome = field.decode().split("|")
+            stats.setdefault(search_type, dict.fromkeys(CACHE_OUTCOMES, 0))
+            stats[search_type][outcome] = int(count)
+        return stats
+
+    # Start counting the cache lookup outcomes from zero
+    def reset_cache_stats(self):
+        with self.__lock:
+            self.__outcomes = {}
+        self.__redis_client.delete(GITHUB_SEARCH_CACHE_STATS_REDIS_KEY)
+
+    # Start flushing in the background, once per process. A forked worker builds its
+    # own instance (see SingletonABCMeta), so it never flushes what its parent counted
+    def __start(self):
+        if self.__flusher is not None:
+            return
+        with self.__lock:
+            if self.__flusher is None:
+                self.__flusher = threading.Thread(
+                    target=self.__flush_forever, name="popularity-flush", daemon=True
+                )
+                self.__flusher.start()
+
+    def __flush_forever(self):
+        while True:
+            time.sleep(Config.SEARCH_POPULARITY_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:  # Kept and flushed with the next counts
+                logger.warning("Failed to flush search popularity: %r", e)
+
+
+class AsyncGitHubSearchPopularity(AbstractGlobalInstance):
+    # Asyncio counterpart of GitHubSearchPopularity. Recording only touches memory, so
+    # it shares the counts (and the flushing thread) of GitHubSearchPopularity
+    def __init__(self):
+        self.__popularity = GitHubSearchPopularity()
+
+    async def record(
+        self, search_params: GitHubSearchParams, cache_outcome: Optional[str] = None
+    ):
+        self.__popularity.record(search_params, cache_outcome)
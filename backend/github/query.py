@@ -0,0 +1,39 @@
+import re
+from functools import lru_cache
+
+# A search term, quoted parts included (e.g. "good first" or label:"help wanted")
+_TOKEN = re.compile(r'(?:"[^"]*"?|[^\s"]+)+')
+# A qualifier such as language:python or -user:octocat
+_QUALIFIER = re.compile(r"^(-?)([A-Za-z][\w-]*):(.+)$", re.DOTALL)
+# Boolean operators are case-sensitive and bind their neighbours
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+# Canonical form of a GitHub search query, queries with the same results share it
+# - whitespace is trimmed and collapsed (inside quoted phrases as well)
+# - terms are lower-cased, GitHub search is case-insensitive
+# - qualifiers are deduplicated and sorted after the free-text terms, their order
+#   doesn't matter to GitHub: "language:python django" is "django language:python"
+# Queries with boolean operators keep their order, reordering could change their meaning
+@lru_cache(maxsize=4096)
+def canonicalize_query(query: str) -> str:
+    tokens = [re.sub(r"\s+", " ", token) for token in _TOKEN.findall(query)]
+    if any(token in _OPERATORS for token in tokens):
+        return " ".join(
+            token if token in _OPERATORS else token.lower() for token in tokens
+        )
+
+    terms = []
+    qualifiers = set()
+    for token in tokens:
+        match = _QUALIFIER.match(token)
+        if match is None:
+            terms.append(token.lower())
+            continue
+        negation, name, value = match.groups()
+        qualifiers.add(f"{negation}{name.lower()}:{value.lower()}")
+    # Sort by qualifier name, a negated qualifier next to its positive form
+    return " ".join(
+        terms
+        + sorted(qualifiers, key=lambda qualifier: (qualifier.lstrip("-"), qualifier))
+    )
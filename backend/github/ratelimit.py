@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import time
+from typing import NamedTuple, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from config import Config
+from utils import AbstractGlobalInstance, LoopLocal
+from utils.exceptions import MaxRetryExceedException
+from utils.timing import span
+
+from .constants import GITHUB_RATE_LIMIT_REDIS_PREFIX
+from .metrics import GITHUB_API_MAX_RETRY_EXCEEDED
+
+# Take `cost` requests from the budget of a credential
+# Returns 0 when the request may be sent, or the milliseconds left until the reset.
+# A secondary rate limit (Retry-After) blocks every request until it ends, whatever
+# the budget. An unknown budget or a budget whose window is over lets the request
+# through, its response tells the new budget. A conditional request costs nothing
+# (GitHub doesn't count a 304), but still waits for an exhausted budget: it costs one
+# request when the results changed, which the budget of its response accounts for
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until'))
+if blocked_until ~= nil and blocked_until > now then
+    return blocked_until - now
+end
+local reset = tonumber(redis.call('HGET', KEYS[1], 'reset'))
+if reset == nil or reset <= now then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[1], 'remaining')) > 0 then
+    if cost > 0 then
+        redis.call('HINCRBY', KEYS[1], 'remaining', -cost)
+    end
+    return 0
+end
+return reset - now
+"""
+
+# Record the budget reported by a response (a reset of 0 when it reports none) and
+# the end of a secondary rate limit (0 when there is none)
+# Responses may arrive out of order: a later window replaces the budget, within the
+# same window the lowest remaining count wins, and older windows are ignored. The
+# latest end of a secondary rate limit wins, apart from the budget
+UPDATE_SCRIPT = """
+local remaining = tonumber(ARGV[1])
+local reset = tonumber(ARGV[2])
+local blocked_until = tonumber(ARGV[3])
+local updated = 0
+if blocked_until > 0 then
+    local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until'))
+    if current == nil or blocked_until > current then
+        redis.call('HSET', KEYS[1], 'blocked_until', blocked_until)
+        updated = 1
+    end
+end
+if reset > 0 then
+    local current_reset = tonumber(redis.call('HGET', KEYS[1], 'reset'))
+    if current_reset == nil or reset > current_reset then
+        redis.call('HSET', KEYS[1], 'remaining', remaining, 'reset', reset)
+        updated = 1
+    elseif reset == current_reset then
+        local current = tonumber(redis.call('HGET', KEYS[1], 'remaining'))
+        if remaining < current then
+            redis.call('HSET', KEYS[1], 'remaining', remaining)
+        end
+        updated = 1
+    end
+end
+if updated == 0 then
+    return 0
+end
+local ends = redis.call('HMGET', KEYS[1], 'reset', 'blocked_until')
+local expire_at = math.max(tonumber(ends[1]) or 0, tonumber(ends[2]) or 0)
+redis.call('PEXPIREAT', KEYS[1], expire_at + 1000)
+return 1
+"""
+
+
+class RateLimit(NamedTuple):
+    remaining: int
+    reset_ms: int  # Epoch time of the reset in milliseconds, 0 when not reported
+    # Epoch time (milliseconds) a secondary rate limit ends, 0 when there is none
+    blocked_until_ms: int = 0
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+# Read the budget left from the headers of a GitHub response, None without headers
+# A Retry-After (secondary rate limit) blocks every request until it has passed, it
+# is kept apart from the budget, which may reset before or after it
+def parse_rate_limit(headers) -> Optional[RateLimit]:
+    if not headers:
+        return None
+    try:
+        retry_after = headers.get("Retry-After")
+        blocked_until = 0
+        if retry_after is not None:
+            blocked_until = _now_ms() + int(retry_after) * 1000
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return RateLimit(0, 0, blocked_until) if blocked_until else None
+        return RateLimit(int(remaining), int(reset) * 1000, blocked_until)
+    except (TypeError, ValueError):  # Not sent by GitHub
+        return None
+
+
+# Seconds to wait before the budget reported by the headers is available again
+def rate_limit_wait(headers) -> Optional[float]:
+    rate_limit = parse_rate_limit(headers)
+    if rate_limit is None:
+        return None
+    available_at = rate_limit.blocked_until_ms
+    if rate_limit.reset_ms and rate_limit.remaining <= 0:
+        available_at = max(available_at, rate_limit.reset_ms)
+    if not available_at:
+        return None
+    return max(available_at - _now_ms(), 0) / 1000
+
+
+class BaseGitHubRateLimiter:
+    # Budget of GitHub API requests shared by every worker through Redis
+    # The budget is kept per credential and per GitHub rate limit resource (e.g. "search")
+    def __init__(self):
+        # Never store the token itself in Redis
+        credential = (
+            hashlib.sha256(Config.GITHUB_PAT.encode()).hexdigest()[:16]
+            if Config.GITHUB_PAT is not None
+            else "anonymous"
+        )
+        self._key_prefix = f"{GITHUB_RATE_LIMIT_REDIS_PREFIX}|{credential}"
+
+    def _format_key(self, resource):
+        return f"{self._key_prefix}|{resource}"
+
+    # Seconds to sleep for `wait_ms`, fail fast when the wait ends after the deadline
+    @staticmethod
+    def _check_deadline(wait_ms, deadline):
+        wait = wait_ms / 1000
+        if time.monotonic() + wait > deadline:
+            GITHUB_API_MAX_RETRY_EXCEEDED.inc(reason="budget")
+            raise MaxRetryExceedException()
+        return wait
+
+
+class GitHubRateLimiter(BaseGitHubRateLimiter, AbstractGlobalInstance):
+    def __init__(self):
+        super().__init__()
+        self.__redis_client = redis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        self.__acquire = self.__redis_client.register_script(ACQUIRE_SCRIPT)
+        self.__update = self.__redis_client.register_script(UPDATE_SCRIPT)
+
+    # Wait until the budget allows one more request
+    # Raises MaxRetryExceedException right away when the budget resets after `deadline`
+    # (time.monotonic), instead of holding the worker until then. A `conditional`
+    # request (If-None-Match) takes nothing from the budget, see ACQUIRE_SCRIPT
+    def acquire(
+        self,
+        resource="search",
+        deadline: Optional[float] = None,
+        conditional: bool = False,
+    ):
+        if deadline is None:
+            deadline = time.monotonic() + Config.GITHUB_RATE_LIMIT_DEADLINE
+        key = self._format_key(resource)
+        while True:
+            with span("redis"):
+                wait_ms = self.__acquire(
+                    keys=[key], args=[_now_ms(), 0 if conditional else 1]
+                )
+            if not wait_ms:
+                return
+            time.sleep(self._check_deadline(wait_ms, deadline))
+
+    # Requests left in the current window, None when unknown or when the window is over
+    def remaining(self, resource="search") -> Optional[int]:
+        remaining, reset = self.__redis_client.hmget(
+            self._format_key(resource), "remaining", "reset"
+        )
+        if remaining is None or reset is None or int(reset) <= _now_ms():
+            return None
+        return int(remaining)
+
+    # Record the budget reported by the headers of a GitHub response
+    def update(self, headers, resource="search"):
+        rate_limit = parse_rate_limit(headers)
+        if rate_limit is not None:
+            with span("redis"):
+                self.__update(keys=[self._format_key(resource)], args=[*rate_limit])
+
+
+class AsyncGitHubRateLimiter(BaseGitHubRateLimiter, AbstractGlobalInstance):
+    # Asyncio counterpart of GitHubRateLimiter, sharing the same budget
+    def __init__(self):
+        super().__init__()
+        # Connection pools are bound to the event loop that created them
+        self.__scripts = LoopLocal(self.__register_scripts)
+
+    async def acquire(
+        self,
+        resource="search",
+        deadline: Optional[float] = None,
+        conditional: bool = False,
+    ):
+        if deadline is None:
+            deadline = time.monotonic() + Config.GITHUB_RATE_LIMIT_DEADLINE
+        key = self._format_key(resource)
+        acquire_script, _ = self.__scripts.get()
+        while True:
+            with span("redis"):
+                wait_ms = await acquire_script(
+                    keys=[key], args=[_now_ms(), 0 if conditional else 1]
+                )
+            if not wait_ms:
+                return
+            await asyncio.sleep(self._check_deadline(wait_ms, deadline))
+
+    async def update(self, headers, resource="search"):
+        rate_limit = parse_rate_limit(headers)
+        if rate_limit is not None:
+            _, update_script = self.__scripts.get()
+            with span("redis"):
+                await update_script(
+                    keys=[self._format_key(resource)], args=[*rate_limit]
+                )
+
+    @staticmethod
+    def __register_scripts():
+        redis_client = aioredis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        return (
+            redis_client.register_script(ACQUIRE_SCRIPT),
+            redis_client.register_script(UPDATE_SCRIPT),
+        )
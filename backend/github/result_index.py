@@ -0,0 +1,105 @@
+import json
+from typing import Dict, List, Optional
+
+from pydantic_core import to_json
+
+from .schemas import (
+    RESULT_GROUP_FIELDS,
+    RESULT_SORT_FIELDS,
+    ResultSort,
+    SearchType,
+    SortOrder,
+)
+
+
+# Key of the index cached next to the results of `cache_key`
+def generate_index_key(cache_key: str):
+    return f"{cache_key}|INDEX"
+
+
+# Serialized index of the search results about to be cached
+def index_results(search_type: SearchType, items) -> bytes:
+    return SearchResultIndex.build(search_type, items).serialize()
+
+
+class SearchResultIndex:
+    # Sort orders and language groups of a cached result set, computed when it is cached
+    # Items are referred to by their position in the cached results array, so a sorted
+    # or filtered page is a slice of positions picked out of the cached lines, the
+    # results are never parsed
+    def __init__(
+        self,
+        count: int,
+        orders: Dict[str, List[int]],
+        groups: Dict[str, List[int]],
+    ):
+        self.count = count
+        self.orders = orders  # Positions by descending value, for every sort
+        self.groups = groups  # Positions in result order, by lower-cased value
+
+    @classmethod
+    def build(cls, search_type: SearchType, items):
+        builder = SearchResultIndexBuilder(search_type)
+        builder.add(items)
+        return builder.build()
+
+    def serialize(self) -> bytes:
+        return to_json(
+            {"count": self.count, "orders": self.orders, "groups": self.groups}
+        )
+
+    @classmethod
+    def deserialize(cls, data: bytes):
+        index = json.loads(data)
+        return cls(index["count"], index["orders"], index["groups"])
+
+    # Positions of the items in the group of `group` (every item when None), sorted by
+    # `sort` (the result order when None)
+    # Ascending orders are the descending ones reversed, ties included
+    def select(
+        self,
+        sort: Optional[ResultSort] = None,
+        order: SortOrder = SortOrder.DESC,
+        group: Optional[str] = None,
+    ) -> List[int]:
+        if sort is None:
+            positions = range(self.count)
+        else:
+            positions = self.orders.get(sort.value, [])
+            if order is SortOrder.ASC:
+                positions = positions[::-1]
+        if group is None:
+            return list(positions)
+        members = set(self.groups.get(group.lower(), []))
+        return [position for position in positions if position in members]
+
+
+class SearchResultIndexBuilder:
+    # Collect the sort keys and groups of the items while a result set is fetched,
+    # page by page, without keeping the items themselves
+    def __init__(self, search_type: SearchType):
+        self.__sort_fields = RESULT_SORT_FIELDS[search_type]
+        self.__group_field = RESULT_GROUP_FIELDS.get(search_type)
+        self.__sort_keys = {sort: [] for sort in self.__sort_fields}
+        self.__groups: Dict[str, List[int]] = {}
+        self.__count = 0
+
+    def add(self, items):
+        for item in items:
+            for sort, field in self.__sort_fields.items():
+                self.__sort_keys[sort].append(item.get(field))
+            group = None if self.__group_field is None else item.get(self.__group_field)
+            if group is not None:
+                self.__groups.setdefault(group.lower(), []).append(self.__count)
+            self.__count += 1
+
+    def build(self) -> SearchResultIndex:
+        orders = {}
+        for sort, keys in self.__sort_keys.items():
+            # Missing values last, ties keep the result order (the sort is stable)
+            orders[sort.value] = sorted(
+                range(self.__count),
+                key=lambda position: (keys[position] is not None, keys[position]),
+                reverse=True,
+            )
+        return SearchResultIndex(self.__count, orders, self.__groups)
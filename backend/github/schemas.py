@@ -1,8 +1,24 @@
 from enum import Enum
-from typing import List, Optional, Union
+from urllib.parse import urlencode
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
 from pydantic import BaseModel, Field, HttpUrl, model_validator
 from datetime import datetime
 
+from config import Config
+
+from .constants import GITHUB_SEARCH_RESULT_LIMIT
+from .query import canonicalize_query
+
 
 class SearchType(Enum):
     USER = "user"
@@ -10,15 +26,163 @@ class SearchType(Enum):
     ISSUE = "issue"
 
 
+class FieldProfile(Enum):
+    CARD = "card"  # The fields rendered by the frontend cards
+    FULL = "full"  # Every field returned by GitHub
+
+
+class ResultSort(Enum):
+    STARS = "stars"
+    FORKS = "forks"
+    UPDATED = "updated"
+
+
+class SortOrder(Enum):
+    DESC = "desc"
+    ASC = "asc"
+
+
 class GitHubSearchParams(BaseModel):
     type: SearchType
     keyword: str = Field(min_length=3)
+    # Projection of the result items: a named profile, or explicit (dotted) fields
+    profile: FieldProfile = FieldProfile.FULL
+    fields: Optional[List[str]] = Field(default=None, min_length=1)
 
     def model_dump(self, *args, **kwargs):
         org_data = super().model_dump(**kwargs)
         org_data["type"] = self.type.value
+        org_data["profile"] = self.profile.value
+        return org_data
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        item_model = SEARCH_ITEM_MODELS[self.type]
+        for field in self.fields or []:
+            if not is_model_field(item_model, field):
+                raise ValueError(
+                    f"Unknown field for {self.type.value} results: {field}"
+                )
+        return self
+
+    # Keyword sent to GitHub and used in the cache keys, see canonicalize_query
+    def canonical_keyword(self):
+        return canonicalize_query(self.keyword)
+
+    # Pydantic `include` spec selecting the item fields, None when every field is kept
+    # Explicit fields take precedence over the profile
+    def item_include(self):
+        if self.fields:
+            include = {}
+            for field in self.fields:
+                node = include
+                *parents, leaf = field.split(".")
+                for parent in parents:
+                    node = node.setdefault(parent, {})
+                    if node is True:  # The whole parent is already included
+                        break
+                else:
+                    node[leaf] = True
+            return include
+        return FIELD_PROFILES.get(self.profile, {}).get(self.type)
+
+    # Search from the query string of a GET search, `fields` is comma-separated
+    @classmethod
+    def from_query_params(cls, query_params):
+        data = query_params.dict()  # The last value of a repeated parameter
+        if "fields" in data:
+            data["fields"] = [field for field in data["fields"].split(",") if field]
+        return cls(**data)
+
+    # Query string of the GET search URL, searches with the same results share it so
+    # HTTP caches store them once. Parameters have a fixed order, the keyword is
+    # canonical and the projection is only given when it drops fields
+    def canonical_query_string(self):
+        query = {"type": self.type.value, "keyword": self.canonical_keyword()}
+        if self.fields:
+            query["fields"] = ",".join(sorted(set(self.fields)))
+        elif self.item_include() is not None:
+            query["profile"] = self.profile.value
+        return urlencode(query)
+
+    # Suffix of the cache key identifying the projection, empty for every field
+    def projection_key(self):
+        if self.fields:
+            return "fields=" + ",".join(sorted(set(self.fields)))
+        if self.item_include() is None:
+            return ""
+        return f"profile={self.profile.value}"
+
+
+class GitHubSearchPageParams(GitHubSearchParams):
+    page: int = Field(default=1, ge=1)
+    page_size: int = Field(default=30, ge=1, le=100)
+
+    @model_validator(mode="after")
+    def check_result_limit(self):
+        # GitHub only serves the first 1000 results, a page past them is always empty
+        if (self.page - 1) * self.page_size >= GITHUB_SEARCH_RESULT_LIMIT:
+            raise ValueError(
+                f"Only the first {GITHUB_SEARCH_RESULT_LIMIT} search results are available"
+            )
+        return self
+
+
+class GitHubSearchResultsParams(GitHubSearchPageParams):
+    # A page of the cached results of a search, sorted and filtered by the backend
+    sort: Optional[ResultSort] = None  # GitHub's best match order by default
+    order: SortOrder = SortOrder.DESC
+    language: Optional[str] = Field(default=None, min_length=1)
+
+    def model_dump(self, *args, **kwargs):
+        org_data = super().model_dump(**kwargs)
+        org_data["sort"] = None if self.sort is None else self.sort.value
+        org_data["order"] = self.order.value
         return org_data
 
+    @model_validator(mode="after")
+    def check_index_fields(self):
+        # The results can only be sorted and grouped by fields they are cached with
+        include = self.item_include()
+        fields = []
+        if self.sort is not None:
+            if self.sort not in RESULT_SORT_FIELDS[self.type]:
+                raise ValueError(
+                    f"{self.type.value} results can't be sorted by {self.sort.value}"
+                )
+            fields.append(RESULT_SORT_FIELDS[self.type][self.sort])
+        if self.language is not None:
+            if self.type not in RESULT_GROUP_FIELDS:
+                raise ValueError(
+                    f"{self.type.value} results can't be filtered by language"
+                )
+            fields.append(RESULT_GROUP_FIELDS[self.type])
+        for field in fields:
+            if include is not None and field not in include:
+                raise ValueError(f"The projected results don't include {field}")
+        return self
+
+    # The search the results come from
+    def search_params(self):
+        return GitHubSearchParams(
+            type=self.type,
+            keyword=self.keyword,
+            profile=self.profile,
+            fields=self.fields,
+        )
+
+
+# Envelope of a batch of searches, each search is validated on its own with
+# GitHubSearchParams so an invalid one doesn't reject the others
+class GitHubSearchBatchParams(BaseModel):
+    searches: List[Any] = Field(
+        min_length=1, max_length=Config.GITHUB_SEARCH_BATCH_LIMIT
+    )
+
+
+class GitHubClearCacheParams(BaseModel):
+    type: Optional[SearchType] = None  # Every search type when omitted
+
 
 class License(BaseModel):
     key: str
@@ -133,6 +297,137 @@ class Repository(BaseModel):
     score: float
 
 
+class Label(BaseModel):
+    id: int
+    node_id: str
+    url: HttpUrl
+    name: str
+    color: str
+    default: bool
+    description: Optional[str] = None
+
+
+class Issue(BaseModel):
+    url: HttpUrl
+    repository_url: HttpUrl
+    labels_url: str
+    comments_url: HttpUrl
+    events_url: HttpUrl
+    html_url: HttpUrl
+    id: int
+    node_id: str
+    number: int
+    title: str
+    user: User
+    labels: List[Label] = []
+    state: str
+    locked: bool
+    assignee: Optional[User] = None
+    assignees: List[User] = []
+    comments: int
+    created_at: datetime
+    updated_at: datetime
+    closed_at: Optional[datetime] = None
+    author_association: str
+    body: Optional[str] = None
+    draft: Optional[bool] = None
+    score: float
+
+
+# Item model of each search type
+SEARCH_ITEM_MODELS: Dict[SearchType, type] = {
+    SearchType.USER: User,
+    SearchType.REPO: Repository,
+    SearchType.ISSUE: Issue,
+}
+
+# Fields kept by each named profile, a missing entry keeps every field
+FIELD_PROFILES: Dict[FieldProfile, Dict[SearchType, dict]] = {
+    FieldProfile.CARD: {
+        SearchType.USER: {
+            "id": True,
+            "login": True,
+            "avatar_url": True,
+            "html_url": True,
+            "type": True,
+        },
+        SearchType.REPO: {
+            "id": True,
+            "name": True,
+            "full_name": True,
+            "html_url": True,
+            "description": True,
+            "language": True,
+            "stargazers_count": True,
+            "watchers_count": True,
+            "forks_count": True,
+            "open_issues_count": True,
+            "owner": {"id": True, "login": True, "avatar_url": True, "html_url": True},
+        },
+        SearchType.ISSUE: {
+            "id": True,
+            "number": True,
+            "title": True,
+            "html_url": True,
+            "state": True,
+            "comments": True,
+            "created_at": True,
+            "user": {"id": True, "login": True, "avatar_url": True, "html_url": True},
+        },
+    },
+}
+
+
+# Item fields the cached results can be sorted by, see github/result_index.py
+RESULT_SORT_FIELDS: Dict[SearchType, Dict[ResultSort, str]] = {
+    SearchType.USER: {},
+    SearchType.REPO: {
+        ResultSort.STARS: "stargazers_count",
+        ResultSort.FORKS: "forks_count",
+        ResultSort.UPDATED: "updated_at",
+    },
+    SearchType.ISSUE: {ResultSort.UPDATED: "updated_at"},
+}
+# Item field the cached results are grouped by, for the language filter
+RESULT_GROUP_FIELDS: Dict[SearchType, str] = {SearchType.REPO: "language"}
+
+
+# Model of the object held by a field (e.g. Optional[User]), None when it holds
+# something else, a list included (its items can't be projected field by field)
+def _nested_model(annotation) -> Optional[type]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return _nested_model(args[0])
+    return None
+
+
+# Whether `field` is a field of `model`, dotted paths (e.g. owner.login) included
+def is_model_field(model: type, field: str) -> bool:
+    name, dot, nested_field = field.partition(".")
+    if name not in model.model_fields:
+        return False
+    if not dot:
+        return True
+    nested_model = _nested_model(model.model_fields[name].annotation)
+    return nested_model is not None and is_model_field(nested_model, nested_field)
+
+
+# Keep only the included fields of a JSON item, `include` is a pydantic include spec
+def project_item(item: dict, include: dict):
+    projected = {}
+    for field, nested in include.items():
+        if field not in item:
+            continue
+        value = item[field]
+        if nested is not True and isinstance(value, dict):
+            value = project_item(value, nested)
+        projected[field] = value
+    return projected
+
+
 class GitHubSearchResponse(BaseModel):
     total_count: int
     incomplete_results: bool
@@ -155,3 +450,13 @@ class GitHubSearchResponse(BaseModel):
                     parsed_items.append(User(**item))
         input_data["items"] = parsed_items
         return input_data
+
+
+SearchItem = TypeVar("SearchItem", User, Repository, Issue)
+
+
+# Response of a GitHub search endpoint whose item type is known from the search type
+class GitHubSearchPage(BaseModel, Generic[SearchItem]):
+    total_count: int
+    incomplete_results: bool
+    items: List[SearchItem]
@@ -1,41 +1,164 @@
+import asyncio
+import inspect
 import json
+import logging
 import math
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
-from typing import Dict
+from typing import Dict, List, NamedTuple, Optional, Union
 
 import redis
+from aiohttp import ClientResponseError
+from pydantic_core import to_json
+from redis.exceptions import LockError
 import requests
 from requests.exceptions import HTTPError
+from rest_framework.status import HTTP_304_NOT_MODIFIED
 
 from config import Config
 from utils.exceptions import MaxRetryExceedException
-from utils import AbstractGlobalInstance
+from utils import AbstractGlobalInstance, SingleFlight, TTLLRUCache, codec
+from utils.timing import ContextThreadPoolExecutor, span
 
+from .client import GitHubClient
 from .constants import (
     GITHUB_RATE_LIMIT_ERROR_REASON,
+    GITHUB_SEARCH_L1_INVALIDATION_CHANNEL,
     GITHUB_SEARCH_RESULT_LIMIT,
     GITHUB_SEARCH_REDIS_CACHE_PREFIX,
 )
-from .schemas import GitHubSearchParams, GitHubSearchResponse, SearchType
+from .parsers import get_parser
+from .generations import GitHubSearchCacheGenerations
+from .metrics import (
+    GITHUB_API_BACKOFF_SECONDS,
+    GITHUB_API_MAX_RETRY_EXCEEDED,
+    GITHUB_API_RESPONSE_BYTES,
+    GITHUB_API_RETRIES,
+    SEARCH_CACHE_LOOKUPS,
+    SEARCH_CACHE_PAYLOAD_BYTES,
+    SEARCH_CACHE_SECONDS,
+    observe_github_request,
+)
+from .popularity import GitHubSearchPopularity
+from .ratelimit import GitHubRateLimiter, rate_limit_wait
+from .result_index import (
+    SearchResultIndex,
+    SearchResultIndexBuilder,
+    generate_index_key,
+    index_results,
+)
+from .schemas import (
+    GitHubSearchPageParams,
+    GitHubSearchParams,
+    GitHubSearchResultsParams,
+    SearchType,
+    project_item,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Failures of a page after the first one that leave out its results instead of failing
+# the search: the rate limit budget ran out, or GitHub couldn't be reached in time.
+# Any other error response (e.g. 401, 422, 500) fails the search
+PAGE_FETCH_ERRORS = (
+    MaxRetryExceedException,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+# Headers of the response of a failed GitHub API call
+def get_error_headers(e: Exception):
+    if isinstance(e, HTTPError):
+        return e.response.headers
+    if isinstance(e, ClientResponseError):
+        return e.headers
+    return None
+
 
+# Check whether a failed GitHub API call was rejected by the rate limit
+# Handles both the sync (requests) and the async (aiohttp) HTTP errors
+def is_rate_limit_error(e: Exception):
+    if isinstance(e, HTTPError):
+        status, reason = e.response.status_code, e.response.reason
+    elif isinstance(e, ClientResponseError):
+        status, reason = e.status, e.message
+    else:
+        return False
+    if status == 429 or reason == GITHUB_RATE_LIMIT_ERROR_REASON:
+        return True
+    # Primary and secondary rate limits are also answered with a plain 403
+    return status == 403 and rate_limit_wait(get_error_headers(e)) is not None
 
-# Decorator to implement exponential backoff for retrying GitHub API calls in case of rate-limiting errors
+
+# Seconds to wait before retrying after a rate limit error, and the next penalty
+# Waits until the reset announced by GitHub, or backs off exponentially without it
+def get_backoff_wait(e: Exception, penalty, max_penalty):
+    wait = rate_limit_wait(get_error_headers(e))
+    if wait is not None:
+        return wait, penalty
+    return penalty, min(penalty * 2, max_penalty)
+
+
+# Count a retry of a rate-limited request, after waiting `wait` seconds
+def record_backoff(wait: float):
+    GITHUB_API_RETRIES.inc()
+    GITHUB_API_BACKOFF_SECONDS.inc(wait)
+
+
+# Decorator to implement backoff for retrying GitHub API calls in case of rate-limiting errors
+# Retries wait until the reset announced by GitHub (exponential backoff without it), and
+# give up right away when the wait would go past GITHUB_RATE_LIMIT_DEADLINE
+# Coroutine functions are retried with asyncio.sleep so the event loop is never blocked
 def github_search_backoff(max_retry: int = 10, max_penalty=50):
     def real_decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                deadline = time.monotonic() + Config.GITHUB_RATE_LIMIT_DEADLINE
+                penalty = 1  # Start with a 1 second delay
+                for _ in range(max_retry):  # Retry loop
+                    try:
+                        return await func(*args, **kwargs)
+                    except ClientResponseError as e:
+                        # Only retry for rate-limit errors, raise other exceptions
+                        if not is_rate_limit_error(e):
+                            raise
+                        wait, penalty = get_backoff_wait(e, penalty, max_penalty)
+                        if time.monotonic() + wait > deadline:
+                            GITHUB_API_MAX_RETRY_EXCEEDED.inc(reason="deadline")
+                            raise MaxRetryExceedException()
+                        record_backoff(wait)
+                        await asyncio.sleep(wait)  # Wait without blocking the loop
+                GITHUB_API_MAX_RETRY_EXCEEDED.inc(reason="retries")
+                raise MaxRetryExceedException()
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
+            deadline = time.monotonic() + Config.GITHUB_RATE_LIMIT_DEADLINE
             penalty = 1  # Start with a 1 second delay
             for _ in range(max_retry):  # Retry loop
                 try:
                     return func(*args, **kwargs)
                 except HTTPError as e:
                     # Only retry for rate-limit errors, raise other exceptions
-                    if e.response.reason != GITHUB_RATE_LIMIT_ERROR_REASON:
+                    if not is_rate_limit_error(e):
                         raise
-                    time.sleep(penalty)  # Wait before retrying
-                    penalty *= 2  # Exponentially increase wait time
-                    penalty = min(penalty, max_penalty)  # Cap the maximum penalty
+                    wait, penalty = get_backoff_wait(e, penalty, max_penalty)
+                    if time.monotonic() + wait > deadline:  # Don't hold the worker
+                        GITHUB_API_MAX_RETRY_EXCEEDED.inc(reason="deadline")
+                        raise MaxRetryExceedException()
+                    record_backoff(wait)
+                    time.sleep(wait)  # Wait before retrying
+            GITHUB_API_MAX_RETRY_EXCEEDED.inc(reason="retries")
             raise MaxRetryExceedException()  # Raise exception if max retries exceeded
 
         return wrapper
@@ -43,8 +166,86 @@ def github_search_backoff(max_retry: int = 10, max_penalty=50):
     return real_decorator
 
 
+class CacheEntry(NamedTuple):
+    data: bytes  # Serialized JSON
+    is_stale: bool  # Past its fresh period, still served while it is refreshed
+    ttl_ms: Optional[int] = None  # Left on the Redis entry, None when it has no expiry
+
+
+# Outcome of a cache lookup counted for the hit ratio, see GitHubSearchPopularity
+def get_cache_outcome(entry: Optional[CacheEntry]) -> str:
+    if entry is None:
+        return "miss"
+    return "stale" if entry.is_stale else "hit"
+
+
+# Serialize search results as a JSON array holding one item per line
+# The payload is valid JSON, and can be streamed as NDJSON without being parsed
+def serialize_results(items) -> bytes:
+    return join_result_lines([to_json(item) for item in items])
+
+
+# JSON array of items that are already serialized, one item per line
+def join_result_lines(lines) -> bytes:
+    if not lines:
+        return b"[]"
+    return b"[\n" + b",\n".join(lines) + b"\n]"
+
+
+# Serialized items of a JSON array of search results, one per item
+def split_result_lines(payload: bytes):
+    if payload.startswith(b"[\n"):
+        return [line.rstrip(b",") for line in payload.split(b"\n")[1:-1]]
+    # Entries cached before this format aren't split by item, parse them once
+    return [to_json(item) for item in json.loads(payload)]
+
+
+# Key of the ETags of the GitHub pages a result cached under `cache_key` was built from
+def generate_etags_key(cache_key: str):
+    return f"{cache_key}|ETAGS"
+
+
+# Combine the pages of a revalidated result with the cached result
+# `pages` holds None for the pages GitHub reported as not modified, their lines are taken
+# from `cached` and the other pages replace theirs. Returns the results, their index and
+# ETags, or None when the number of pages changed and the result has to be fetched again
+def merge_revalidated_pages(
+    search_type: SearchType, cached: bytes, pages, etags, page_size: int
+):
+    changed_page = next(page for page in pages if page is not None)
+    number_of_result = min(changed_page.total_count, GITHUB_SEARCH_RESULT_LIMIT)
+    if math.ceil(number_of_result / page_size) != len(pages):
+        return None
+
+    cached_lines = split_result_lines(cached)
+    lines = []
+    index = SearchResultIndexBuilder(search_type)
+    merged_etags = []
+    for number, (page, etag) in enumerate(zip(pages, etags)):
+        if page is None:
+            page_lines = cached_lines[
+                slice(number * page_size, (number + 1) * page_size)
+            ]
+            index.add(json.loads(line) for line in page_lines)
+        else:
+            page_lines = [to_json(item) for item in page.items]
+            index.add(page.items)
+            etag = page.etag
+        lines.extend(page_lines)
+        merged_etags.append(etag)
+    return join_result_lines(lines), index.build().serialize(), merged_etags
+
+
+# Stream serialized search results as NDJSON, `chunk_size` items per chunk
+def iter_ndjson(payload: bytes, chunk_size: int = 100):
+    lines = split_result_lines(payload)
+    for start in range(0, len(lines), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        yield b"".join(line + b"\n" for line in lines[chunk])
+
+
 class GitHubSearchService(AbstractGlobalInstance):
-    BASE_API = "https://api.github.com"
+    BASE_API = Config.GITHUB_API_URL
     # Mapping between search types and corresponding GitHub API endpoints
     SEARCH_TYPE_API_MAP: Dict[SearchType, str] = {
         SearchType.USER: "/search/users",
@@ -57,90 +258,466 @@ class GitHubSearchService(AbstractGlobalInstance):
         self.__cache = (
             GitHubSearchCacheService()
         )  # Cache service to store search results
-        self.__session = requests.Session()  # Create a persistent HTTP session
-        if Config.GITHUB_PAT is not None:  # Use personal access token if available
-            self.__session.headers.update(
-                {
-                    "Authorization": f"Bearer {Config.GITHUB_PAT}",
-                },
-            )
+        # Pooled keep-alive connections to GitHub, a session per thread
+        self.__client = GitHubClient(headers=self.__auth_headers())
+        # Request budget shared with every worker, read from GitHub's rate limit headers
+        self.__rate_limiter = GitHubRateLimiter()
+        # Bounded pool used to fetch the remaining search pages in parallel
+        # Pages are fetched in the context of the request, for its timings
+        self.__executor = ContextThreadPoolExecutor(
+            max_workers=Config.GITHUB_SEARCH_CONCURRENCY,
+            thread_name_prefix="github-search",
+        )
+        # Concurrent cache misses for the same key share a single fetch
+        self.__single_flight = SingleFlight()
+        # Stale results are refreshed one at a time, behind the searches waiting on GitHub
+        self.__refresh_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="github-search-refresh"
+        )
+        self.__refreshing = set()  # Keys with a refresh scheduled in this worker
+        self.__refreshing_lock = threading.Lock()
+        # Decayed search counts, read by the cache warmer
+        self.__popularity = GitHubSearchPopularity()
+        # Searches of a batch missing from the cache, fetched in parallel. Kept apart from
+        # the page pool, the searches wait on the pages they submit there
+        self.__batch_executor = ContextThreadPoolExecutor(
+            max_workers=Config.GITHUB_SEARCH_BATCH_CONCURRENCY,
+            thread_name_prefix="github-search-batch",
+        )
+
+    @staticmethod
+    def __auth_headers():
+        if Config.GITHUB_PAT is None:
+            return {}
+        return {"Authorization": f"Bearer {Config.GITHUB_PAT}"}  # Personal access token
 
     # Main search method that retrieves results from cache or fetches fresh data from GitHub API
     def search(self, search_params: GitHubSearchParams):
+        return json.loads(self.search_raw(search_params))
+
+    # Same as search, but returns the results serialized as a JSON array
+    # A cache hit returns the stored bytes as they are, without parsing them
+    def search_raw(self, search_params: GitHubSearchParams) -> bytes:
+        cache_key = self.generate_cache_key(search_params)
+        entry = self.__get_cached(search_params, cache_key)  # Check the cache
+        self.__popularity.record(search_params, get_cache_outcome(entry))
+        if entry is not None:
+            return entry.data
+
+        # Perform search if not cached, later callers in this process wait for it
+        return self.__single_flight.do(
+            cache_key, self.__search_and_cache, search_params, cache_key
+        )
+
+    # Same as search_raw, but returns the cache entry of the results, which tells how long
+    # they stay cached, e.g. for HTTP caching. Results that couldn't be cached (a page
+    # failed) have no TTL
+    def search_entry(self, search_params: GitHubSearchParams) -> CacheEntry:
+        cache_key = self.generate_cache_key(search_params)
+        entry = self.__get_cached(search_params, cache_key)
+        self.__popularity.record(search_params, get_cache_outcome(entry))
+        if entry is not None:
+            return entry
+
+        data = self.__single_flight.do(
+            cache_key, self.__search_and_cache, search_params, cache_key
+        )
+        ttl_ms = self.__cache.get_ttl(cache_key)
+        return CacheEntry(data, False, ttl_ms if ttl_ms >= 0 else None)
+
+    # Results of several searches, in the same order, as search_raw would return them
+    # Every cache lookup is made in one round-trip, and the missing searches are fetched
+    # in parallel, sharing the rate limit budget like any search. A failed search doesn't
+    # fail the others, its exception is returned in place of its results
+    def search_many(
+        self, searches: List[GitHubSearchParams]
+    ) -> List[Union[bytes, Exception]]:
+        cache_keys = [
+            self.generate_cache_key(search_params) for search_params in searches
+        ]
+        entries = self.__cache.get_entries(cache_keys)
+        self.__popularity.record_many(
+            [
+                (search_params, get_cache_outcome(entry))
+                for search_params, entry in zip(searches, entries)
+            ]
+        )
+
+        futures = {}
+        for search_params, cache_key, entry in zip(searches, cache_keys, entries):
+            if entry is None:
+                if cache_key not in futures:  # Searched once however often it's asked
+                    futures[cache_key] = self.__batch_executor.submit(
+                        self.__single_flight.do,
+                        cache_key,
+                        self.__search_and_cache,
+                        search_params,
+                        cache_key,
+                    )
+            elif entry.is_stale:
+                self.__refresh_in_background(search_params, cache_key)
+
+        results = []
+        for cache_key, entry in zip(cache_keys, entries):
+            if entry is not None:
+                results.append(entry.data)
+                continue
+            try:
+                results.append(futures[cache_key].result())
+            except Exception as e:  # Returned with its search, the others go on
+                logger.warning("Failed to search %s: %r", cache_key, e)
+                results.append(e)
+        return results
+
+    # Cached entry of a search, a stale entry is returned and refreshed in the background
+    def __get_cached(self, search_params: GitHubSearchParams, cache_key: str):
+        entry = self.__cache.get_entry(cache_key)
+        if entry is not None and entry.is_stale:
+            self.__refresh_in_background(search_params, cache_key)
+        return entry
+
+    # Schedule the refresh of a stale result, unless this worker already did
+    def __refresh_in_background(self, search_params: GitHubSearchParams, cache_key):
+        with self.__refreshing_lock:
+            if cache_key in self.__refreshing:
+                return
+            self.__refreshing.add(cache_key)
+        self.__refresh_executor.submit(self.__refresh, search_params, cache_key)
+
+    def __refresh(self, search_params: GitHubSearchParams, cache_key: str):
+        try:
+            self.refresh(search_params, min_ttl=Config.CACHE_STALE_TTL)
+        except Exception as e:  # The stale result is served until the next attempt
+            logger.warning("Failed to refresh search %s: %r", cache_key, e)
+        finally:
+            with self.__refreshing_lock:
+                self.__refreshing.discard(cache_key)
+
+    # Fetch and cache the result of a search, unless its cached result has more than
+    # `min_ttl` seconds left (e.g. a stale result is refreshed with CACHE_STALE_TTL)
+    # Only the worker holding the lock of the key refreshes it, the others skip it.
+    # Returns whether a new result was stored
+    def refresh(self, search_params: GitHubSearchParams, min_ttl: float) -> bool:
+        cache_key = self.generate_cache_key(search_params)
+        with self.__cache.lock(cache_key, blocking=False) as acquired:
+            if not acquired:
+                return False
+            # Checked under the lock, another worker may have refreshed it already
+            if self.__cache.get_ttl(cache_key) > min_ttl * 1000:
+                return False
+            if self.__revalidate(search_params, cache_key):
+                return True
+            search_result, is_complete, etags = self.__search_engine(search_params)
+            if is_complete:
+                self.__cache.store_cache_raw(
+                    cache_key,
+                    serialize_results(search_result),
+                    index=index_results(search_params.type, search_result),
+                    etags=etags,
+                )
+            return is_complete
+
+    # Ask GitHub whether the pages of a cached result changed, with their ETags
+    # (If-None-Match). When none did, the cached result is kept for another expiry
+    # without being read nor parsed. Otherwise the pages that changed replace theirs.
+    # Returns whether the cached result is up to date, False when it has to be fetched
+    def __revalidate(self, search_params: GitHubSearchParams, cache_key: str):
+        etags = self.__cache.get_etags(cache_key)
+        if not etags:  # Cached without ETags
+            return False
+        include = search_params.item_include()
+        futures = [
+            self.__executor.submit(
+                self.__fetch_page, search_params, page, include, etag
+            )
+            for page, etag in enumerate(etags, start=1)
+        ]
+        pages = [future.result() for future in futures]
+        if all(page is None for page in pages):  # Nothing changed
+            return self.__cache.extend_cache(cache_key)
+
+        cached = self.__cache.get_cache_raw(cache_key)
+        merged = cached and merge_revalidated_pages(
+            search_params.type, cached, pages, etags, self.PAGE_SIZE
+        )
+        if not merged:
+            return False
+        data, index, etags = merged
+        self.__cache.store_cache_raw(cache_key, data, index=index, etags=etags)
+        return True
+
+    # Fetch and cache a search result while holding the Redis lock on its key
+    # Workers waiting for the lock pick the result up from the cache instead of fetching
+    def __search_and_cache(self, search_params: GitHubSearchParams, cache_key: str):
+        with self.__cache.lock(cache_key):
+            # Another worker may have stored the result while we were waiting
+            cache_data = self.__cache.get_cache_raw(cache_key)
+            if cache_data is not None:
+                return cache_data
+
+            search_result, is_complete, etags = self.__search_engine(search_params)
+            serialized_result = serialize_results(search_result)
+            # Only cache complete results, so a failed page is retried on the next search
+            if is_complete:
+                self.__cache.store_cache_raw(
+                    cache_key,
+                    serialized_result,
+                    index=index_results(search_params.type, search_result),
+                    etags=etags,
+                )
+
+            return serialized_result
+
+    # Stream the results as NDJSON chunks, a page of items is sent as soon as it is parsed
+    # A cached result is streamed from its serialized form, without parsing it
+    def search_stream(self, search_params: GitHubSearchParams):
         cache_key = self.generate_cache_key(search_params)
-        cache_data = self.__cache.get_cache(cache_key)  # Check if result is cached
-        if cache_data is not None:
-            return cache_data
+        entry = self.__get_cached(search_params, cache_key)
+        self.__popularity.record(search_params, get_cache_outcome(entry))
+        if entry is None:
+            yield from self.__stream_and_cache(search_params, cache_key)
+            return
+        yield from iter_ndjson(entry.data, self.PAGE_SIZE)
+
+    # Stream the pages while they are fetched, and cache the complete result
+    # Only the serialized lines are kept for the cache write, never the parsed pages
+    def __stream_and_cache(self, search_params: GitHubSearchParams, cache_key: str):
+        with self.__cache.lock(cache_key):
+            # Another worker may have stored the result while we were waiting
+            cache_data = self.__cache.get_cache_raw(cache_key)
+            if cache_data is not None:
+                yield from iter_ndjson(cache_data, self.PAGE_SIZE)
+                return
+
+            lines = []
+            index = SearchResultIndexBuilder(search_params.type)
+            etags = []
+            is_complete = True
+            for chunk in self.__fetch_all(search_params):
+                if chunk is None:  # The page failed, keep streaming the others
+                    is_complete = False
+                    continue
+                chunk_lines = [to_json(item) for item in chunk.items]
+                lines.extend(chunk_lines)
+                index.add(chunk.items)
+                etags.append(chunk.etag)
+                yield b"".join(line + b"\n" for line in chunk_lines)
+
+            # Only cache complete results, so a failed page is retried on the next search
+            if is_complete:
+                self.__cache.store_cache_raw(
+                    cache_key,
+                    join_result_lines(lines),
+                    index=index.build().serialize(),
+                    etags=etags,
+                )
 
-        search_result = self.__search_engine(
-            search_params,
-        )  # Perform search if not cached
-        self.__cache.store_cache(cache_key, search_result)  # Cache the new result
+    # Paginated search that only fetches the GitHub pages covering the requested window
+    # Every 100-item GitHub page is cached on its own, any client page size is sliced from them
+    def search_page(self, search_params: GitHubSearchPageParams):
+        start = (search_params.page - 1) * search_params.page_size
+        end = min(start + search_params.page_size, GITHUB_SEARCH_RESULT_LIMIT)
+        pages = range(start // self.PAGE_SIZE + 1, (end - 1) // self.PAGE_SIZE + 2)
+        cache_keys = [
+            self.generate_cache_key_for_page(search_params, page) for page in pages
+        ]
+        page_contents = dict(
+            zip(pages, self.__cache.get_cache_many(cache_keys))
+        )  # One round-trip for every cached page
 
-        return search_result
+        # Fetch the missing pages in parallel and cache each of them
+        futures = {
+            page: self.__executor.submit(self.__fetch_page, search_params, page)
+            for page, content in page_contents.items()
+            if content is None
+        }
+        fetched_pages = {}
+        for page, future in futures.items():
+            fetched_page = future.result()
+            page_contents[page] = {
+                "total_count": fetched_page.total_count,
+                "items": fetched_page.items,
+            }
+            fetched_pages[self.generate_cache_key_for_page(search_params, page)] = (
+                page_contents[page]
+            )
+        if fetched_pages:
+            self.__cache.store_cache_many(fetched_pages)
+
+        # Slice the requested window out of the covering GitHub pages
+        items = [item for page in pages for item in page_contents[page]["items"]]
+        offset = start - (pages[0] - 1) * self.PAGE_SIZE
+        window = slice(offset, offset + end - start)
+        results = items[window]
+        # GitHub pages are cached with every field, project only the returned window
+        include = search_params.item_include()
+        if include is not None:
+            results = [project_item(item, include) for item in results]
+        total_count = page_contents[pages[0]]["total_count"]
+        return {
+            "results": results,
+            "total_count": total_count,
+            "has_next": end < min(total_count, GITHUB_SEARCH_RESULT_LIMIT),
+        }
+
+    # Sorted and filtered page of the cached results of a search, no GitHub request is
+    # made once they are cached. The sort orders and language groups are precomputed
+    # when the results are cached (see SearchResultIndex), so the page is a slice of
+    # the cached lines, the results are never parsed
+    def search_results(self, search_params: GitHubSearchResultsParams):
+        cache_key = self.generate_cache_key(search_params)
+        data, index = self.__cache.get_cache_raw_many(
+            [cache_key, generate_index_key(cache_key)]
+        )  # One round-trip for both
+        if data is None:  # Search first, the results are cached with their index
+            data = self.search_raw(search_params.search_params())
+            index = None
+        lines = split_result_lines(data)
+        if index is not None:
+            index = SearchResultIndex.deserialize(index)
+        # Just searched, cached without index, or an index of another version of the
+        # results: they are read apart, a worker may have refreshed one of them since
+        # (or L1 kept the index and evicted the results)
+        if index is None or index.count != len(lines):
+            index = SearchResultIndex.build(search_params.type, json.loads(data))
 
-    # Method to clear all cached data
-    def clear_cache(self):
-        self.__cache.clear_all_cache()
+        positions = index.select(
+            search_params.sort, search_params.order, search_params.language
+        )
+        start = (search_params.page - 1) * search_params.page_size
+        window = slice(start, start + search_params.page_size)
+        return {
+            "results": join_result_lines(
+                [lines[position] for position in positions[window]]
+            ),
+            "total_count": len(positions),
+            "has_next": window.stop < len(positions),
+        }
+
+    # Open the connections of a search ahead of the first one: a connection of the
+    # Redis pool, and a keep-alive connection to GitHub (TCP and TLS) per page
+    # fetched in parallel, opened in parallel so each one is kept by the session
+    def warm_up(self):
+        self.__cache.ping()
+        futures = [
+            self.__executor.submit(
+                self.__client.head, self.BASE_API, timeout=Config.WARM_UP_TIMEOUT
+            )
+            for _ in range(Config.GITHUB_SEARCH_CONCURRENCY)
+        ]
+        for future in futures:
+            future.result()
+
+    # Method to clear all cached data (optional: only the results of a search type)
+    def clear_cache(self, search_type: Optional[SearchType] = None):
+        self.__cache.clear_all_cache(search_type)
 
     # Core search engine method that fetches data from GitHub API and combines paginated results
+    # Returns the combined items, whether every page was fetched successfully and the
+    # ETags of the pages
     def __search_engine(
         self,
         search_params: GitHubSearchParams,
     ):
         search_results = []
+        etags = []
+        is_complete = True
         # Fetch and append all search results (paginated)
         for chunk in self.__fetch_all(search_params):
-            search_results.extend(chunk.model_dump(mode="json")["items"])
-        return search_results
+            if chunk is None:  # The page failed, keep the pages that succeeded
+                is_complete = False
+                continue
+            search_results.extend(chunk.items)
+            etags.append(chunk.etag)
+        return search_results, is_complete, etags
 
     # Fetch all pages for the search query
+    # Pages are yielded in page order, a page that failed (see PAGE_FETCH_ERRORS) is
+    # yielded as None
     def __fetch_all(
         self,
         search_params: GitHubSearchParams,
     ):
-        first_page = self.__fetch_page(search_params, 1)  # Fetch first page
+        # The projection is applied while parsing, dropped fields are never serialized
+        include = search_params.item_include()
+        first_page = self.__fetch_page(search_params, 1, include)  # Fetch first page
         yield first_page
         # GitHub limits results to 1000, calculate valid pages accordingly
         # https://stackoverflow.com/questions/37602893/github-search-limit-results
         number_of_result = min(first_page.total_count, GITHUB_SEARCH_RESULT_LIMIT)
         valid_page_count = math.ceil(number_of_result / self.PAGE_SIZE)
 
-        # Fetch remaining pages
-        for page in range(2, valid_page_count + 1):
-            page_content = self.__fetch_page(search_params, page)
-            yield page_content
+        # Fetch remaining pages in parallel, each page keeps its own backoff
+        pages = range(2, valid_page_count + 1)
+        futures = [
+            self.__executor.submit(self.__fetch_page, search_params, page, include)
+            for page in pages
+        ]
+        for page, future in zip(pages, futures):
+            try:
+                yield future.result()
+            except PAGE_FETCH_ERRORS as e:
+                logger.warning("Failed to fetch search page %s: %r", page, e)
+                yield None
 
     # Fetch a specific page of results from GitHub API with backoff handling
+    # `include` optionally projects the items (pydantic include spec). With the `etag` of
+    # a previous response the request is conditional, None is returned when the page
+    # didn't change (304 Not Modified)
     @github_search_backoff()
     def __fetch_page(
         self,
         search_params: GitHubSearchParams,
         page: int,
+        include: Optional[dict] = None,
+        etag: Optional[str] = None,
     ):
         search_endpoint = self.get_api_for_type(search_params.type)
         params = {
-            "q": search_params.keyword,
+            "q": search_params.canonical_keyword(),
             "per_page": self.PAGE_SIZE,  # Number of results per page
             "page": page,
         }
-        res = self.__session.get(
-            url=search_endpoint,
-            params=params,
-        )
+        # Wait for the shared budget, or fail fast. A revalidation answered with a 304
+        # doesn't count against the budget, it takes nothing from it
+        self.__rate_limiter.acquire(conditional=etag is not None)
+        with observe_github_request(search_params.type) as request_labels:
+            res = self.__client.get(
+                search_endpoint,
+                params=params,
+                headers=None if etag is None else {"If-None-Match": etag},
+            )
+            request_labels["status"] = res.status_code
+        self.__rate_limiter.update(res.headers)
+        if res.status_code == HTTP_304_NOT_MODIFIED:
+            return None
         res.raise_for_status()  # Raise an error for HTTP errors
-        response_data = res.json()
-        return GitHubSearchResponse(**response_data)  # Convert to response schema
+        GITHUB_API_RESPONSE_BYTES.observe(
+            len(res.content), type=search_params.type.value
+        )
+        # Validate the raw body in one pass with the parser of the search type
+        parsed_page = get_parser(search_params.type).parse(res.content, include)
+        return parsed_page._replace(etag=res.headers.get("ETag"))
 
-    # Generate cache key based on search type and keyword
+    # Generate cache key based on search type, keyword and projection of the items
+    # The keyword is canonicalized, spellings of the same query share their cache entry
     @staticmethod
     def generate_cache_key(search_params: GitHubSearchParams):
-        return f"{search_params.type}|{search_params.keyword}"
+        cache_key = f"{search_params.type}|{search_params.canonical_keyword()}"
+        projection_key = search_params.projection_key()
+        if projection_key:
+            cache_key = f"{cache_key}|{projection_key}"
+        return cache_key
 
-    # Generate cache key that includes page number
+    # Generate cache key that includes page number and page size
     @staticmethod
-    def generate_cache_key_for_page(search_params: GitHubSearchParams, page: int):
-        return f"{search_params.type}|{search_params.keyword}|{page}"
+    def generate_cache_key_for_page(
+        search_params: GitHubSearchParams,
+        page: int,
+        page_size: int = PAGE_SIZE,
+    ):
+        keyword = search_params.canonical_keyword()
+        return f"{search_params.type}|{keyword}|{page}|{page_size}"
 
     # Retrieve appropriate API endpoint based on search type
     @classmethod
@@ -149,45 +726,412 @@ class GitHubSearchService(AbstractGlobalInstance):
         return f"{cls.BASE_API}{api_path}"
 
 
-class GitHubSearchCacheService:
+class GitHubSearchL1Cache(AbstractGlobalInstance):
+    # Per-worker in-memory cache in front of Redis for hot keys
+    # Entries are kept decompressed, a hit skips the Redis round-trip and the codec.
+    # Invalidations go through Redis pub/sub, so clearing the cache reaches every worker
+    def __init__(self):
+        self.__cache = TTLLRUCache(
+            max_items=Config.L1_CACHE_MAX_ITEMS,
+            max_bytes=Config.L1_CACHE_MAX_BYTES,
+        )
+        self.__redis_client = redis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        pubsub = self.__redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(
+            **{GITHUB_SEARCH_L1_INVALIDATION_CHANNEL: self.__on_invalidate}
+        )
+        self.__listener = pubsub.run_in_thread(
+            sleep_time=1,
+            daemon=True,
+            exception_handler=self.__on_listener_error,
+        )
+
+    def get(self, key):
+        entry = self.__cache.get(key)
+        return None if entry is None else entry[0]
+
+    # Decompressed bytes of an entry and the milliseconds left on its Redis entry
+    # (None when it has no expiry)
+    def get_with_ttl(self, key):
+        entry = self.__cache.get(key)
+        if entry is None:
+            return None
+        data, redis_expires_at = entry
+        if redis_expires_at is None:
+            return data, None
+        return data, round((redis_expires_at - time.monotonic()) * 1000)
+
+    # Keep the decompressed bytes of an entry
+    # The entry never outlives L1_CACHE_TTL nor the `ttl` left on its Redis entry.
+    # `redis_ttl` (seconds) is what is left on the Redis entry, if it expires
+    def set(self, key, data: bytes, ttl, redis_ttl: Optional[float] = None):
+        redis_expires_at = None if redis_ttl is None else time.monotonic() + redis_ttl
+        self.__cache.set(
+            key, (data, redis_expires_at), len(data), min(ttl, Config.L1_CACHE_TTL)
+        )
+
+    # Drop the entries starting with the prefix in every worker
+    def invalidate(self, prefix):
+        self.__cache.clear(prefix)
+        self.__redis_client.publish(GITHUB_SEARCH_L1_INVALIDATION_CHANNEL, prefix)
+
+    def __on_invalidate(self, message):
+        self.__cache.clear(message["data"].decode())
+
+    # Invalidations may be lost while disconnected from Redis, so start over
+    def __on_listener_error(self, e, pubsub, thread):
+        logger.warning("L1 cache invalidation listener failed: %r", e)
+        self.__cache.clear()
+        time.sleep(1)  # Don't spin while Redis is unreachable
+
+
+class BaseGitHubSearchCacheService:
+    # Key and value handling shared by the sync and async cache services
+    def __init__(self, cache_prefix=GITHUB_SEARCH_REDIS_CACHE_PREFIX):
+        self._cache_prefix = cache_prefix
+        # Optional per-worker cache in front of Redis
+        self._l1_cache = GitHubSearchL1Cache() if Config.L1_CACHE_ENABLED else None
+        self._generations = GitHubSearchCacheGenerations()
+
+    # Prefix the key with the generations of its search type (its first segment)
+    def _format_key(self, key):
+        search_type = key.split("|", 1)[0]
+        return f"{self._cache_prefix}|{self._generations.tag(search_type)}|{key}"
+
+    # Key of the lock guarding the refresh of a cache entry
+    def _format_lock_key(self, key):
+        return f"{self._cache_prefix}|LOCK|{key}"
+
+    # Pattern matching every entry (optional: of a search type), whatever its generation
+    def _format_pattern(self, search_type: Optional[SearchType] = None):
+        if search_type is None:
+            return f"{self._cache_prefix}|*"
+        return f"{self._cache_prefix}|*|{search_type}|*"
+
+    # Whether a Redis key belongs to the current generation of its search type
+    # Locks are left alone, they expire by themselves
+    def _is_current(self, redis_key: str):
+        key_suffix = slice(len(self._cache_prefix) + 1, None)  # After "{prefix}|"
+        version, _, key = redis_key[key_suffix].partition("|")
+        if version == "LOCK":
+            return True
+        return version == self._generations.tag(key.split("|", 1)[0])
+
+    # Serialize value as JSON
+    @staticmethod
+    def _serialize(value) -> bytes:
+        return json.dumps(value).encode()
+
+    # Compress serialized data with the configured codec
+    @staticmethod
+    def _compress(data: bytes):
+        with span("codec"):
+            return codec.encode(data, Config.CACHE_CODEC)
+
+    # Restore serialized data, whatever codec the entry was stored with
+    @staticmethod
+    def _decompress(cache: bytes):
+        with span("codec"):
+            return codec.decode(cache)
+
+    # Redis expiry of a new entry (seconds): its fresh period, spread by
+    # CACHE_EXPIRY_JITTER so entries cached together don't expire together, then
+    # the stale period during which it is served while being refreshed
+    @staticmethod
+    def _expiry():
+        jitter = random.uniform(-Config.CACHE_EXPIRY_JITTER, Config.CACHE_EXPIRY_JITTER)
+        return round(Config.CACHE_EXPIRY * (1 + jitter)) + Config.CACHE_STALE_TTL
+
+    # Whether ETags were received for every page of a result, only then can it be
+    # revalidated
+    @staticmethod
+    def _has_etags(etags: Optional[List[str]]):
+        return bool(etags) and None not in etags
+
+    # Whether an entry with `ttl_ms` left (PTTL) is past its fresh period
+    @staticmethod
+    def _is_stale(ttl_ms):
+        return 0 <= ttl_ms <= Config.CACHE_STALE_TTL * 1000
+
+    # Entry of data read from Redis with `ttl_ms` left (PTTL)
+    @classmethod
+    def _entry(cls, data: bytes, ttl_ms) -> CacheEntry:
+        return CacheEntry(data, cls._is_stale(ttl_ms), ttl_ms if ttl_ms >= 0 else None)
+
+    # Look the serialized data of a key up in the L1 cache
+    def _recall(self, key):
+        if self._l1_cache is None:
+            return None
+        return self._l1_cache.get(self._format_key(key))
+
+    # Look a key up in the L1 cache, L1 entries are always fresh
+    def _recall_entry(self, key) -> Optional[CacheEntry]:
+        if self._l1_cache is None:
+            return None
+        entry = self._l1_cache.get_with_ttl(self._format_key(key))
+        if entry is not None:
+            entry = CacheEntry(entry[0], False, entry[1])
+        self._count_lookup("l1", entry)
+        return entry
+
+    @staticmethod
+    def _count_lookup(tier: str, entry: Optional[CacheEntry]):
+        SEARCH_CACHE_LOOKUPS.inc(tier=tier, outcome=get_cache_outcome(entry))
+
+    # Compress search results about to be cached, counting their size
+    @classmethod
+    def _compress_payload(cls, data: bytes):
+        compressed = cls._compress(data)
+        SEARCH_CACHE_PAYLOAD_BYTES.observe(len(data), encoding="raw")
+        SEARCH_CACHE_PAYLOAD_BYTES.observe(len(compressed), encoding=Config.CACHE_CODEC)
+        return compressed
+
+    # Keep serialized data in the L1 cache, `ttl_ms` is what is left of its Redis entry
+    # (PTTL returns a negative value for a key without expiry)
+    # L1 entries only live during the fresh period, stale entries are read from Redis
+    def _remember(self, key, data: bytes, ttl_ms):
+        if self._l1_cache is None:
+            return
+        if ttl_ms >= 0:
+            ttl = ttl_ms / 1000 - Config.CACHE_STALE_TTL
+            redis_ttl = ttl_ms / 1000
+        else:
+            ttl = Config.CACHE_EXPIRY
+            redis_ttl = None
+        self._l1_cache.set(self._format_key(key), data, ttl, redis_ttl)
+
+
+class GitHubSearchCacheService(BaseGitHubSearchCacheService):
     # Cache service to interact with Redis for storing and retrieving search results
     def __init__(self, cache_prefix=GITHUB_SEARCH_REDIS_CACHE_PREFIX):
+        super().__init__(cache_prefix)
         self.__redis_client = redis.Redis.from_url(
             Config.REDIS_CONNECTION_URL
         )  # Redis connection
-        self.__cache_prefix = cache_prefix
+        # Sweeps of the outdated entries run one at a time, off the request
+        self.__sweep_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="github-search-cache-sweep"
+        )
 
     # Store search results in Redis with a key and expiration time
     def store_cache(self, key, value):
-        key = f"{self.__cache_prefix}|{key}"  # Prefix the key
-        value = json.dumps(value)  # Serialize value as JSON
+        self.store_cache_raw(key, self._serialize(value))
 
-        self.__redis_client.set(
-            name=key,
-            value=value,
-            ex=Config.CACHE_EXPIRY,  # Set cache expiry time
+    # Store already serialized JSON, optionally with the index of the results and the
+    # ETags of the GitHub pages they come from
+    # They are stored with the same expiry, in the same round-trip
+    def store_cache_raw(
+        self,
+        key,
+        data: bytes,
+        index: Optional[bytes] = None,
+        etags: Optional[List[str]] = None,
+    ):
+        expiry = self._expiry()
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        pipeline.set(
+            name=self._format_key(key),
+            value=self._compress_payload(data),
+            ex=expiry,  # Set cache expiry time
         )
+        if index is not None:
+            index_key = generate_index_key(key)
+            pipeline.set(
+                name=self._format_key(index_key), value=self._compress(index), ex=expiry
+            )
+            self._remember(index_key, index, expiry * 1000)
+        if self._has_etags(etags):
+            pipeline.set(
+                name=self._format_key(generate_etags_key(key)),
+                value=self._compress(to_json(etags)),
+                ex=expiry,
+            )
+        with SEARCH_CACHE_SECONDS.time(operation="store"), span("redis"):
+            pipeline.execute()
+        self._remember(key, data, expiry * 1000)
+
+    # ETags of the GitHub pages of a cached result, None when they aren't known
+    def get_etags(self, key) -> Optional[List[str]]:
+        with span("redis"):
+            cache = self.__redis_client.get(self._format_key(generate_etags_key(key)))
+        return None if cache is None else json.loads(self._decompress(cache))
+
+    # Keep a cached result (with its index and ETags) for another expiry, e.g. when
+    # GitHub reported it unchanged. Returns whether the result was still cached
+    def extend_cache(self, key) -> bool:
+        expiry = self._expiry()
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for name in (key, generate_index_key(key), generate_etags_key(key)):
+            pipeline.expire(self._format_key(name), expiry)
+        with span("redis"):
+            return bool(pipeline.execute()[0])
+
+    # Store several entries in one pipelined round-trip
+    def store_cache_many(self, mapping):
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            data = self._serialize(value)
+            expiry = self._expiry()
+            pipeline.set(
+                name=self._format_key(key),
+                value=self._compress(data),
+                ex=expiry,
+            )
+            self._remember(key, data, expiry * 1000)
+        with SEARCH_CACHE_SECONDS.time(operation="store"), span("redis"):
+            pipeline.execute()
 
     # Retrieve cached result from Redis
     def get_cache(self, key):
-        key = f"{self.__cache_prefix}|{key}"
-        cache: bytes = self.__redis_client.get(key)  # Fetch from Redis
+        data = self.get_cache_raw(key)
+        return None if data is None else json.loads(data)
+
+    # Retrieve the serialized JSON of a cached result, without parsing it
+    def get_cache_raw(self, key) -> Optional[bytes]:
+        if self._l1_cache is not None:
+            return self.get_cache_raw_many([key])[0]
+
+        with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+            cache: bytes = self.__redis_client.get(self._format_key(key))
         if cache is None:
             return None
-        return json.loads(cache.decode())  # Deserialize JSON
+        return self._decompress(cache)
 
-    # Clear all cache entries (optional: with specific prefix)
-    def clear_all_cache(self, prefix=None):
-        if prefix is None:
-            prefix = self.__cache_prefix
-        else:
-            prefix = f"{self.__cache_prefix}|{prefix}"
+    # Retrieve the serialized JSON of a cached result and whether it is stale
+    def get_entry(self, key) -> Optional[CacheEntry]:
+        return self.get_entries([key])[0]
+
+    # Entries of several keys with one round-trip, missing entries are None
+    def get_entries(self, keys) -> List[Optional[CacheEntry]]:
+        entries = {}
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for key in keys:
+            entry = self._recall_entry(key)
+            if entry is not None:
+                entries[key] = entry
+                continue
+            pipeline.get(self._format_key(key))
+            pipeline.pttl(self._format_key(key))
+
+        missing = [key for key in keys if key not in entries]
+        responses = iter(())
+        if missing:  # Otherwise every entry was in the L1 cache
+            with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+                responses = iter(pipeline.execute())
+        for key, cache, ttl_ms in zip(missing, responses, responses):
+            if cache is not None:
+                data = self._decompress(cache)
+                self._remember(key, data, ttl_ms)
+                entries[key] = self._entry(data, ttl_ms)
+            self._count_lookup("redis", entries.get(key))
+        return [entries.get(key) for key in keys]
+
+    # Milliseconds left before a cached result expires, negative when it is missing
+    def get_ttl(self, key) -> int:
+        with span("redis"):
+            return self.__redis_client.pttl(self._format_key(key))
+
+    # Round-trip to Redis, opening a connection of the pool if there is none
+    def ping(self):
+        return self.__redis_client.ping()
+
+    # Retrieve several cached results with one round-trip, missing entries are None
+    def get_cache_many(self, keys):
+        return [
+            None if data is None else json.loads(data)
+            for data in self.get_cache_raw_many(keys)
+        ]
 
-        for key in self.__redis_client.scan_iter(
-            f"{prefix}*"
-        ):  # Iterate over cache keys
-            self.clear_cache(key)
+    # Serialized counterpart of get_cache_many
+    def get_cache_raw_many(self, keys):
+        if self._l1_cache is None:
+            with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+                caches = self.__redis_client.mget(
+                    [self._format_key(key) for key in keys]
+                )
+            return [
+                None if cache is None else self._decompress(cache) for cache in caches
+            ]
+
+        values = [self._recall(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        # Fetch the remaining TTL with the value, the L1 entry must not outlive it
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for key in missing:
+            pipeline.get(self._format_key(key))
+            pipeline.pttl(self._format_key(key))
+        with SEARCH_CACHE_SECONDS.time(operation="get"), span("redis"):
+            responses = iter(pipeline.execute())
+        fetched = {}
+        for key, cache, ttl_ms in zip(missing, responses, responses):
+            if cache is not None:
+                fetched[key] = self._decompress(cache)
+                self._remember(key, fetched[key], ttl_ms)
+        return [
+            fetched.get(key) if value is None else value
+            for key, value in zip(keys, values)
+        ]
+
+    # Hold a short-lived Redis lock on a key, shared by every worker and host
+    # Gives up waiting after CACHE_LOCK_WAIT (right away when not `blocking`) and yields
+    # whether the lock was acquired, the lock expires by itself after CACHE_LOCK_TIMEOUT
+    # if its holder dies
+    @contextmanager
+    def lock(self, key, blocking=True):
+        lock = self.__redis_client.lock(
+            self._format_lock_key(key),
+            timeout=Config.CACHE_LOCK_TIMEOUT,
+            blocking_timeout=Config.CACHE_LOCK_WAIT,
+        )
+        with span("redis"):  # Waiting for another worker's lock included
+            acquired = lock.acquire(blocking=blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    with span("redis"):
+                        lock.release()
+                except LockError:  # The lock expired while its key was fetched
+                    pass
+
+    # Clear all cache entries (optional: of a search type)
+    # Bumping their generation makes them unreachable at once, in every worker. They
+    # are deleted afterwards in the background, the returned future ends with the sweep
+    def clear_all_cache(self, search_type: Optional[SearchType] = None):
+        self._generations.bump(None if search_type is None else str(search_type))
+        # Drop the in-memory copies in every worker as well
+        if self._l1_cache is not None:
+            self._l1_cache.invalidate(f"{self._cache_prefix}|")
+        return self.__sweep_executor.submit(self.sweep, search_type)
+
+    # Delete the entries of past generations (optional: of a search type)
+    # Keys are unlinked by batches of CACHE_SWEEP_BATCH_SIZE, one round-trip per batch,
+    # and Redis frees their memory in the background. Returns the number of keys deleted
+    def sweep(self, search_type: Optional[SearchType] = None) -> int:
+        deleted = 0
+        batch = []
+        for redis_key in self.__redis_client.scan_iter(
+            match=self._format_pattern(search_type), count=Config.CACHE_SWEEP_BATCH_SIZE
+        ):
+            if self._is_current(redis_key.decode()):
+                continue
+            batch.append(redis_key)
+            if len(batch) >= Config.CACHE_SWEEP_BATCH_SIZE:
+                deleted += self.__redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += self.__redis_client.unlink(*batch)
+        return deleted
 
     # Clear specific cache entry by key
     def clear_cache(self, key):
         self.__redis_client.delete(key)
+
+
+# Warm up the search service of this worker, see GitHubSearchService.warm_up
+def warm_up_search():
+    GitHubSearchService().warm_up()
@@ -1,137 +1,1754 @@
-from unittest.mock import patch, MagicMock
+import asyncio
+import gzip
+import json
+import socket
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch, AsyncMock, MagicMock
 
-from django.test import TestCase
+import redis
+from django.core.management import call_command
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase
 from polyfactory.factories.pydantic_factory import ModelFactory
+from pydantic import ValidationError
 from rest_framework.test import APIClient, APITestCase
 from rest_framework.status import (
     HTTP_200_OK,
+    HTTP_301_MOVED_PERMANENTLY,
+    HTTP_304_NOT_MODIFIED,
     HTTP_400_BAD_REQUEST,
     HTTP_429_TOO_MANY_REQUESTS,
 )
-from requests.exceptions import HTTPError
+from aiohttp import ClientResponseError
+from requests.exceptions import HTTPError, RequestException, Timeout
 
 from config import Config
-from utils import SingletonABCMeta
+from utils import SingletonABCMeta, codec, http_cache
 from utils.exceptions import MaxRetryExceedException
+from utils.timing import server_timing_middleware
+from .async_service import AsyncGitHubSearchService
+from .client import GitHubClient
+from .parsers import ParsedSearchPage, get_parser
+from .generations import GitHubSearchCacheGenerations
+from .popularity import GitHubSearchPopularity
+from .query import canonicalize_query
+from .ratelimit import (
+    ACQUIRE_SCRIPT,
+    GitHubRateLimiter,
+    RateLimit,
+    parse_rate_limit,
+    rate_limit_wait,
+)
+from .result_index import SearchResultIndex, generate_index_key, index_results
+from .warmer import GitHubSearchCacheWarmer
+from .constants import (
+    GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL,
+    GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY,
+    GITHUB_SEARCH_CACHE_STATS_REDIS_KEY,
+    GITHUB_SEARCH_L1_INVALIDATION_CHANNEL,
+)
 from .schemas import (
+    FIELD_PROFILES,
+    FieldProfile,
+    GitHubSearchPageParams,
     GitHubSearchParams,
-    GitHubSearchResponse,
+    GitHubSearchPage,
+    GitHubSearchResultsParams,
+    Repository,
+    ResultSort,
     SearchType,
+    SortOrder,
+    User,
+    project_item,
 )
 from .service import (
     GitHubSearchService,
+    CacheEntry,
     GitHubSearchCacheService,
+    generate_etags_key,
     github_search_backoff,
+    iter_ndjson,
+    serialize_results,
 )
 
 
-class GitHubSearchResponseFactory(ModelFactory[GitHubSearchResponse]):
-    __model__ = GitHubSearchResponse
+class RepositoryFactory(ModelFactory[Repository]):
+    __model__ = Repository
+
+
+class UserFactory(ModelFactory[User]):
+    __model__ = User
+
+
+# Parsed page of repositories, as returned by GitHubSearchService.__fetch_page
+def build_parsed_page(total_count=100, count=3):
+    items = [RepositoryFactory.build().model_dump(mode="json") for _ in range(count)]
+    return ParsedSearchPage(total_count, False, items)
+
+
+class GitHubSearchParamsTestCase(TestCase):
+
+    def test_cache_key_depends_on_projection(self):
+        full = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        card = GitHubSearchParams(
+            type=SearchType.REPO, keyword="django", profile=FieldProfile.CARD
+        )
+        fields = GitHubSearchParams(
+            type=SearchType.REPO, keyword="django", fields=["owner.login", "name"]
+        )
+
+        keys = {
+            GitHubSearchService.generate_cache_key(params)
+            for params in (full, card, fields)
+        }
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(
+            GitHubSearchService.generate_cache_key(full), "SearchType.REPO|django"
+        )
+
+    def test_fields_build_nested_include(self):
+        search_params = GitHubSearchParams(
+            type=SearchType.REPO,
+            keyword="django",
+            fields=["name", "owner.login", "owner.avatar_url"],
+            profile=FieldProfile.CARD,  # Explicit fields take precedence
+        )
+
+        self.assertEqual(
+            search_params.item_include(),
+            {"name": True, "owner": {"login": True, "avatar_url": True}},
+        )
+        self.assertEqual(
+            project_item(
+                {"name": "django", "id": 1, "owner": {"login": "django", "id": 2}},
+                search_params.item_include(),
+            ),
+            {"name": "django", "owner": {"login": "django"}},
+        )
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            GitHubSearchParams(type=SearchType.USER, keyword="django", fields=["name"])
+
+    def test_unknown_nested_field_is_rejected(self):
+        for field in ("owner.bogus", "owner.login.bogus", "name.bogus", "owner."):
+            with self.subTest(field=field), self.assertRaises(ValidationError):
+                GitHubSearchParams(
+                    type=SearchType.REPO, keyword="django", fields=[field]
+                )
+
+        search_params = GitHubSearchParams(
+            type=SearchType.ISSUE, keyword="django", fields=["assignee.login"]
+        )
+        self.assertEqual(search_params.fields, ["assignee.login"])  # Optional[User]
+
+    def test_spellings_of_a_query_share_cache_key(self):
+        keys = {
+            GitHubSearchService.generate_cache_key(
+                GitHubSearchParams(type=SearchType.REPO, keyword=keyword)
+            )
+            for keyword in (
+                "django language:python",
+                "  Django   Language:Python ",
+                "language:python django",
+            )
+        }
+
+        self.assertEqual(keys, {"SearchType.REPO|django language:python"})
+
+    def test_canonical_query_string(self):
+        query_params = QueryDict(
+            "profile=card&keyword=Language:Python+%20Django&type=repo&fields=name,id,name"
+        )
+        search_params = GitHubSearchParams.from_query_params(query_params)
+
+        self.assertEqual(search_params.fields, ["name", "id", "name"])
+        self.assertEqual(
+            search_params.canonical_query_string(),
+            "type=repo&keyword=django+language%3Apython&fields=id%2Cname",
+        )
+        # The profile is only kept when it drops fields
+        for profile, query_string in (
+            ("card", "type=repo&keyword=django&profile=card"),
+            ("full", "type=repo&keyword=django"),
+        ):
+            search_params = GitHubSearchParams(
+                type=SearchType.REPO, keyword="django", profile=profile
+            )
+            self.assertEqual(search_params.canonical_query_string(), query_string)
+
+
+class CanonicalizeQueryTestCase(TestCase):
+
+    def test_whitespace_is_collapsed_and_case_folded(self):
+        self.assertEqual(
+            canonicalize_query("  Django   REST\tframework "), "django rest framework"
+        )
+
+    def test_qualifiers_are_sorted_after_terms(self):
+        self.assertEqual(
+            canonicalize_query("user:Octocat stars:>10 cli language:Go -language:C"),
+            "cli -language:c language:go stars:>10 user:octocat",
+        )
+
+    def test_duplicate_qualifiers_are_dropped(self):
+        self.assertEqual(
+            canonicalize_query("language:go tools language:Go"), "tools language:go"
+        )
+
+    def test_quoted_phrases_are_kept_whole(self):
+        self.assertEqual(
+            canonicalize_query('label:"Good  First Issue" "Hello   World" react'),
+            '"hello world" react label:"good first issue"',
+        )
+
+    def test_queries_with_operators_keep_their_order(self):
+        self.assertEqual(
+            canonicalize_query("language:go  OR Rust NOT cli"),
+            "language:go OR rust NOT cli",
+        )
+
+
+class GitHubSearchResponseParserTestCase(TestCase):
+
+    def setUp(self):
+        self.page = GitHubSearchPage[User](
+            total_count=3,
+            incomplete_results=False,
+            items=[UserFactory.build() for _ in range(3)],
+        )
+        self.raw = self.page.model_dump_json().encode()
+
+    def test_parse(self):
+        parsed = get_parser(SearchType.USER).parse(self.raw)
+
+        self.assertEqual(parsed.total_count, 3)
+        self.assertEqual(parsed.items, self.page.model_dump(mode="json")["items"])
+
+    def test_parse_applies_field_projection(self):
+        include = FIELD_PROFILES[FieldProfile.CARD][SearchType.USER]
+        parsed = get_parser(SearchType.USER).parse(self.raw, include)
+
+        for item in parsed.items:
+            self.assertEqual(item.keys(), include.keys())
+
+    def test_parse_checks_urls_and_datetimes_as_strings(self):
+        page = GitHubSearchPage[Repository](
+            total_count=1,
+            incomplete_results=False,
+            items=[RepositoryFactory.build()],
+        )
+        data = page.model_dump(mode="json")
+        parser = get_parser(SearchType.REPO)
+
+        self.assertEqual(parser.parse(json.dumps(data).encode()).items, data["items"])
+        for field, value in (("html_url", "not a url"), ("created_at", "yesterday")):
+            with self.subTest(field=field):
+                invalid = json.loads(json.dumps(data))
+                invalid["items"][0][field] = value
+                with self.assertRaises(ValidationError):
+                    parser.parse(json.dumps(invalid).encode())
+
+    def test_parse_fills_defaults_and_drops_unknown_fields(self):
+        data = self.page.model_dump(mode="json")
+        del data["items"][0]["gravatar_id"]  # Defaults to ""
+        data["items"][0]["unknown"] = 1
+        with self.assertRaises(ValidationError):  # Required
+            invalid = json.loads(json.dumps(data))
+            del invalid["items"][0]["login"]
+            get_parser(SearchType.USER).parse(json.dumps(invalid).encode())
+
+        parsed = get_parser(SearchType.USER).parse(json.dumps(data).encode())
+
+        self.assertEqual(parsed.items[0]["gravatar_id"], "")
+        self.assertNotIn("unknown", parsed.items[0])
+
+
+class SerializedResultsTestCase(TestCase):
+
+    def test_serialized_results_are_a_json_array(self):
+        items = [{"name": "a\nb"}, {"name": "c"}]
+
+        self.assertEqual(json.loads(serialize_results(items)), items)
+        self.assertEqual(json.loads(serialize_results([])), [])
+
+    def test_iter_ndjson_streams_one_item_per_line(self):
+        items = [{"name": "a\nb"}, {"name": "c"}, {"name": "d"}]
+
+        chunks = list(iter_ndjson(serialize_results(items), chunk_size=2))
+
+        self.assertEqual(len(chunks), 2)
+        lines = b"".join(chunks).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], items)
+
+    def test_iter_ndjson_streams_legacy_payload(self):
+        items = [{"name": "a"}, {"name": "b"}]
+
+        lines = b"".join(iter_ndjson(json.dumps(items).encode())).splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], items)
+        self.assertEqual(list(iter_ndjson(b"[]")), [])
+
+
+class SearchResultIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.items = [
+            {"stargazers_count": 5, "forks_count": 1, "language": "Python"},
+            {"stargazers_count": 50, "forks_count": 1, "language": "Go"},
+            {"stargazers_count": 5, "forks_count": 9, "language": None},
+            {"stargazers_count": 20, "forks_count": 0, "language": "python"},
+        ]
+        self.index = SearchResultIndex.build(SearchType.REPO, self.items)
+
+    def test_sort_orders_keep_result_order_on_ties(self):
+        self.assertEqual(self.index.select(ResultSort.STARS), [1, 3, 0, 2])
+        self.assertEqual(self.index.select(ResultSort.FORKS), [2, 0, 1, 3])
+        self.assertEqual(
+            self.index.select(ResultSort.STARS, SortOrder.ASC), [2, 0, 3, 1]
+        )
+
+    def test_language_groups_ignore_case(self):
+        self.assertEqual(self.index.select(group="PYTHON"), [0, 3])
+        self.assertEqual(self.index.select(ResultSort.STARS, group="python"), [3, 0])
+        self.assertEqual(self.index.select(group="rust"), [])
+
+    def test_serialized_index_round_trip(self):
+        index = SearchResultIndex.deserialize(self.index.serialize())
+
+        self.assertEqual(index.select(ResultSort.STARS, group="python"), [3, 0])
+        self.assertEqual(index.select(), [0, 1, 2, 3])
+
+    def test_results_params_need_indexed_fields(self):
+        with self.assertRaises(ValidationError):  # Users have no stars
+            GitHubSearchResultsParams(
+                type=SearchType.USER, keyword="django", sort=ResultSort.STARS
+            )
+        with self.assertRaises(ValidationError):  # Cards are cached without updated_at
+            GitHubSearchResultsParams(
+                type=SearchType.REPO,
+                keyword="django",
+                profile=FieldProfile.CARD,
+                sort=ResultSort.UPDATED,
+            )
+        with self.assertRaises(ValidationError):
+            GitHubSearchResultsParams(
+                type=SearchType.ISSUE, keyword="django", language="go"
+            )
+
+
+class GitHubSearchServiceSingletonTestCase(TestCase):
+
+    def setUp(self):
+        # Searches record their popularity in Redis
+        patcher = patch("github.service.GitHubSearchPopularity")
+        self.mock_popularity = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    def test_search_cache_hit(self, mock_cache_service):
+        # Setup mock to return cached data
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = CacheEntry(
+            b'["cached_result"]', False
+        )
+
+        # Create instance of the singleton service
+        github_search_service = GitHubSearchService()
+
+        result = github_search_service.search(search_params)
+
+        self.assertEqual(result, ["cached_result"])
+        mock_cache_service.return_value.get_entry.assert_called_once_with(
+            github_search_service.generate_cache_key(search_params)
+        )
+        self.mock_popularity.return_value.record.assert_called_once_with(
+            search_params, "hit"
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch("requests.Session.head")
+    def test_warm_up_opens_redis_and_github_connections(
+        self, mock_head, mock_cache_service
+    ):
+        GitHubSearchService().warm_up()
+
+        mock_cache_service.return_value.ping.assert_called_once()
+        self.assertEqual(mock_head.call_count, Config.GITHUB_SEARCH_CONCURRENCY)
+        mock_head.assert_called_with(
+            GitHubSearchService.BASE_API, timeout=Config.WARM_UP_TIMEOUT
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_refresh_skips_result_with_time_left(
+        self, mock_search_engine, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = True
+        mock_cache_service.return_value.get_ttl.return_value = 3600 * 1000
+        mock_cache_service.return_value.get_etags.return_value = None
+        mock_search_engine.return_value = ([{"name": "api_result"}], True, [])
+
+        github_search_service = GitHubSearchService()
+
+        self.assertFalse(github_search_service.refresh(search_params, min_ttl=600))
+        mock_search_engine.assert_not_called()
+        self.assertTrue(github_search_service.refresh(search_params, min_ttl=7200))
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            github_search_service.generate_cache_key(search_params),
+            serialize_results([{"name": "api_result"}]),
+            index=index_results(SearchType.REPO, [{"name": "api_result"}]),
+            etags=[],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_entry_tells_time_left(self, mock_search_engine, mock_cache_service):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        mock_search_engine.return_value = ([{"name": "api_result"}], True, [])
+        mock_cache_service.return_value.get_ttl.return_value = 9000 * 1000
+
+        entry = GitHubSearchService().search_entry(search_params)
+
+        self.assertEqual(
+            entry,
+            CacheEntry(serialize_results([{"name": "api_result"}]), False, 9000 * 1000),
+        )
+        # Not cached, e.g. a page failed
+        mock_cache_service.return_value.get_ttl.return_value = -2
+        self.assertIsNone(GitHubSearchService().search_entry(search_params).ttl_ms)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_refresh_unmodified_result_extends_cache(
+        self, mock_search_engine, mock_fetch_page, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = True
+        mock_cache_service.return_value.get_ttl.return_value = 1000
+        mock_cache_service.return_value.get_etags.return_value = ['"a"', '"b"']
+        mock_cache_service.return_value.extend_cache.return_value = True
+        mock_fetch_page.return_value = None  # 304 Not Modified
+
+        self.assertTrue(GitHubSearchService().refresh(search_params, min_ttl=600))
+
+        include = search_params.item_include()
+        mock_fetch_page.assert_any_call(search_params, 1, include, '"a"')
+        mock_fetch_page.assert_any_call(search_params, 2, include, '"b"')
+        mock_cache_service.return_value.extend_cache.assert_called_once_with(cache_key)
+        mock_cache_service.return_value.get_cache_raw.assert_not_called()
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+        mock_search_engine.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(GitHubSearchService, "PAGE_SIZE", 2)
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_refresh_replaces_modified_pages_only(
+        self, mock_search_engine, mock_fetch_page, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        cached_items = [{"id": i} for i in range(4)]
+        new_items = [{"id": 5}, {"id": 6}]
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = True
+        mock_cache_service.return_value.get_ttl.return_value = 1000
+        mock_cache_service.return_value.get_etags.return_value = ['"a"', '"b"']
+        mock_cache_service.return_value.get_cache_raw.return_value = serialize_results(
+            cached_items
+        )
+        mock_fetch_page.side_effect = lambda _, page, include, etag: (
+            None if page == 1 else ParsedSearchPage(4, False, new_items, '"c"')
+        )
+
+        self.assertTrue(GitHubSearchService().refresh(search_params, min_ttl=600))
+
+        items = cached_items[:2] + new_items
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            cache_key,
+            serialize_results(items),
+            index=index_results(SearchType.REPO, items),
+            etags=['"a"', '"c"'],
+        )
+        mock_cache_service.return_value.extend_cache.assert_not_called()
+        mock_search_engine.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(GitHubSearchService, "PAGE_SIZE", 2)
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_refresh_fetches_again_when_page_count_changes(
+        self, mock_search_engine, mock_fetch_page, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = True
+        mock_cache_service.return_value.get_ttl.return_value = 1000
+        mock_cache_service.return_value.get_etags.return_value = ['"a"']
+        mock_cache_service.return_value.get_cache_raw.return_value = b'[{"id":1}]'
+        mock_fetch_page.return_value = ParsedSearchPage(3, False, [{"id": 2}], '"b"')
+        mock_search_engine.return_value = ([{"id": 2}], True, ['"b"', '"c"'])
+
+        self.assertTrue(GitHubSearchService().refresh(search_params, min_ttl=600))
+
+        mock_search_engine.assert_called_once_with(search_params)
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            GitHubSearchService.generate_cache_key(search_params),
+            serialize_results([{"id": 2}]),
+            index=index_results(SearchType.REPO, [{"id": 2}]),
+            etags=['"b"', '"c"'],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.metrics.GITHUB_API_SECONDS")
+    @patch("github.service.GITHUB_API_RESPONSE_BYTES")
+    @patch("github.service.GitHubRateLimiter")
+    @patch("requests.Session.get")
+    def test_fetch_page_is_measured(
+        self, mock_get, mock_rate_limiter, mock_response_bytes, mock_seconds
+    ):
+        search_params = GitHubSearchParams(type=SearchType.USER, keyword="django")
+        content = b'{"total_count": 0, "incomplete_results": false, "items": []}'
+        mock_get.return_value = MagicMock(status_code=200, headers={}, content=content)
+
+        GitHubSearchService()._GitHubSearchService__fetch_page(search_params, 1)
+
+        self.assertEqual(
+            mock_seconds.observe.call_args.kwargs, {"type": "user", "status": 200}
+        )
+        mock_response_bytes.observe.assert_called_once_with(len(content), type="user")
+
+        mock_get.side_effect = RequestException()
+        with self.assertRaises(RequestException):
+            GitHubSearchService()._GitHubSearchService__fetch_page(search_params, 1)
+        self.assertEqual(
+            mock_seconds.observe.call_args.kwargs, {"type": "user", "status": "error"}
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubRateLimiter")
+    @patch("requests.Session.get")
+    def test_fetch_page_revalidates_with_etag(self, mock_get, mock_rate_limiter):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_get.return_value = MagicMock(
+            status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": '"a"'}
+        )
+
+        github_search_service = GitHubSearchService()
+        page = github_search_service._GitHubSearchService__fetch_page(
+            search_params, 2, etag='"a"'
+        )
+
+        self.assertIsNone(page)
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"a"'})
+
+        mock_get.return_value = MagicMock(
+            status_code=HTTP_200_OK,
+            headers={"ETag": '"b"'},
+            content=b'{"total_count": 0, "incomplete_results": false, "items": []}',
+        )
+        page = github_search_service._GitHubSearchService__fetch_page(search_params, 1)
+
+        self.assertEqual(page, ParsedSearchPage(0, False, [], '"b"'))
+        self.assertIsNone(mock_get.call_args.kwargs["headers"])
+        # Only the unconditional request takes a request from the budget
+        self.assertEqual(
+            mock_rate_limiter.return_value.acquire.call_args_list,
+            [((), {"conditional": True}), ((), {"conditional": False})],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_stale_hit_refreshes_in_background(
+        self, mock_search_engine, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        stale = CacheEntry(b'["stale_result"]', True)
+        mock_cache_service.return_value.get_entry.return_value = stale
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = True
+        mock_cache_service.return_value.get_ttl.return_value = 1000  # Still stale
+        mock_cache_service.return_value.get_etags.return_value = None
+        mock_search_engine.return_value = ([{"name": "fresh_result"}], True, [])
+
+        github_search_service = GitHubSearchService()
+        result = github_search_service.search(search_params)
+        # Wait for the background refresh
+        github_search_service._GitHubSearchService__refresh_executor.shutdown()
+
+        self.assertEqual(result, ["stale_result"])  # Served right away
+        mock_cache_service.return_value.lock.assert_called_once_with(
+            cache_key, blocking=False
+        )
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            cache_key,
+            serialize_results([{"name": "fresh_result"}]),
+            index=index_results(SearchType.REPO, [{"name": "fresh_result"}]),
+            etags=[],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_stale_hit_skips_refresh_held_by_another_worker(
+        self, mock_search_engine, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        stale = CacheEntry(b'["stale_result"]', True)
+        mock_cache_service.return_value.get_entry.return_value = stale
+        mock_cache_service.return_value.lock.return_value.__enter__.return_value = False
+
+        github_search_service = GitHubSearchService()
+        result = github_search_service.search(search_params)
+        github_search_service._GitHubSearchService__refresh_executor.shutdown()
+
+        self.assertEqual(result, ["stale_result"])
+        mock_search_engine.assert_not_called()
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    def test_search_raw_cache_hit_returns_stored_bytes(self, mock_cache_service):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        cached = b'["cached_result"]'
+        mock_cache_service.return_value.get_entry.return_value = CacheEntry(
+            cached, False
+        )
+
+        result = GitHubSearchService().search_raw(search_params)
+
+        self.assertIs(result, cached)  # Neither parsed nor serialized again
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_cache_miss(self, mock_search_engine, mock_cache_service):
+        # Setup mock cache to return None (cache miss)
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        mock_search_engine.return_value = ([{"name": "api_result"}], True, [])
+
+        # Create instance of the singleton service
+        github_search_service = GitHubSearchService()
+
+        result = github_search_service.search(search_params)
+
+        self.assertEqual(result, [{"name": "api_result"}])
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            github_search_service.generate_cache_key(search_params),
+            serialize_results([{"name": "api_result"}]),
+            index=index_results(SearchType.REPO, [{"name": "api_result"}]),
+            etags=[],
+        )
+        self.mock_popularity.return_value.record.assert_called_once_with(
+            search_params, "miss"
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_cache_filled_while_waiting_for_lock(
+        self, mock_search_engine, mock_cache_service
+    ):
+        # Another worker held the lock and stored the result in the meantime
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.side_effect = [
+            b'["other_worker_result"]',
+        ]
+
+        github_search_service = GitHubSearchService()
+
+        result = github_search_service.search(search_params)
+
+        self.assertEqual(result, ["other_worker_result"])
+        mock_cache_service.return_value.lock.assert_called_once_with(
+            github_search_service.generate_cache_key(search_params)
+        )
+        mock_search_engine.assert_not_called()
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_incomplete_result_not_cached(
+        self, mock_search_engine, mock_cache_service
+    ):
+        # A page failed, so the partial result is returned but not cached
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        mock_search_engine.return_value = ([{"name": "api_result"}], False, [])
+
+        github_search_service = GitHubSearchService()
+
+        result = github_search_service.search(search_params)
+
+        self.assertEqual(result, [{"name": "api_result"}])
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    def test_search_stream_cache_hit(self, mock_cache_service):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        items = [{"id": index} for index in range(150)]
+        mock_cache_service.return_value.get_entry.return_value = CacheEntry(
+            serialize_results(items), False
+        )
+
+        chunks = list(GitHubSearchService().search_stream(search_params))
+
+        self.assertEqual(len(chunks), 2)  # Streamed by chunks of PAGE_SIZE items
+        lines = b"".join(chunks).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], items)
+        mock_cache_service.return_value.lock.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_all")
+    def test_search_stream_cache_miss(self, mock_fetch_all, mock_cache_service):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        pages = [build_parsed_page(), build_parsed_page()]
+        mock_fetch_all.return_value = iter(pages)
+
+        chunks = GitHubSearchService().search_stream(search_params)
+
+        # Every page is sent on its own, as soon as it is fetched
+        first_chunk = next(chunks)
+        self.assertEqual(
+            [json.loads(line) for line in first_chunk.splitlines()], pages[0].items
+        )
+        self.assertEqual(
+            [json.loads(line) for line in next(chunks).splitlines()], pages[1].items
+        )
+        self.assertEqual(list(chunks), [])
+        mock_cache_service.return_value.store_cache_raw.assert_called_once_with(
+            GitHubSearchService.generate_cache_key(search_params),
+            serialize_results(pages[0].items + pages[1].items),
+            index=index_results(SearchType.REPO, pages[0].items + pages[1].items),
+            etags=[None, None],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_all")
+    def test_search_stream_incomplete_result_not_cached(
+        self, mock_fetch_all, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        page = build_parsed_page()
+        mock_fetch_all.return_value = iter([page, None])
+
+        chunks = list(GitHubSearchService().search_stream(search_params))
+
+        self.assertEqual(len(chunks), 1)
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_all")
+    def test_search_engine_combines_results(self, mock_fetch_all):
+        # Setup mock to return multiple pages of results
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+
+        chunk_1 = build_parsed_page()
+        chunk_2 = build_parsed_page()
+        expected_output = chunk_1.items + chunk_2.items
+
+        mock_fetch_all.return_value = [chunk_1, chunk_2]
+
+        # Create instance of the singleton service
+        github_search_service = GitHubSearchService()
+
+        result, is_complete, etags = (
+            github_search_service._GitHubSearchService__search_engine(search_params)
+        )
+
+        self.assertEqual(result, expected_output)
+        self.assertTrue(is_complete)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    def test_fetch_all_keeps_page_order_and_successful_pages(self, mock_fetch_page):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        pages = {page: build_parsed_page(total_count=450) for page in range(1, 6)}
+
+        def fetch_page(_, page, include=None):
+            if page == 3:
+                raise MaxRetryExceedException()
+            if page == 4:
+                raise Timeout()
+            return pages[page]
+
+        mock_fetch_page.side_effect = fetch_page
+
+        github_search_service = GitHubSearchService()
+
+        result = list(
+            github_search_service._GitHubSearchService__fetch_all(search_params)
+        )
+
+        # 450 results span 5 pages, the failed pages are yielded as None
+        self.assertEqual(result, [pages[1], pages[2], None, None, pages[5]])
+        self.assertEqual(mock_fetch_page.call_count, 5)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    def test_search_fails_on_error_response_of_later_page(
+        self, mock_fetch_page, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry.return_value = None
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+        pages = {page: build_parsed_page(total_count=250) for page in range(1, 4)}
+
+        def fetch_page(_, page, include=None):
+            if page == 2:
+                raise HTTPError(response=MagicMock(status_code=422))
+            return pages[page]
+
+        mock_fetch_page.side_effect = fetch_page
+
+        # Not a truncated result: the search itself is wrong, caching it would hide it
+        with self.assertRaises(HTTPError):
+            GitHubSearchService().search(search_params)
+        mock_cache_service.return_value.store_cache_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    def test_search_page_combines_cached_and_fetched_pages(
+        self, mock_fetch_page, mock_cache_service
+    ):
+        # Items 80..159 span the first (cached) and second (missing) GitHub pages
+        search_params = GitHubSearchPageParams(
+            type=SearchType.REPO, keyword="django", page=2, page_size=80
+        )
+        first_page = {"total_count": 500, "items": [{"id": i} for i in range(100)]}
+        second_page = {
+            "total_count": 500,
+            "items": [{"id": i} for i in range(100, 200)],
+        }
+        mock_cache_service.return_value.get_cache_many.return_value = [
+            first_page,
+            None,
+        ]
+        mock_fetch_page.return_value = ParsedSearchPage(
+            500, False, second_page["items"]
+        )
+
+        github_search_service = GitHubSearchService()
+
+        result = github_search_service.search_page(search_params)
+
+        self.assertEqual(result["results"], [{"id": i} for i in range(80, 160)])
+        self.assertEqual(result["total_count"], 500)
+        self.assertTrue(result["has_next"])
+        mock_cache_service.return_value.get_cache_many.assert_called_once_with(
+            [
+                github_search_service.generate_cache_key_for_page(search_params, 1),
+                github_search_service.generate_cache_key_for_page(search_params, 2),
+            ]
+        )
+        # Only the missing page is fetched and cached
+        mock_fetch_page.assert_called_once_with(search_params, 2)
+        mock_cache_service.return_value.store_cache_many.assert_called_once_with(
+            {
+                github_search_service.generate_cache_key_for_page(
+                    search_params, 2
+                ): second_page
+            }
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_page")
+    def test_search_page_cache_hit(self, mock_fetch_page, mock_cache_service):
+        search_params = GitHubSearchPageParams(
+            type=SearchType.USER, keyword="django", page=1, page_size=30
+        )
+        mock_cache_service.return_value.get_cache_many.return_value = [
+            {"total_count": 20, "items": [{"id": i} for i in range(20)]}
+        ]
+
+        result = GitHubSearchService().search_page(search_params)
+
+        self.assertEqual(result["results"], [{"id": i} for i in range(20)])
+        self.assertFalse(result["has_next"])
+        mock_fetch_page.assert_not_called()
+        mock_cache_service.return_value.store_cache_many.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
+    def test_search_many_looks_up_once_and_isolates_failures(
+        self, mock_search_engine, mock_cache_service
+    ):
+        cached, missing, failing = (
+            GitHubSearchParams(type=SearchType.REPO, keyword=keyword)
+            for keyword in ("aaa", "bbb", "ccc")
+        )
+        searches = [cached, missing, failing, missing]
+        mock_cache_service.return_value.get_entries.return_value = [
+            CacheEntry(b'[{"name":"cached"}]', False),
+            None,
+            None,
+            None,
+        ]
+        mock_cache_service.return_value.get_cache_raw.return_value = None
+
+        def search_engine(search_params):
+            if search_params is failing:
+                raise MaxRetryExceedException()
+            return [{"name": "fetched"}], True, []
+
+        mock_search_engine.side_effect = search_engine
+
+        results = GitHubSearchService().search_many(searches)
+
+        self.assertEqual(results[0], b'[{"name":"cached"}]')
+        self.assertEqual(json.loads(results[1]), [{"name": "fetched"}])
+        self.assertIsInstance(results[2], MaxRetryExceedException)
+        self.assertEqual(results[3], results[1])
+        mock_cache_service.return_value.get_entries.assert_called_once_with(
+            [GitHubSearchService.generate_cache_key(search) for search in searches]
+        )
+        self.assertEqual(mock_search_engine.call_count, 2)  # The repeated search once
+        self.mock_popularity.return_value.record_many.assert_called_once_with(
+            [(cached, "hit"), (missing, "miss"), (failing, "miss"), (missing, "miss")]
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "search_raw")
+    def test_search_results_slice_cached_results(
+        self, mock_search_raw, mock_cache_service
+    ):
+        items = [{"id": i, "stargazers_count": i % 4} for i in range(10)]
+        search_params = GitHubSearchResultsParams(
+            type=SearchType.REPO,
+            keyword="django",
+            sort=ResultSort.STARS,
+            page=2,
+            page_size=3,
+        )
+        cache_key = GitHubSearchService.generate_cache_key(search_params)
+        mock_cache_service.return_value.get_cache_raw_many.return_value = [
+            serialize_results(items),
+            index_results(SearchType.REPO, items),
+        ]
+
+        result = GitHubSearchService().search_results(search_params)
+
+        # By descending stars: 3, 7, 2, | 6, 1, 5, | 9, 0, 4, 8
+        self.assertEqual(json.loads(result["results"]), [items[i] for i in (6, 1, 5)])
+        self.assertEqual(result["total_count"], 10)
+        self.assertTrue(result["has_next"])
+        mock_cache_service.return_value.get_cache_raw_many.assert_called_once_with(
+            [cache_key, generate_index_key(cache_key)]
+        )
+        mock_search_raw.assert_not_called()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    def test_search_results_rebuild_index_of_other_results(self, mock_cache_service):
+        items = [{"id": i, "stargazers_count": i} for i in range(3)]
+        outdated = [{"id": i, "stargazers_count": i} for i in range(10)]
+        search_params = GitHubSearchResultsParams(
+            type=SearchType.REPO, keyword="django", sort=ResultSort.STARS
+        )
+        mock_cache_service.return_value.get_cache_raw_many.return_value = [
+            serialize_results(items),
+            index_results(SearchType.REPO, outdated),  # Refreshed results, old index
+        ]
+
+        result = GitHubSearchService().search_results(search_params)
+
+        self.assertEqual(json.loads(result["results"]), items[::-1])
+        self.assertEqual(result["total_count"], 3)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.service.GitHubSearchCacheService")
+    @patch.object(GitHubSearchService, "search_raw")
+    def test_search_results_cache_miss_searches_first(
+        self, mock_search_raw, mock_cache_service
+    ):
+        items = [
+            {"id": 1, "language": "Go"},
+            {"id": 2, "language": "Python"},
+            {"id": 3, "language": "Go"},
+        ]
+        search_params = GitHubSearchResultsParams(
+            type=SearchType.REPO, keyword="django", language="go"
+        )
+        mock_cache_service.return_value.get_cache_raw_many.return_value = [None, None]
+        mock_search_raw.return_value = serialize_results(items)
+
+        result = GitHubSearchService().search_results(search_params)
+
+        self.assertEqual(json.loads(result["results"]), [items[0], items[2]])
+        self.assertEqual(result["total_count"], 2)
+        self.assertFalse(result["has_next"])
+        mock_search_raw.assert_called_once_with(search_params.search_params())
+
+
+class AsyncGitHubSearchServiceTestCase(TestCase):
+
+    def setUp(self):
+        patcher = patch("github.async_service.AsyncGitHubSearchPopularity")
+        self.mock_popularity = patcher.start()
+        self.mock_popularity.return_value.record = AsyncMock()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.async_service.AsyncGitHubSearchCacheService")
+    async def test_search_cache_hit(self, mock_cache_service):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry = AsyncMock(
+            return_value=CacheEntry(b'["cached_result"]', False)
+        )
+
+        result = await AsyncGitHubSearchService().search(search_params)
+
+        self.assertEqual(result, ["cached_result"])
+        mock_cache_service.return_value.get_entry.assert_awaited_once_with(
+            GitHubSearchService.generate_cache_key(search_params)
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.async_service.AsyncGitHubSearchCacheService")
+    @patch.object(
+        AsyncGitHubSearchService,
+        "_AsyncGitHubSearchService__search_engine",
+        new_callable=AsyncMock,
+    )
+    async def test_search_stale_hit_refreshes_in_background(
+        self, mock_search_engine, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        stale = CacheEntry(b'["stale_result"]', True)
+        mock_cache_service.return_value.get_entry = AsyncMock(return_value=stale)
+        mock_cache_service.return_value.store_cache_raw = AsyncMock()
+        lock = mock_cache_service.return_value.lock.return_value
+        lock.__aenter__.return_value = True
+        mock_cache_service.return_value.get_ttl = AsyncMock(return_value=1000)
+        mock_cache_service.return_value.get_etags = AsyncMock(return_value=None)
+        mock_search_engine.return_value = ([{"name": "fresh_result"}], True, [])
+
+        result = await AsyncGitHubSearchService().search(search_params)
+        for _ in range(100):  # Let the background refresh run
+            await asyncio.sleep(0)
+
+        self.assertEqual(result, ["stale_result"])
+        mock_cache_service.return_value.store_cache_raw.assert_awaited_once_with(
+            GitHubSearchService.generate_cache_key(search_params),
+            serialize_results([{"name": "fresh_result"}]),
+            index=index_results(SearchType.REPO, [{"name": "fresh_result"}]),
+            etags=[],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.async_service.AsyncGitHubSearchCacheService")
+    @patch.object(
+        AsyncGitHubSearchService,
+        "_AsyncGitHubSearchService__fetch_page",
+        new_callable=AsyncMock,
+    )
+    async def test_search_cache_miss_keeps_successful_pages(
+        self, mock_fetch_page, mock_cache_service
+    ):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        mock_cache_service.return_value.get_entry = AsyncMock(return_value=None)
+        mock_cache_service.return_value.get_cache_raw = AsyncMock(return_value=None)
+        mock_cache_service.return_value.store_cache_raw = AsyncMock()
+        pages = {page: build_parsed_page(total_count=250) for page in range(1, 4)}
+
+        async def fetch_page(_, page, include=None):
+            if page == 2:
+                raise MaxRetryExceedException()
+            return pages[page]
+
+        mock_fetch_page.side_effect = fetch_page
+
+        result = await AsyncGitHubSearchService().search(search_params)
+
+        self.assertEqual(result, pages[1].items + pages[3].items)
+        # The second page failed, so the partial result isn't cached
+        mock_cache_service.return_value.store_cache_raw.assert_not_awaited()
+
+
+class GitHubSearchBackoffTestCase(TestCase):
+
+    @patch("time.sleep", return_value=None)  # To avoid real sleep during tests
+    def test_github_search_backoff_retry(self, mock_sleep):
+        mock_func = MagicMock()
+        mock_func.side_effect = HTTPError(
+            response=MagicMock(reason="rate limit exceeded")
+        )
+
+        decorated_func = github_search_backoff(max_retry=3)(mock_func)
+
+        with self.assertRaises(MaxRetryExceedException):
+            decorated_func()
+
+        self.assertEqual(mock_func.call_count, 3)
+
+    @patch("time.sleep", return_value=None)
+    def test_github_search_backoff_waits_until_reset(self, mock_sleep):
+        headers = {
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(int(time.time()) + 5),
+        }
+        mock_func = MagicMock()
+        mock_func.side_effect = [
+            HTTPError(response=MagicMock(status_code=403, headers=headers)),
+            "result",
+        ]
+
+        result = github_search_backoff()(mock_func)()
+
+        self.assertEqual(result, "result")
+        # Slept until the reset announced by GitHub, not by an arbitrary penalty
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 5, delta=1)
+
+    @patch.object(Config, "GITHUB_RATE_LIMIT_DEADLINE", 10)
+    @patch("time.sleep", return_value=None)
+    def test_github_search_backoff_fails_fast_past_deadline(self, mock_sleep):
+        headers = {"Retry-After": "60"}
+        mock_func = MagicMock()
+        mock_func.side_effect = HTTPError(
+            response=MagicMock(status_code=429, headers=headers)
+        )
+
+        with self.assertRaises(MaxRetryExceedException):
+            github_search_backoff()(mock_func)()
+
+        self.assertEqual(mock_func.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch("github.service.GITHUB_API_MAX_RETRY_EXCEEDED")
+    @patch("github.service.GITHUB_API_BACKOFF_SECONDS")
+    @patch("github.service.GITHUB_API_RETRIES")
+    @patch("time.sleep", return_value=None)
+    def test_github_search_backoff_is_measured(
+        self, mock_sleep, mock_retries, mock_backoff_seconds, mock_max_retry_exceeded
+    ):
+        mock_func = MagicMock()
+        mock_func.side_effect = HTTPError(
+            response=MagicMock(reason="rate limit exceeded")
+        )
+
+        with self.assertRaises(MaxRetryExceedException):
+            github_search_backoff(max_retry=3)(mock_func)()
+
+        self.assertEqual(mock_retries.inc.call_count, 3)
+        self.assertEqual(
+            [call.args for call in mock_backoff_seconds.inc.call_args_list],
+            [call.args for call in mock_sleep.call_args_list],
+        )
+        mock_max_retry_exceeded.inc.assert_called_once_with(reason="retries")
+
+    def test_github_search_backoff_raises_non_rate_limit_error(self):
+        mock_func = MagicMock()
+        mock_func.side_effect = HTTPError(response=MagicMock(reason="some other error"))
+
+        decorated_func = github_search_backoff(max_retry=3)(mock_func)
+
+        with self.assertRaises(HTTPError):
+            decorated_func()
+
+        self.assertEqual(mock_func.call_count, 1)
+
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_github_search_backoff_async_retry(self, mock_sleep):
+        mock_func = AsyncMock(
+            side_effect=ClientResponseError(
+                request_info=MagicMock(),
+                history=(),
+                status=403,
+                message="rate limit exceeded",
+            )
+        )
+
+        async def func():
+            return await mock_func()
+
+        decorated_func = github_search_backoff(max_retry=3)(func)
+
+        with self.assertRaises(MaxRetryExceedException):
+            await decorated_func()
+
+        self.assertEqual(mock_func.await_count, 3)
+        self.assertEqual(mock_sleep.await_count, 3)
+
+
+class GitHubRateLimiterTestCase(TestCase):
+
+    def test_parse_rate_limit(self):
+        self.assertEqual(
+            parse_rate_limit(
+                {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "1700000000"}
+            ),
+            RateLimit(3, 1700000000000),
+        )
+        self.assertEqual(parse_rate_limit({"Retry-After": "5"}).remaining, 0)
+        self.assertGreater(parse_rate_limit({"Retry-After": "5"}).blocked_until_ms, 0)
+        self.assertIsNone(parse_rate_limit({}))
+        self.assertIsNone(parse_rate_limit(None))
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    @patch("time.sleep", return_value=None)
+    def test_acquire_waits_until_reset(self, mock_sleep, mock_redis):
+        acquire_script, update_script = MagicMock(), MagicMock()
+        mock_redis.return_value.register_script.side_effect = [
+            acquire_script,
+            update_script,
+        ]
+        acquire_script.side_effect = [2000, 0]  # Exhausted for 2 more seconds
+
+        GitHubRateLimiter().acquire()
+
+        mock_sleep.assert_called_once_with(2)
+        self.assertEqual(acquire_script.call_count, 2)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    @patch("github.ratelimit._now_ms", return_value=1700000000000)
+    def test_conditional_acquire_takes_nothing_from_budget(self, mock_now, mock_redis):
+        acquire_script = MagicMock(return_value=0)
+        mock_redis.return_value.register_script.side_effect = [
+            acquire_script,
+            MagicMock(),
+        ]
+        rate_limiter = GitHubRateLimiter()
+
+        rate_limiter.acquire()
+        rate_limiter.acquire(conditional=True)
+
+        self.assertEqual(
+            [call.kwargs["args"] for call in acquire_script.call_args_list],
+            [[1700000000000, 1], [1700000000000, 0]],
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "GITHUB_RATE_LIMIT_DEADLINE", 10)
+    @patch("github.ratelimit.GITHUB_API_MAX_RETRY_EXCEEDED")
+    @patch("redis.Redis.from_url")
+    @patch("time.sleep", return_value=None)
+    def test_acquire_fails_fast_past_deadline(
+        self, mock_sleep, mock_redis, mock_max_retry_exceeded
+    ):
+        acquire_script = MagicMock(return_value=60000)
+        mock_redis.return_value.register_script.side_effect = [
+            acquire_script,
+            MagicMock(),
+        ]
+
+        with self.assertRaises(MaxRetryExceedException):
+            GitHubRateLimiter().acquire()
+
+        mock_sleep.assert_not_called()
+        mock_max_retry_exceeded.inc.assert_called_once_with(reason="budget")
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    def test_update_records_budget_from_headers(self, mock_redis):
+        acquire_script, update_script = MagicMock(), MagicMock()
+        mock_redis.return_value.register_script.side_effect = [
+            acquire_script,
+            update_script,
+        ]
+        rate_limiter = GitHubRateLimiter()
+
+        rate_limiter.update(
+            {"X-RateLimit-Remaining": "7", "X-RateLimit-Reset": "1700000000"}
+        )
+        rate_limiter.update({})  # Responses without rate limit headers are ignored
+
+        update_script.assert_called_once_with(
+            keys=[rate_limiter._format_key("search")], args=[7, 1700000000000, 0]
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    @patch("github.ratelimit._now_ms", return_value=1700000000000)
+    def test_secondary_rate_limit_ending_before_reset_is_recorded(
+        self, mock_now, mock_redis
+    ):
+        acquire_script, update_script = MagicMock(), MagicMock()
+        mock_redis.return_value.register_script.side_effect = [
+            acquire_script,
+            update_script,
+        ]
+        rate_limiter = GitHubRateLimiter()
+
+        # Blocked for 5 seconds, in a window that resets in a minute
+        rate_limiter.update(
+            {
+                "Retry-After": "5",
+                "X-RateLimit-Remaining": "20",
+                "X-RateLimit-Reset": "1700000060",
+            }
+        )
+        rate_limiter.update({"Retry-After": "5"})
+
+        # The end of the block is recorded apart from the budget, so an earlier end
+        # can't be dropped as an outdated window
+        self.assertEqual(
+            [call.kwargs["args"] for call in update_script.call_args_list],
+            [
+                [20, 1700000060000, 1700000005000],
+                [0, 0, 1700000005000],
+            ],
+        )
+        self.assertIn("blocked_until", ACQUIRE_SCRIPT)
+        self.assertEqual(rate_limit_wait({"Retry-After": "5"}), 5)
+
+
+class GitHubSearchPopularityTestCase(TestCase):
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "SEARCH_POPULARITY_HALF_LIFE", 100)
+    @patch("redis.Redis.from_url")
+    @patch("time.time")
+    def test_record_weighs_recent_searches_more(self, mock_time, mock_redis):
+        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+        popularity = GitHubSearchPopularity()
+        era_length = popularity.ERA_HALF_LIVES * 100
+        pipeline = mock_redis.return_value.pipeline.return_value
+
+        mock_time.return_value = 3 * era_length  # Start of an era
+        popularity.record(search_params)
+        popularity.flush()
+        mock_time.return_value = 3 * era_length + 200  # Two half-lives later
+        popularity.record(search_params)
+        popularity.flush()
+
+        key = popularity._format_key(3)
+        member = search_params.model_dump_json()
+        self.assertEqual(
+            pipeline.zincrby.call_args_list,
+            [((key, 1, member),), ((key, 4, member),)],
+        )
+        pipeline.expire.assert_called_with(key, 2 * era_length)
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    def test_record_counts_canonical_query_and_cache_outcome(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+
+        popularity = GitHubSearchPopularity()
+        popularity.record(
+            GitHubSearchParams(type=SearchType.USER, keyword=" Octocat  "), "stale"
+        )
+        popularity.record(
+            GitHubSearchParams(type=SearchType.USER, keyword="octocat"), "hit"
+        )
+        mock_redis.return_value.pipeline.assert_not_called()  # Counted in memory
+
+        popularity.flush()
+
+        pipeline.zincrby.assert_called_once()  # Both spellings are one search
+        member = pipeline.zincrby.call_args.args[2]
+        self.assertEqual(
+            GitHubSearchParams.model_validate_json(member).keyword, "octocat"
+        )
+        self.assertEqual(
+            pipeline.hincrby.call_args_list,
+            [
+                ((GITHUB_SEARCH_CACHE_STATS_REDIS_KEY, "user|stale", 1),),
+                ((GITHUB_SEARCH_CACHE_STATS_REDIS_KEY, "user|hit", 1),),
+            ],
+        )
+        pipeline.execute.assert_called_once()
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    def test_flush_failure_keeps_the_counts(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.side_effect = [redis.ConnectionError(), None]
+        popularity = GitHubSearchPopularity()
+        popularity.record(
+            GitHubSearchParams(type=SearchType.REPO, keyword="django"), "miss"
+        )
+
+        with self.assertRaises(redis.ConnectionError):
+            popularity.flush()
+        popularity.flush()
+
+        self.assertEqual(
+            pipeline.hincrby.call_args_list,
+            [((GITHUB_SEARCH_CACHE_STATS_REDIS_KEY, "repo|miss", 1),)] * 2,
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    def test_cache_stats_by_search_type(self, mock_redis):
+        mock_redis.return_value.hgetall.return_value = {
+            b"repo|hit": b"8",
+            b"repo|miss": b"2",
+            b"user|stale": b"1",
+        }
+
+        self.assertEqual(
+            GitHubSearchPopularity().cache_stats(),
+            {
+                "repo": {"hit": 8, "stale": 0, "miss": 2},
+                "user": {"hit": 0, "stale": 1, "miss": 0},
+            },
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("redis.Redis.from_url")
+    def test_top_returns_most_popular_first(self, mock_redis):
+        searches = [
+            GitHubSearchParams(type=SearchType.USER, keyword=keyword)
+            for keyword in ("aaa", "bbb", "ccc")
+        ]
+        # ZUNION returns the members by ascending score
+        mock_redis.return_value.zunion.return_value = [
+            (search.model_dump_json().encode(), score)
+            for search, score in zip(searches, (1.0, 2.0, 3.0))
+        ]
+
+        top = GitHubSearchPopularity().top(2)
+
+        self.assertEqual(top, [(searches[2], 3.0), (searches[1], 2.0)])
+
+
+class GitHubClientTestCase(TestCase):
+
+    def test_threads_have_sessions_sharing_one_pool(self):
+        client = GitHubClient(headers={"Authorization": "Bearer token"})
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client.session))
+        thread.start()
+        thread.join()
+
+        self.assertIs(client.session, client.session)
+        self.assertIsNot(sessions[0], client.session)
+        self.assertIs(
+            sessions[0].get_adapter(Config.GITHUB_API_URL),
+            client.session.get_adapter(Config.GITHUB_API_URL),
+        )
+        self.assertEqual(sessions[0].headers["Authorization"], "Bearer token")
+
+    def test_pool_keeps_connections_alive(self):
+        adapter = GitHubClient().session.get_adapter(Config.GITHUB_API_URL)
+
+        self.assertEqual(adapter._pool_maxsize, Config.GITHUB_POOL_MAXSIZE)
+        self.assertIn(
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            adapter.poolmanager.connection_pool_kw["socket_options"],
+        )
+
+    @patch("requests.Session.get")
+    def test_requests_time_out(self, mock_get):
+        client = GitHubClient()
+        client.get(Config.GITHUB_API_URL)
+        client.get(Config.GITHUB_API_URL, timeout=1)
+
+        self.assertEqual(
+            [call.kwargs["timeout"] for call in mock_get.call_args_list],
+            [(Config.GITHUB_CONNECT_TIMEOUT, Config.GITHUB_READ_TIMEOUT), 1],
+        )
+
+
+class GitHubSearchCacheWarmerTestCase(TestCase):
+
+    def setUp(self):
+        self.searches = [
+            (GitHubSearchParams(type=SearchType.REPO, keyword=keyword), 1.0)
+            for keyword in ("aaa", "bbb", "ccc", "ddd")
+        ]
+        for target in ("GitHubSearchService", "GitHubSearchPopularity"):
+            patcher = patch(f"github.warmer.{target}")
+            setattr(self, f"mock_{target}", patcher.start())
+            self.addCleanup(patcher.stop)
+        patcher = patch("github.warmer.GitHubRateLimiter")
+        self.mock_rate_limiter = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_GitHubSearchPopularity.return_value.top.return_value = self.searches
+
+    def test_run_refreshes_popular_searches_near_expiry(self):
+        self.mock_rate_limiter.return_value.remaining.return_value = None
+        refresh = self.mock_GitHubSearchService.return_value.refresh
+        refresh.side_effect = [True, False, True, True]
+
+        warmed = GitHubSearchCacheWarmer().run(top_n=4)
+
+        self.assertEqual(warmed, 3)  # The second one had time left
+        self.mock_GitHubSearchPopularity.return_value.top.assert_called_once_with(4)
+        refresh.assert_called_with(
+            self.searches[3][0],
+            min_ttl=Config.CACHE_STALE_TTL + Config.CACHE_WARM_AHEAD,
+        )
+
+    def test_run_stops_at_budget_share(self):
+        # 30 requests left at first, a quarter of them may be spent
+        self.mock_rate_limiter.return_value.remaining.side_effect = [30, 26, 22]
+        refresh = self.mock_GitHubSearchService.return_value.refresh
+        refresh.return_value = True
+
+        warmed = GitHubSearchCacheWarmer().run(top_n=4, budget_share=0.25)
+
+        self.assertEqual(warmed, 2)
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_run_stops_when_rate_limited(self):
+        self.mock_rate_limiter.return_value.remaining.return_value = None
+        refresh = self.mock_GitHubSearchService.return_value.refresh
+        refresh.side_effect = [True, MaxRetryExceedException()]
+
+        self.assertEqual(GitHubSearchCacheWarmer().run(top_n=4), 1)
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_run_goes_on_after_failed_search(self):
+        self.mock_rate_limiter.return_value.remaining.return_value = None
+        refresh = self.mock_GitHubSearchService.return_value.refresh
+        refresh.side_effect = [
+            True,
+            HTTPError("422 Client Error: Unprocessable Entity"),
+            RequestException("Read timed out"),
+            True,
+        ]
+
+        with self.assertLogs("github.warmer", level="WARNING") as logs:
+            warmed = GitHubSearchCacheWarmer().run(top_n=4)
+
+        self.assertEqual(warmed, 2)
+        self.assertEqual(refresh.call_count, 4)
+        self.assertIn("keyword=bbb", logs.output[0])
+
+    @patch("github.management.commands.warm_search_cache.GitHubSearchCacheWarmer")
+    def test_warm_search_cache_command(self, mock_warmer):
+        mock_warmer.return_value.run.return_value = 3
+        out = StringIO()
+
+        call_command("warm_search_cache", "--top", "10", stdout=out)
+
+        mock_warmer.return_value.run.assert_called_once_with(
+            10, Config.CACHE_WARM_BUDGET_SHARE
+        )
+        self.assertIn("Warmed 3 searches", out.getvalue())
 
 
-class GitHubSearchServiceSingletonTestCase(TestCase):
+class GitHubSearchCacheGenerationsTestCase(TestCase):
 
     @patch.object(SingletonABCMeta, "_instances", {})
-    @patch("github.service.GitHubSearchCacheService")
-    def test_search_cache_hit(self, mock_cache_service):
-        # Setup mock to return cached data
-        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
-        mock_cache_service.return_value.get_cache.return_value = ["cached_result"]
+    @patch("redis.Redis.from_url")
+    def test_tag_holds_global_and_type_generations(self, mock_redis):
+        mock_redis.return_value.hgetall.return_value = {
+            b"*": b"2",
+            b"SearchType.REPO": b"1",
+        }
 
-        # Create instance of the singleton service
-        github_search_service = GitHubSearchService()
+        generations = GitHubSearchCacheGenerations()
 
-        result = github_search_service.search(search_params)
+        self.assertEqual(generations.tag("SearchType.REPO"), "v2.1")
+        self.assertEqual(generations.tag("SearchType.USER"), "v2.0")
+        mock_redis.return_value.hgetall.assert_called_once()  # Kept in memory
 
-        self.assertEqual(result, ["cached_result"])
-        mock_cache_service.return_value.get_cache.assert_called_once_with(
-            github_search_service.generate_cache_key(search_params)
-        )
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "CACHE_GENERATION_TTL", 3600)  # No periodic reload meanwhile
+    @patch("redis.Redis.from_url")
+    @patch("time.monotonic")
+    def test_tag_is_read_from_memory_once_loaded(self, mock_monotonic, mock_redis):
+        mock_redis.return_value.hgetall.return_value = {b"*": b"1"}
+        generations = GitHubSearchCacheGenerations()
+
+        mock_monotonic.return_value = 0
+        generations.tag("SearchType.REPO")
+        mock_monotonic.return_value = 10**6  # Long after the last load
+        self.assertEqual(generations.tag("SearchType.REPO"), "v1.0")
+
+        mock_redis.return_value.hgetall.assert_called_once()
+        mock_redis.return_value.pubsub.return_value.subscribe.assert_called_once()
 
     @patch.object(SingletonABCMeta, "_instances", {})
-    @patch("github.service.GitHubSearchCacheService")
-    @patch.object(GitHubSearchService, "_GitHubSearchService__search_engine")
-    def test_search_cache_miss(self, mock_search_engine, mock_cache_service):
-        # Setup mock cache to return None (cache miss)
-        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
-        mock_cache_service.return_value.get_cache.return_value = None
-        mock_search_engine.return_value = ["api_result"]
+    @patch.object(Config, "CACHE_GENERATION_TTL", 3600)
+    @patch("redis.Redis.from_url")
+    async def test_load_async_reads_in_a_thread(self, mock_redis):
+        loop_thread = threading.get_ident()
+        reader_threads = []
 
-        # Create instance of the singleton service
-        github_search_service = GitHubSearchService()
+        def hgetall(key):
+            reader_threads.append(threading.get_ident())
+            return {b"*": b"4"}
 
-        result = github_search_service.search(search_params)
+        mock_redis.return_value.hgetall.side_effect = hgetall
+        generations = GitHubSearchCacheGenerations()
 
-        self.assertEqual(result, ["api_result"])
-        mock_cache_service.return_value.store_cache.assert_called_once_with(
-            github_search_service.generate_cache_key(search_params), ["api_result"]
-        )
+        await generations.load_async()
+        await generations.load_async()  # Loaded already
+
+        self.assertEqual(generations.tag("SearchType.USER"), "v4.0")
+        self.assertEqual(len(reader_threads), 1)
+        self.assertNotEqual(reader_threads[0], loop_thread)
 
     @patch.object(SingletonABCMeta, "_instances", {})
-    @patch.object(GitHubSearchService, "_GitHubSearchService__fetch_all")
-    def test_search_engine_combines_results(self, mock_fetch_all):
-        # Setup mock to return multiple pages of results
-        search_params = GitHubSearchParams(type=SearchType.REPO, keyword="django")
+    @patch("redis.Redis.from_url")
+    def test_bump_tells_every_worker(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
 
-        chunk_1: GitHubSearchResponse = GitHubSearchResponseFactory.build()
-        chunk_2: GitHubSearchResponse = GitHubSearchResponseFactory.build()
-        expected_output = (
-            chunk_1.model_dump(mode="json")["items"]
-            + chunk_2.model_dump(mode="json")["items"]
+        GitHubSearchCacheGenerations().bump("SearchType.REPO")
+
+        pipeline.hincrby.assert_called_once_with(
+            GITHUB_SEARCH_CACHE_GENERATIONS_REDIS_KEY, "SearchType.REPO"
+        )
+        pipeline.publish.assert_called_once_with(
+            GITHUB_SEARCH_CACHE_GENERATIONS_CHANNEL, ""
         )
+        mock_redis.return_value.hgetall.assert_called_once()  # Reloaded at once
 
-        mock_fetch_all.return_value = [chunk_1, chunk_2]
 
-        # Create instance of the singleton service
-        github_search_service = GitHubSearchService()
+class GitHubSearchCacheServiceTestCase(TestCase):
 
-        result = github_search_service._GitHubSearchService__search_engine(
-            search_params
-        )
+    def setUp(self):
+        # Every key is in generation "v1.0"
+        patcher = patch("github.service.GitHubSearchCacheGenerations")
+        self.mock_generations = patcher.start()
+        self.mock_generations.return_value.tag.return_value = "v1.0"
+        self.addCleanup(patcher.stop)
 
-        self.assertEqual(result, expected_output)
+    @patch("redis.Redis.from_url")
+    def test_raw_reads_and_lock_are_timed_as_redis(self, mock_redis):
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
 
+        def view(request):
+            with cache_service.lock("test_key"):  # Acquired and released
+                cache_service.get_cache_raw_many(["test_key"])
+            return HttpResponse()
 
-class GitHubSearchBackoffTestCase(TestCase):
+        response = server_timing_middleware(view)(RequestFactory().get("/"))
 
-    @patch("time.sleep", return_value=None)  # To avoid real sleep during tests
-    def test_github_search_backoff_retry(self, mock_sleep):
-        mock_func = MagicMock()
-        mock_func.side_effect = HTTPError(
-            response=MagicMock(reason="rate limit exceeded")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^redis;dur=[\d.]+;desc="3 spans", total;dur=[\d.]+$',
         )
 
-        decorated_func = github_search_backoff(max_retry=3)(mock_func)
+    @patch.object(Config, "CACHE_EXPIRY_JITTER", 0)
+    @patch("redis.Redis.from_url")
+    def test_cache_store(self, mock_redis):
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        cache_service.store_cache("test_key", {"some": "data"})
 
-        with self.assertRaises(MaxRetryExceedException):
-            decorated_func()
+        mock_redis.return_value.pipeline.return_value.set.assert_called_once_with(
+            name="GITHUB_CACHE|v1.0|test_key",
+            value=codec.encode(b'{"some": "data"}', Config.CACHE_CODEC),
+            ex=Config.CACHE_EXPIRY + Config.CACHE_STALE_TTL,
+        )
 
-        self.assertEqual(mock_func.call_count, 3)
+    @patch.object(Config, "CACHE_EXPIRY", 1000)
+    @patch.object(Config, "CACHE_EXPIRY_JITTER", 0.1)
+    @patch.object(Config, "CACHE_STALE_TTL", 100)
+    @patch("redis.Redis.from_url")
+    def test_cache_store_jitters_expiry(self, mock_redis):
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        for _ in range(20):
+            cache_service.store_cache("test_key", {"some": "data"})
 
-    def test_github_search_backoff_raises_non_rate_limit_error(self):
-        mock_func = MagicMock()
-        mock_func.side_effect = HTTPError(response=MagicMock(reason="some other error"))
+        expiries = {
+            call.kwargs["ex"]
+            for call in mock_redis.return_value.pipeline.return_value.set.call_args_list
+        }
+        self.assertGreater(len(expiries), 1)
+        for expiry in expiries:
+            self.assertGreaterEqual(expiry, 900 + 100)
+            self.assertLessEqual(expiry, 1100 + 100)
 
-        decorated_func = github_search_backoff(max_retry=3)(mock_func)
+    @patch.object(Config, "CACHE_EXPIRY_JITTER", 0)
+    @patch("redis.Redis.from_url")
+    def test_cache_store_with_etags(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
 
-        with self.assertRaises(HTTPError):
-            decorated_func()
+        cache_service.store_cache_raw("test_key", b"[]", etags=['"a"', '"b"'])
+        pipeline.set.assert_called_with(
+            name=f"GITHUB_CACHE|v1.0|{generate_etags_key('test_key')}",
+            value=codec.encode(b'["\\"a\\"","\\"b\\""]', Config.CACHE_CODEC),
+            ex=Config.CACHE_EXPIRY + Config.CACHE_STALE_TTL,
+        )
+        # Pages without an ETag can't be revalidated
+        pipeline.set.reset_mock()
+        cache_service.store_cache_raw("test_key", b"[]", etags=['"a"', None])
+        pipeline.set.assert_called_once()
 
-        self.assertEqual(mock_func.call_count, 1)
+    @patch.object(Config, "CACHE_EXPIRY_JITTER", 0)
+    @patch("redis.Redis.from_url")
+    def test_cache_extend(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.return_value = [True, True, False]
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+
+        self.assertTrue(cache_service.extend_cache("test_key"))
+        expiry = Config.CACHE_EXPIRY + Config.CACHE_STALE_TTL
+        self.assertEqual(
+            [call.args for call in pipeline.expire.call_args_list],
+            [
+                ("GITHUB_CACHE|v1.0|test_key", expiry),
+                ("GITHUB_CACHE|v1.0|test_key|INDEX", expiry),
+                ("GITHUB_CACHE|v1.0|test_key|ETAGS", expiry),
+            ],
+        )
+        pipeline.execute.return_value = [False, False, False]  # Expired meanwhile
+        self.assertFalse(cache_service.extend_cache("test_key"))
 
+    @patch.object(Config, "CACHE_STALE_TTL", 100)
+    @patch("redis.Redis.from_url")
+    def test_cache_entry_is_stale_past_fresh_period(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
 
-class GitHubSearchCacheServiceTestCase(TestCase):
+        pipeline.execute.return_value = [b'{"some": "data"}', 500 * 1000]
+        self.assertEqual(
+            cache_service.get_entry("test_key"),
+            CacheEntry(b'{"some": "data"}', False, 500 * 1000),
+        )
+        pipeline.execute.return_value = [b'{"some": "data"}', 50 * 1000]
+        self.assertTrue(cache_service.get_entry("test_key").is_stale)
+        pipeline.execute.return_value = [None, -2]
+        self.assertIsNone(cache_service.get_entry("test_key"))
 
+    @patch.object(Config, "CACHE_STALE_TTL", 100)
     @patch("redis.Redis.from_url")
-    def test_cache_store(self, mock_redis):
+    def test_cache_entries_in_one_round_trip(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.return_value = [b"[1]", 500 * 1000, None, -2, b"[3]", 5000]
+
         cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
-        cache_service.store_cache("test_key", {"some": "data"})
+        entries = cache_service.get_entries(["key1", "key2", "key3"])
 
-        mock_redis.return_value.set.assert_called_once_with(
-            name="GITHUB_CACHE|test_key",
-            value='{"some": "data"}',
-            ex=Config.CACHE_EXPIRY,
+        self.assertEqual(
+            entries,
+            [
+                CacheEntry(b"[1]", False, 500 * 1000),
+                None,
+                CacheEntry(b"[3]", True, 5000),
+            ],
         )
+        pipeline.execute.assert_called_once()
+        self.assertEqual(pipeline.get.call_count, 3)
 
     @patch("redis.Redis.from_url")
     def test_cache_retrieve(self, mock_redis):
@@ -141,17 +1758,142 @@ class GitHubSearchCacheServiceTestCase(TestCase):
         result = cache_service.get_cache("test_key")
 
         self.assertEqual(result, {"some": "data"})
-        mock_redis.return_value.get.assert_called_once_with("GITHUB_CACHE|test_key")
+        mock_redis.return_value.get.assert_called_once_with(
+            "GITHUB_CACHE|v1.0|test_key"
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "L1_CACHE_ENABLED", True)
+    @patch("redis.Redis.from_url")
+    def test_cache_retrieve_through_l1(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.return_value = [
+            '{"some": "data"}'.encode("utf-8"),
+            Config.CACHE_EXPIRY * 1000,
+        ]
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        first = cache_service.get_cache_raw("test_key")
+        second = cache_service.get_cache_raw("test_key")
+
+        self.assertEqual(first, b'{"some": "data"}')
+        self.assertIs(second, first)  # Served from memory without decompressing again
+        pipeline.get.assert_called_once_with("GITHUB_CACHE|v1.0|test_key")
+        pipeline.pttl.assert_called_once_with("GITHUB_CACHE|v1.0|test_key")
+        pipeline.execute.assert_called_once()
+        # L1 entries keep the time left on their Redis entry
+        self.assertAlmostEqual(
+            cache_service.get_entry("test_key").ttl_ms,
+            Config.CACHE_EXPIRY * 1000,
+            delta=1000,
+        )
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "L1_CACHE_ENABLED", True)
+    @patch.object(Config, "L1_CACHE_TTL", 60)
+    @patch.object(Config, "CACHE_STALE_TTL", 0)
+    @patch("redis.Redis.from_url")
+    @patch("time.monotonic")
+    def test_cache_l1_ttl_never_outlives_redis(self, mock_monotonic, mock_redis):
+        mock_monotonic.return_value = 100
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.return_value = ['{"some": "data"}'.encode("utf-8"), 5000]
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        cache_service.get_cache("test_key")
+
+        # The Redis entry had 5 seconds left, well below L1_CACHE_TTL
+        mock_monotonic.return_value = 105
+        pipeline.execute.return_value = [None, -2]
+        self.assertIsNone(cache_service.get_cache("test_key"))
+        self.assertEqual(pipeline.execute.call_count, 2)
 
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch.object(Config, "L1_CACHE_ENABLED", True)
     @patch("redis.Redis.from_url")
-    def test_cache_clear(self, mock_redis):
-        mock_redis.return_value.scan_iter.return_value = ["key1", "key2"]
+    def test_cache_clear_invalidates_l1_in_every_worker(self, mock_redis):
+        mock_redis.return_value.scan_iter.return_value = []
 
-        cache_service = GitHubSearchCacheService()
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        cache_service.store_cache("test_key", {"some": "data"})
         cache_service.clear_all_cache()
 
-        mock_redis.return_value.delete.assert_any_call("key1")
-        mock_redis.return_value.delete.assert_any_call("key2")
+        mock_redis.return_value.publish.assert_called_once_with(
+            GITHUB_SEARCH_L1_INVALIDATION_CHANNEL, "GITHUB_CACHE|"
+        )
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.return_value = [None, -2]
+        self.assertIsNone(cache_service.get_cache("test_key"))
+
+    @patch("redis.Redis.from_url")
+    def test_cache_lock(self, mock_redis):
+        mock_redis.return_value.lock.return_value.acquire.return_value = True
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        with cache_service.lock("test_key") as acquired:
+            self.assertTrue(acquired)
+
+        mock_redis.return_value.lock.assert_called_once_with(
+            "GITHUB_CACHE|LOCK|test_key",
+            timeout=Config.CACHE_LOCK_TIMEOUT,
+            blocking_timeout=Config.CACHE_LOCK_WAIT,
+        )
+        mock_redis.return_value.lock.return_value.release.assert_called_once()
+
+    @patch("redis.Redis.from_url")
+    def test_cache_retrieve_compressed(self, mock_redis):
+        # Legacy JSON entries (see test_cache_retrieve) and compressed ones coexist
+        mock_redis.return_value.get.return_value = codec.encode(
+            b'{"some": "data"}', "lzma"
+        )
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        result = cache_service.get_cache("test_key")
+
+        self.assertEqual(result, {"some": "data"})
+
+    @patch("redis.Redis.from_url")
+    def test_cache_clear_bumps_generation_then_sweeps(self, mock_redis):
+        mock_redis.return_value.scan_iter.return_value = [
+            b"GITHUB_CACHE|v1.0|SearchType.REPO|current",
+            b"GITHUB_CACHE|v0.0|SearchType.REPO|outdated",
+            b"GITHUB_CACHE|LOCK|SearchType.REPO|outdated",
+            b"GITHUB_CACHE|SearchType.REPO|unversioned",
+        ]
+        mock_redis.return_value.unlink.return_value = 2
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+        sweep = cache_service.clear_all_cache(SearchType.REPO)
+
+        self.mock_generations.return_value.bump.assert_called_once_with(
+            "SearchType.REPO"
+        )
+        self.assertEqual(sweep.result(), 2)
+        mock_redis.return_value.scan_iter.assert_called_once_with(
+            match="GITHUB_CACHE|*|SearchType.REPO|*",
+            count=Config.CACHE_SWEEP_BATCH_SIZE,
+        )
+        mock_redis.return_value.unlink.assert_called_once_with(
+            b"GITHUB_CACHE|v0.0|SearchType.REPO|outdated",
+            b"GITHUB_CACHE|SearchType.REPO|unversioned",
+        )
+        mock_redis.return_value.delete.assert_not_called()
+
+    @patch.object(Config, "CACHE_SWEEP_BATCH_SIZE", 2)
+    @patch("redis.Redis.from_url")
+    def test_cache_sweep_unlinks_by_batch(self, mock_redis):
+        mock_redis.return_value.scan_iter.return_value = [
+            f"GITHUB_CACHE|v0.0|SearchType.USER|{i}".encode() for i in range(5)
+        ]
+        mock_redis.return_value.unlink.side_effect = lambda *keys: len(keys)
+
+        cache_service = GitHubSearchCacheService(cache_prefix="GITHUB_CACHE")
+
+        self.assertEqual(cache_service.sweep(), 5)
+        self.assertEqual(
+            [len(call.args) for call in mock_redis.return_value.unlink.call_args_list],
+            [2, 2, 1],
+        )
 
 
 class GitHubSearchViewTestCase(APITestCase):
@@ -168,12 +1910,12 @@ class GitHubSearchViewTestCase(APITestCase):
             "keyword": 12345,  # Invalid type for keyword
         }
 
-    @patch("github.views.GitHubSearchService.search")
+    @patch("github.views.GitHubSearchService.search_raw")
     def test_search_github_success(self, mock_search_service):
         """
         Test search_github view with valid data.
         """
-        mock_search_service.return_value = ["result1", "result2"]
+        mock_search_service.return_value = b'["result1", "result2"]'
 
         response = self.client.post(
             self.search_url,
@@ -186,7 +1928,78 @@ class GitHubSearchViewTestCase(APITestCase):
         self.assertEqual(response.json()["search_params"]["keyword"], "django")
         mock_search_service.assert_called_once()
 
-    @patch("github.views.GitHubSearchService.search")
+    def test_search_github_get_redirects_to_canonical_url(self):
+        response = self.client.get(
+            self.search_url, {"keyword": " Django ", "type": "repo", "profile": "full"}
+        )
+
+        self.assertEqual(response.status_code, HTTP_301_MOVED_PERMANENTLY)
+        self.assertEqual(response["Location"], "/api/search?type=repo&keyword=django")
+
+    @patch.object(Config, "CACHE_STALE_TTL", 1800)
+    @patch.object(Config, "HTTP_GZIP_MIN_SIZE", 1024)
+    @patch("github.views.GitHubSearchService.search_entry")
+    def test_search_github_get_is_cacheable(self, mock_search_entry):
+        mock_search_entry.return_value = CacheEntry(b'["result1"]', False, 5400 * 1000)
+        url = "/api/search?type=repo&keyword=django"
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()["results"], ["result1"])  # Too small to gzip
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(
+            response["Cache-Control"],
+            "public, max-age=3600, stale-while-revalidate=1800",
+        )
+        etag = response["ETag"]
+        self.assertEqual(etag, http_cache.body_etag(response.content))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+        # A stale result may only be served while it is refreshed
+        mock_search_entry.return_value = CacheEntry(b'["result1"]', True, 600 * 1000)
+        response = self.client.get(url)
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=0, stale-while-revalidate=600"
+        )
+
+    @patch.object(Config, "HTTP_GZIP_MIN_SIZE", 100)
+    @patch.object(SingletonABCMeta, "_instances", {})
+    @patch("github.views.GitHubSearchService.search_entry")
+    def test_search_github_get_large_body_is_gzipped(self, mock_search_entry):
+        results = serialize_results([{"name": f"repo{i}"} for i in range(20)])
+        # Incomplete results aren't cached, they must be revalidated every time
+        mock_search_entry.return_value = CacheEntry(results, False, None)
+        url = "/api/search?type=repo&keyword=django"
+
+        with patch("gzip.compress", wraps=gzip.compress) as mock_compress:
+            responses = [
+                self.client.get(url, HTTP_ACCEPT_ENCODING="br, gzip;q=0.8")
+                for _ in range(2)
+            ]
+
+        mock_compress.assert_called_once()  # Compressed once for both responses
+        for response in responses:
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(response["Cache-Control"], "no-cache")
+            self.assertIn("Accept-Encoding", response["Vary"])
+            self.assertEqual(
+                json.loads(gzip.decompress(response.content))["results"],
+                json.loads(results),
+            )
+        etag = responses[0]["ETag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=f"W/{etag}"
+        )
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+    @patch("github.views.GitHubSearchService.search_raw")
     def test_search_github_invalid_data(self, mock_search_service):
         """
         Test search_github view with invalid Pydantic data.
@@ -207,7 +2020,7 @@ class GitHubSearchViewTestCase(APITestCase):
         )
         mock_search_service.assert_not_called()
 
-    @patch("github.views.GitHubSearchService.search")
+    @patch("github.views.GitHubSearchService.search_raw")
     def test_search_github_service_raises_max_retry_exception(
         self,
         mock_search_service,
@@ -228,6 +2041,179 @@ class GitHubSearchViewTestCase(APITestCase):
         self.assertEqual(response.json()["error"], "Try again after a while")
         mock_search_service.assert_called_once()
 
+    @patch("github.views.GitHubSearchService.search_stream")
+    def test_search_github_stream_success(self, mock_search_stream):
+        mock_search_stream.return_value = iter([b'"result1"\n', b'"result2"\n'])
+
+        response = self.client.post(
+            "/api/search/stream", data=self.valid_search_data, format="json"
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            b"".join(response.streaming_content), b'"result1"\n"result2"\n'
+        )
+
+    @patch("github.views.GitHubSearchService.search_stream")
+    def test_search_github_stream_max_retry_exception(self, mock_search_stream):
+        def stream(_):
+            raise MaxRetryExceedException()
+            yield
+
+        mock_search_stream.side_effect = stream
+
+        response = self.client.post(
+            "/api/search/stream", data=self.valid_search_data, format="json"
+        )
+
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()["error"], "Try again after a while")
+
+    @patch("github.views.GitHubSearchService.search_page")
+    def test_search_github_page_success(self, mock_search_page):
+        mock_search_page.return_value = {
+            "results": ["result1"],
+            "total_count": 31,
+            "has_next": True,
+        }
+
+        response = self.client.post(
+            "/api/search/page",
+            data={**self.valid_search_data, "page": 2, "page_size": 30},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()["results"], ["result1"])
+        self.assertEqual(response.json()["total_count"], 31)
+        self.assertTrue(response.json()["has_next"])
+        self.assertEqual(response.json()["search_params"]["page"], 2)
+
+    @patch("github.views.GitHubSearchService.search_results")
+    def test_search_github_results_success(self, mock_search_results):
+        mock_search_results.return_value = {
+            "results": b'[\n{"id":1}\n]',
+            "total_count": 1,
+            "has_next": False,
+        }
+
+        response = self.client.post(
+            "/api/search/results",
+            data={**self.valid_search_data, "sort": "stars", "language": "python"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()["results"], [{"id": 1}])
+        self.assertEqual(response.json()["total_count"], 1)
+        self.assertFalse(response.json()["has_next"])
+        self.assertEqual(response.json()["search_params"]["sort"], "stars")
+        self.assertEqual(response.json()["search_params"]["order"], "desc")
+
+    @patch("github.views.GitHubSearchService.search_many")
+    def test_search_github_batch_reports_status_per_search(self, mock_search_many):
+        mock_search_many.return_value = [
+            b'[{"id":1}]',
+            MaxRetryExceedException(),
+            HTTPError("502 Server Error"),
+        ]
+
+        response = self.client.post(
+            "/api/search/batch",
+            data={
+                "searches": [
+                    self.valid_search_data,
+                    {"type": "user", "keyword": "octocat"},
+                    {"type": "issue", "keyword": "bug"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        responses = response.json()["responses"]
+        self.assertEqual([item["status"] for item in responses], [200, 429, 502])
+        self.assertEqual(responses[0]["results"], [{"id": 1}])
+        self.assertEqual(responses[1]["error"], "Try again after a while")
+        self.assertEqual(responses[2]["search_params"]["keyword"], "bug")
+
+    @patch("github.views.GitHubSearchService.search_many")
+    def test_search_github_batch_reports_invalid_search_in_its_slot(
+        self, mock_search_many
+    ):
+        mock_search_many.return_value = [b'[{"id":1}]']
+
+        response = self.client.post(
+            "/api/search/batch",
+            data={
+                "searches": [
+                    {"type": "user", "keyword": ""},
+                    self.valid_search_data,
+                    "octocat",
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        responses = response.json()["responses"]
+        self.assertEqual([item["status"] for item in responses], [400, 200, 400])
+        self.assertIn("keyword", responses[0]["errors"])
+        self.assertEqual(responses[0]["search_params"]["type"], "user")
+        self.assertEqual(responses[1]["results"], [{"id": 1}])
+        self.assertIn("non_field_errors", responses[2]["errors"])
+        (searches,), _ = mock_search_many.call_args
+        self.assertEqual(searches, [GitHubSearchParams(**self.valid_search_data)])
+
+    @patch("github.views.GitHubSearchService.search_many")
+    def test_search_github_batch_of_invalid_searches_searches_nothing(
+        self, mock_search_many
+    ):
+        response = self.client.post(
+            "/api/search/batch",
+            data={"searches": [{"type": "bogus", "keyword": "octocat"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()["responses"][0]["status"], 400)
+        mock_search_many.assert_not_called()
+
+    @patch("github.views.GitHubSearchService.search_many")
+    def test_search_github_batch_rejects_too_many_searches(self, mock_search_many):
+        searches = [self.valid_search_data] * (Config.GITHUB_SEARCH_BATCH_LIMIT + 1)
+
+        response = self.client.post(
+            "/api/search/batch",
+            data={"searches": searches},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        mock_search_many.assert_not_called()
+
+    @patch("github.views.GitHubSearchService.search_many")
+    def test_search_github_batch_needs_searches(self, mock_search_many):
+        response = self.client.post(
+            "/api/search/batch", data={"searches": []}, format="json"
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        mock_search_many.assert_not_called()
+
+    @patch("github.views.GitHubSearchService.search_page")
+    def test_search_github_page_past_result_limit(self, mock_search_page):
+        response = self.client.post(
+            "/api/search/page",
+            data={**self.valid_search_data, "page": 11, "page_size": 100},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn("non_field_errors", response.json())
+        mock_search_page.assert_not_called()
+
     @patch("github.views.GitHubSearchService.clear_cache")
     def test_clear_cache_success(self, mock_clear_cache_service):
         """
@@ -237,4 +2223,65 @@ class GitHubSearchViewTestCase(APITestCase):
 
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(response.json()["success"], True)
-        mock_clear_cache_service.assert_called_once()
+        mock_clear_cache_service.assert_called_once_with(None)
+
+    @patch("github.views.GitHubSearchService.clear_cache")
+    def test_clear_cache_of_search_type(self, mock_clear_cache_service):
+        response = self.client.get(self.clear_cache_url, {"type": "repo"})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        mock_clear_cache_service.assert_called_once_with(SearchType.REPO)
+
+        response = self.client.get(self.clear_cache_url, {"type": "INVALID"})
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+
+class AsyncGitHubSearchViewTestCase(APITestCase):
+    search_url = "/api/async/search"
+
+    @patch("github.views.AsyncGitHubSearchService.search_raw", new_callable=AsyncMock)
+    async def test_search_github_async_success(self, mock_search_service):
+        mock_search_service.return_value = b'["result1", "result2"]'
+
+        response = await self.async_client.post(
+            self.search_url,
+            data={"type": "repo", "keyword": "django"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()["results"], ["result1", "result2"])
+        self.assertEqual(response.json()["search_params"]["type"], "repo")
+        mock_search_service.assert_awaited_once()
+
+    @patch("github.views.AsyncGitHubSearchService.search_raw", new_callable=AsyncMock)
+    async def test_search_github_async_invalid_data(self, mock_search_service):
+        response = await self.async_client.post(
+            self.search_url,
+            data={"type": "INVALID", "keyword": 12345},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertDictEqual(
+            response.json(),
+            {
+                "type": "Input should be 'user', 'repo' or 'issue'",
+                "keyword": "Input should be a valid string",
+            },
+        )
+        mock_search_service.assert_not_awaited()
+
+    @patch("github.views.AsyncGitHubSearchService.search_raw", new_callable=AsyncMock)
+    async def test_search_github_async_max_retry_exception(self, mock_search_service):
+        mock_search_service.side_effect = MaxRetryExceedException()
+
+        response = await self.async_client.post(
+            self.search_url,
+            data={"type": "repo", "keyword": "django"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()["error"], "Try again after a while")
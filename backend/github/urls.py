@@ -2,10 +2,20 @@ from django.urls import path
 from .views import (
     clear_cache,
     search_github,
+    search_github_batch,
+    search_github_page,
+    search_github_results,
+    search_github_stream,
+    search_github_async,
 )
 
 
 urlpatterns = [
     path("search", search_github, name="search_github"),
+    path("search/stream", search_github_stream, name="search_github_stream"),
+    path("search/page", search_github_page, name="search_github_page"),
+    path("search/results", search_github_results, name="search_github_results"),
+    path("search/batch", search_github_batch, name="search_github_batch"),
+    path("async/search", search_github_async, name="search_github_async"),
     path("clear-cache", clear_cache, name="clear_cache"),
 ]
@@ -1,46 +1,281 @@
-from rest_framework.status import HTTP_200_OK
+from itertools import chain
+
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponsePermanentRedirect,
+    StreamingHttpResponse,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_429_TOO_MANY_REQUESTS,
+    HTTP_502_BAD_GATEWAY,
+)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from pydantic_core import ValidationError, to_json
 
-from utils import max_retry_exceed_exception_handler, pydantic_exception_handler
+from config import Config
+from utils import (
+    http_cache,
+    max_retry_exceed_exception_handler,
+    pydantic_exception_handler,
+    validation_errors,
+)
+from utils.exceptions import MaxRetryExceedException
+from utils.timing import span
 
-from .schemas import GitHubSearchParams  # Import schema for validating search params
+from .async_service import AsyncGitHubSearchService
+from .schemas import (
+    GitHubClearCacheParams,
+    GitHubSearchBatchParams,
+    GitHubSearchPageParams,
+    GitHubSearchParams,
+    GitHubSearchResultsParams,
+)  # Import schemas for validating search params
 from .service import (
     GitHubSearchService,
 )  # Import the service responsible for searching GitHub
 
 
+# Build the search response body around the results serialized by the service
+# The results are spliced in as they are, a cached result is never parsed nor re-encoded.
+# `fields` are added to the response next to the results
+def search_body(results: bytes, search_params: GitHubSearchParams, **fields):
+    return b"".join(
+        (
+            b'{"results":',
+            results,
+            *(
+                b',"%s":%s' % (name.encode(), to_json(value))
+                for name, value in fields.items()
+            ),
+            b',"search_params":',
+            to_json(search_params.model_dump()),
+            b"}",
+        )
+    )
+
+
+def search_response(results: bytes, search_params: GitHubSearchParams, **fields):
+    with span("render"):
+        body = search_body(results, search_params, **fields)
+    return HttpResponse(body, status=HTTP_200_OK, content_type="application/json")
+
+
+# Response of a GET search that HTTP caches (browsers, proxies, CDNs) can store
+# The ETag hashes the body and Cache-Control follows the time left on the cached
+# result. A client holding the current body gets a 304 without it, and large bodies
+# are sent gzip-compressed, compressed once per version of the body
+def cacheable_search_response(request: Request, entry, search_params):
+    with span("render"):
+        body = search_body(entry.data, search_params)
+        etag = http_cache.body_etag(body)
+    use_gzip = len(body) >= Config.HTTP_GZIP_MIN_SIZE and http_cache.accepts_gzip(
+        request.headers.get("Accept-Encoding")
+    )
+    if use_gzip:
+        etag = http_cache.gzip_etag(etag)
+
+    if http_cache.etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=HTTP_304_NOT_MODIFIED)
+    elif use_gzip:
+        with span("gzip"):
+            compressed = http_cache.GzipBodyCache().compress(etag, body)
+        response = HttpResponse(
+            compressed,
+            status=HTTP_200_OK,
+            content_type="application/json",
+        )
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(
+            body, status=HTTP_200_OK, content_type="application/json"
+        )
+    response["ETag"] = etag
+    response["Cache-Control"] = http_cache.cache_control(
+        entry.ttl_ms, Config.CACHE_STALE_TTL
+    )
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+# Status and message of a failed search of a batch, as the search endpoint reports them
+def batch_search_error(e: Exception):
+    if isinstance(e, MaxRetryExceedException):
+        return HTTP_429_TOO_MANY_REQUESTS, "Try again after a while"
+    return HTTP_502_BAD_GATEWAY, str(e) if Config.DEV_STAGE else "GitHub search failed"
+
+
 # API endpoint to handle GitHub search
-# This view accepts POST requests to perform a GitHub search based on provided parameters
-@api_view(["POST"])
+# This view accepts POST requests to perform a GitHub search based on provided parameters.
+# GET requests take them from the query string and get HTTP-cacheable responses, see
+# cacheable_search_response
+@api_view(["GET", "POST"])
 @pydantic_exception_handler()  # Handles Pydantic validation errors
 @max_retry_exceed_exception_handler()  # Handles rate-limit retry exceptions
 def search_github(request: Request):
+    if request.method == "GET":
+        search_params = GitHubSearchParams.from_query_params(request.query_params)
+        # Searches with the same results share one URL, and one HTTP cache entry
+        query_string = search_params.canonical_query_string()
+        if request.META.get("QUERY_STRING") != query_string:
+            return HttpResponsePermanentRedirect(f"{request.path}?{query_string}")
+        entry = GitHubSearchService().search_entry(search_params)
+        return cacheable_search_response(request, entry, search_params)
+
     # Parse and validate the search parameters from the request body using GitHubSearchParams schema
     search_params = GitHubSearchParams(**request.data)
 
     # Call the GitHubSearchService to perform the search with the validated parameters
-    search_result = GitHubSearchService().search(search_params)
+    search_result = GitHubSearchService().search_raw(search_params)
 
     # Return the search results along with the search parameters used in the request
+    return search_response(search_result, search_params)
+
+
+# API endpoint streaming the results of a GitHub search as NDJSON (one item per line)
+# Items are sent as soon as their GitHub page is parsed instead of after the last page
+@api_view(["POST"])
+@pydantic_exception_handler()  # Handles Pydantic validation errors
+@max_retry_exceed_exception_handler()  # Handles rate-limit retry exceptions
+def search_github_stream(request: Request):
+    search_params = GitHubSearchParams(**request.data)
+
+    stream = GitHubSearchService().search_stream(search_params)
+    # Produce the first chunk here, so a failure before any item still gets an error response
+    first_chunk = next(stream, b"")
+
+    return StreamingHttpResponse(
+        chain([first_chunk], stream),
+        status=HTTP_200_OK,
+        content_type="application/x-ndjson",
+    )
+
+
+# API endpoint to fetch a single page of a GitHub search
+# Only the GitHub pages covering the requested window are fetched and cached
+@api_view(["POST"])
+@pydantic_exception_handler()  # Handles Pydantic validation errors
+@max_retry_exceed_exception_handler()  # Handles rate-limit retry exceptions
+def search_github_page(request: Request):
+    search_params = GitHubSearchPageParams(**request.data)
+
+    search_result = GitHubSearchService().search_page(search_params)
+
     return Response(
         data={
-            "results": search_result,  # The actual search results
-            "search_params": search_params.model_dump(),  # Return the validated parameters for reference
+            **search_result,  # The page of results, total_count and has_next
+            "search_params": search_params.model_dump(),
         },
-        status=HTTP_200_OK,  # Return status 200 to indicate success
-        content_type="application/json",  # Specify the content type as JSON
+        status=HTTP_200_OK,
+        content_type="application/json",
+    )
+
+
+# API endpoint serving a sorted and filtered page of the cached results of a search
+# Once the search is cached, no GitHub request is made and the results aren't parsed
+@api_view(["POST"])
+@pydantic_exception_handler()  # Handles Pydantic validation errors
+@max_retry_exceed_exception_handler()  # Handles rate-limit retry exceptions
+def search_github_results(request: Request):
+    search_params = GitHubSearchResultsParams(**request.data)
+
+    search_result = GitHubSearchService().search_results(search_params)
+
+    return search_response(
+        search_result["results"],
+        search_params,
+        total_count=search_result["total_count"],
+        has_next=search_result["has_next"],
     )
 
 
+# API endpoint running several GitHub searches in one request, e.g. for a dashboard
+# Every search gets its own status, a failed search doesn't fail the batch. An invalid
+# search gets a 400 in its slot, only an invalid envelope rejects the whole batch
+@api_view(["POST"])
+@pydantic_exception_handler()  # Handles Pydantic validation errors of the envelope
+def search_github_batch(request: Request):
+    batch_params = GitHubSearchBatchParams(**request.data)
+
+    searches = []  # Valid search params, or the errors of the invalid ones
+    for search in batch_params.searches:
+        try:
+            searches.append(GitHubSearchParams.model_validate(search))
+        except ValidationError as e:
+            searches.append(validation_errors(e))
+    valid_searches = [
+        search_params
+        for search_params in searches
+        if isinstance(search_params, GitHubSearchParams)
+    ]
+    results = iter(
+        GitHubSearchService().search_many(valid_searches) if valid_searches else []
+    )
+
+    responses = []
+    for search, search_params in zip(batch_params.searches, searches):
+        if not isinstance(search_params, GitHubSearchParams):
+            responses.append(
+                to_json(
+                    {
+                        "status": HTTP_400_BAD_REQUEST,
+                        "errors": search_params,
+                        "search_params": search,
+                    }
+                )
+            )
+            continue
+        result = next(results)
+        if isinstance(result, Exception):
+            status, error = batch_search_error(result)
+            responses.append(
+                to_json(
+                    {
+                        "status": status,
+                        "error": error,
+                        "search_params": search_params.model_dump(),
+                    }
+                )
+            )
+        else:
+            responses.append(search_body(result, search_params, status=HTTP_200_OK))
+    body = b'{"responses":[' + b",".join(responses) + b"]}"
+    return HttpResponse(body, status=HTTP_200_OK, content_type="application/json")
+
+
+# Async API endpoint to handle GitHub search
+# Same contract as search_github, but waiting on GitHub and Redis doesn't hold a
+# thread when served by ASGI. DRF views are sync only, so this is a plain Django view
+@csrf_exempt
+@require_POST
+@pydantic_exception_handler()  # Handles Pydantic validation errors
+@max_retry_exceed_exception_handler()  # Handles rate-limit retry exceptions
+async def search_github_async(request: HttpRequest):
+    # Parse and validate the JSON body using GitHubSearchParams schema
+    search_params = GitHubSearchParams.model_validate_json(request.body)
+
+    search_result = await AsyncGitHubSearchService().search_raw(search_params)
+
+    return search_response(search_result, search_params)
+
+
 # API endpoint to clear the cache
-# This view handles GET requests to clear the cached GitHub search results
+# This view handles GET requests to clear the cached GitHub search results, all of them
+# or those of the search type given by the `type` query parameter
 @api_view(["GET"])
-@pydantic_exception_handler()  # Handles any Pydantic errors, though unlikely for GET requests
+@pydantic_exception_handler()  # Handles an invalid search type
 def clear_cache(request: Request):
-    # Call the service to clear all cached search results
-    GitHubSearchService().clear_cache()
+    clear_params = GitHubClearCacheParams(**request.query_params.dict())
+
+    # The results are unreachable at once, they are deleted in the background
+    GitHubSearchService().clear_cache(clear_params.type)
 
     # Return a success response indicating that the cache was cleared
     return Response(
@@ -0,0 +1,57 @@
+import logging
+from typing import Optional
+
+from config import Config
+from utils.exceptions import MaxRetryExceedException
+
+from .popularity import GitHubSearchPopularity
+from .ratelimit import GitHubRateLimiter
+from .service import GitHubSearchService
+
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubSearchCacheWarmer:
+    # Re-fetch the most popular searches shortly before the end of their fresh period,
+    # so they are served from the cache instead of paying a cold miss
+    # Only spends a share of the GitHub rate limit budget, the rest is left to the users
+
+    def __init__(self):
+        self.__search_service = GitHubSearchService()
+        self.__popularity = GitHubSearchPopularity()
+        self.__rate_limiter = GitHubRateLimiter()
+
+    # Warm the `top_n` most popular searches, returns the number of searches re-fetched
+    # The budget is checked before each search, a search fetches up to 10 pages so a
+    # run may go slightly past its share. A search that fails is logged and skipped
+    def run(
+        self,
+        top_n: int = Config.CACHE_WARM_TOP_N,
+        budget_share: float = Config.CACHE_WARM_BUDGET_SHARE,
+    ):
+        # Results with less than this left are past (or close to) their fresh period
+        min_ttl = Config.CACHE_STALE_TTL + Config.CACHE_WARM_AHEAD
+        budget_floor: Optional[float] = None
+        warmed = 0
+        for search_params, _ in self.__popularity.top(top_n):
+            remaining = self.__rate_limiter.remaining()
+            if remaining is not None:
+                if budget_floor is None:
+                    budget_floor = remaining * (1 - budget_share)
+                if remaining <= budget_floor:
+                    logger.info("Cache warmer used its share of the rate limit")
+                    break
+            try:
+                if self.__search_service.refresh(search_params, min_ttl=min_ttl):
+                    warmed += 1
+            except MaxRetryExceedException:  # Rate limited, try again on the next run
+                logger.info("Cache warmer stopped by the rate limit")
+                break
+            except Exception as e:  # e.g. a query GitHub rejects, the others go on
+                logger.warning(
+                    "Cache warmer failed to refresh %s: %r",
+                    search_params.canonical_query_string(),
+                    e,
+                )
+        return warmed
@@ -42,6 +42,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utils.metrics.metrics_middleware",  # First, to time the whole request
+    "utils.timing.server_timing_middleware",
+    "utils.timing.profiling_middleware",
+    "utils.abs.warm_up_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -17,6 +17,9 @@ Including another URLconf
 
 from django.urls import path, include
 
+from utils.metrics import metrics_view
+
 urlpatterns = [
     path("api/", include("github.urls")),
+    path("metrics", metrics_view, name="metrics"),  # Prometheus
 ]
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "molyneux_backend.settings")
 
 application = get_wsgi_application()
+
+# Imported once the settings are loaded by the application
+from config import Config  # noqa: E402
+from github.service import warm_up_search  # noqa: E402
+from utils import warm_up_workers  # noqa: E402
+
+if Config.WARM_UP_ON_BOOT:
+    # Workers forked from this process (pre-fork servers) warm their own connections
+    # on their first request, or from the server's post-fork hook: warm_up_process
+    warm_up_workers(warm_up_search)
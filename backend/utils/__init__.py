@@ -1,15 +1,34 @@
-from .abs import AbstractGlobalInstance, SingletonABCMeta
+from . import codec, http_cache
+from .abs import (
+    AbstractGlobalInstance,
+    SingletonABCMeta,
+    warm_up_process,
+    warm_up_workers,
+)
+from .aio import LoopLocal
+from .cache import TTLLRUCache
 from .httpx import (
     max_retry_exceed_exception_handler,
     pydantic_exception_handler,
     unknow_exception_handler,
+    validation_errors,
 )
+from .singleflight import AsyncSingleFlight, SingleFlight
 
 
 __all__ = [
     "AbstractGlobalInstance",
+    "AsyncSingleFlight",
+    "LoopLocal",
     "SingletonABCMeta",
+    "SingleFlight",
+    "TTLLRUCache",
+    "codec",
+    "http_cache",
     "max_retry_exceed_exception_handler",
     "pydantic_exception_handler",
     "unknow_exception_handler",
+    "validation_errors",
+    "warm_up_process",
+    "warm_up_workers",
 ]
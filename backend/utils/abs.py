@@ -1,21 +1,136 @@
+import logging
+import os
+import threading
 from abc import ABCMeta
 
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
 
 class SingletonABCMeta(ABCMeta):
     _instances = {}
+    # Reentrant, an instance may create other singletons while it is built
+    _lock = threading.RLock()
+    # Instances inherited from the parent process, see _after_fork
+    _inherited = []
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
-        return cls._instances[cls]
+        instance = cls._instances.get(cls)
+        if instance is None:
+            # Checked again under the lock, another thread may have built it meanwhile
+            with SingletonABCMeta._lock:
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = super().__call__(*args, **kwargs)
+                    cls._instances[cls] = instance
+        return instance
+
+    # A forked worker builds its own instances: those of the parent share its sockets
+    # (HTTP sessions, Redis pools) and their thread pools lost their threads. They are
+    # kept, not collected, so closing them can't shut the parent's connections down
+    @staticmethod
+    def _after_fork():
+        SingletonABCMeta._lock = threading.RLock()
+        SingletonABCMeta._inherited.extend(SingletonABCMeta._instances.values())
+        SingletonABCMeta._instances.clear()
+
+
+os.register_at_fork(after_in_child=SingletonABCMeta._after_fork)
 
 
 class AbstractGlobalInstance(metaclass=SingletonABCMeta):
     pass
 
 
+# Warm-ups of every process of the app, see warm_up_workers
+_warm_ups = []
+# Process that ran them, a worker forked from it still has to run its own
+_warmed_up_pid = None
+_warm_up_lock = threading.Lock()
+
+
+def _warm_up(warm_up):
+    try:
+        warm_up()
+    except Exception as e:  # The worker serves requests anyway, just slower at first
+        logger.warning("Failed to warm up %s: %r", warm_up.__name__, e)
+
+
+def _run_warm_ups():
+    for warm_up in list(_warm_ups):
+        _warm_up(warm_up)
+
+
+# Whether this process still has to run the warm-ups, claiming them if so
+def _claim_warm_up():
+    global _warmed_up_pid
+    if _warmed_up_pid == os.getpid():
+        return False
+    with _warm_up_lock:
+        if _warmed_up_pid == os.getpid():
+            return False
+        _warmed_up_pid = os.getpid()
+        return True
+
+
+# Run the warm-ups in this process, once per process
+# Called in a forked worker by warm_up_middleware, or sooner from the server's
+# post-fork hook (e.g. gunicorn's `post_fork`). Never from a fork hook: forking
+# must stay cheap, and a forked process may never serve a request
+def warm_up_process():
+    if _claim_warm_up():
+        _run_warm_ups()
+
+
+# Run `warm_up` now, and in every worker forked from this process before it serves
+# its first requests (see warm_up_process)
+# Meant for the boot of the app (wsgi.py, asgi.py). Failures are logged
+def warm_up_workers(warm_up):
+    global _warmed_up_pid
+    _warm_ups.append(warm_up)
+    _warmed_up_pid = os.getpid()
+    _warm_up(warm_up)
+
+
+# A lock held by another thread of the parent would never be released in the child
+def _reset_warm_up_lock():
+    global _warm_up_lock
+    _warm_up_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_warm_up_lock)
+
+
+# Warm up a forked worker in the background on its first request, unless it already
+# was: the request doesn't wait for it, and the event loop of an async worker never
+# runs the blocking warm-ups
+@sync_and_async_middleware
+def warm_up_middleware(get_response):
+    def warm_up_in_background():
+        if _warm_ups and _claim_warm_up():
+            threading.Thread(target=_run_warm_ups, name="warm-up", daemon=True).start()
+
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            warm_up_in_background()
+            return await get_response(request)
+
+        return async_middleware
+
+    def middleware(request):
+        warm_up_in_background()
+        return get_response(request)
+
+    return middleware
+
+
 __all__ = [
     "AbstractGlobalInstance",
     "SingletonABCMeta",
+    "warm_up_middleware",
+    "warm_up_process",
+    "warm_up_workers",
 ]
@@ -0,0 +1,29 @@
+import asyncio
+import weakref
+from typing import Callable, Generic, TypeVar
+
+
+T = TypeVar("T")
+
+
+# Lazily creates one object per running event loop
+# Async clients (aiohttp sessions, redis.asyncio pools) are bound to the loop
+# that created them, so they can't be shared between loops like a plain singleton
+class LoopLocal(Generic[T]):
+    def __init__(self, factory: Callable[[], T]):
+        self.__factory = factory
+        # Entries go away together with their event loop
+        self.__instances = weakref.WeakKeyDictionary()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        instance = self.__instances.get(loop)
+        if instance is None:
+            instance = self.__factory()
+            self.__instances[loop] = instance
+        return instance
+
+
+__all__ = [
+    "LoopLocal",
+]
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+
+# Thread-safe in-memory cache with per-entry TTL and LRU eviction
+# Bounded both by the number of entries and by the total size of the entries,
+# the size of an entry is given by the caller (e.g. the length of its encoded value)
+class TTLLRUCache:
+    def __init__(self, max_items: int, max_bytes: int):
+        self.__max_items = max_items
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        self.__entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.__size = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def size(self):
+        return self.__size
+
+    # Return the value or None if the key is missing or expired
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self.__pop(key)
+                return None
+            self.__entries.move_to_end(key)  # Mark as most recently used
+            return entry.value
+
+    # Store a value for `ttl` seconds, evicting the least recently used entries
+    # Values larger than the whole budget are not stored
+    def set(self, key: Hashable, value: Any, size: int, ttl: float):
+        if ttl <= 0 or size > self.__max_bytes:
+            return
+        with self.__lock:
+            self.__pop(key)
+            self.__entries[key] = _Entry(value, size, time.monotonic() + ttl)
+            self.__size += size
+            while (
+                len(self.__entries) > self.__max_items or self.__size > self.__max_bytes
+            ):
+                self.__pop(next(iter(self.__entries)))
+
+    def delete(self, key: Hashable):
+        with self.__lock:
+            self.__pop(key)
+
+    # Drop every entry (optional: only string keys with specific prefix)
+    def clear(self, prefix: Optional[str] = None):
+        with self.__lock:
+            if prefix is None:
+                self.__entries.clear()
+                self.__size = 0
+                return
+            for key in [
+                key
+                for key in self.__entries
+                if isinstance(key, str) and key.startswith(prefix)
+            ]:
+                self.__pop(key)
+
+    def __pop(self, key: Hashable):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__size -= entry.size
+
+
+__all__ = [
+    "TTLLRUCache",
+]
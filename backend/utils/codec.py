@@ -0,0 +1,60 @@
+import bz2
+import lzma
+import zlib
+from typing import Callable, Dict, NamedTuple
+
+
+class Codec(NamedTuple):
+    name: str
+    header: bytes  # Single byte written in front of every payload
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _identity(data: bytes):
+    return data
+
+
+# Registered codecs, a header byte must never be reused for another format.
+# Header bytes are control characters, so they can't be confused with legacy
+# entries stored as plain JSON text (which start with "[", "{", a digit, ...)
+CODECS: Dict[str, Codec] = {
+    codec.name: codec
+    for codec in (
+        Codec("json", b"\x01", _identity, _identity),
+        Codec("zlib", b"\x02", lambda data: zlib.compress(data, 6), zlib.decompress),
+        Codec(
+            "lzma",
+            b"\x03",
+            lambda data: lzma.compress(data, preset=1),
+            lzma.decompress,
+        ),
+        Codec("bz2", b"\x04", bz2.compress, bz2.decompress),
+    )
+}
+_CODECS_BY_HEADER: Dict[int, Codec] = {
+    codec.header[0]: codec for codec in CODECS.values()
+}
+
+
+# Compress the data with the named codec and prefix it with the codec header
+def encode(data: bytes, codec_name: str) -> bytes:
+    codec = CODECS[codec_name]
+    return codec.header + codec.compress(data)
+
+
+# Restore the data whatever codec it was encoded with
+# Payloads without a known header are legacy entries and are returned as they are
+def decode(payload: bytes) -> bytes:
+    codec = _CODECS_BY_HEADER.get(payload[0]) if payload else None
+    if codec is None:
+        return payload
+    return codec.decompress(payload[1:])
+
+
+__all__ = [
+    "CODECS",
+    "Codec",
+    "decode",
+    "encode",
+]
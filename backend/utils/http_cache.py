@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import re
+from typing import Optional
+
+from config import Config
+
+from .abs import AbstractGlobalInstance
+from .cache import TTLLRUCache
+
+# An entity tag of an If-None-Match header, weak or strong
+_ENTITY_TAG = re.compile(r'(?:W/)?"[^"]*"')
+GZIP_ETAG_SUFFIX = "-gzip"  # The gzip representation of a body has its own ETag
+
+
+# Strong ETag of a response body, the same bytes always get the same ETag
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+# ETag of the gzip representation of the body tagged `etag`
+def gzip_etag(etag: str) -> str:
+    return f'{etag[:-1]}{GZIP_ETAG_SUFFIX}"'
+
+
+# Whether an If-None-Match header holds `etag`, so the client's copy is current
+# The comparison is weak, as RFC 9110 asks for If-None-Match
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.removeprefix("W/") == etag for tag in _ENTITY_TAG.findall(if_none_match)
+    )
+
+
+# Whether an Accept-Encoding header accepts gzip (a zero quality refuses it)
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip().removeprefix("q=").strip()
+        try:
+            return not quality or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+# Cache-Control of a response cached for `ttl_ms` more milliseconds (PTTL), the last
+# `stale_ttl` seconds of which it is served stale while it is refreshed
+# Without a TTL the response must be revalidated every time, with its ETag
+def cache_control(ttl_ms: Optional[int], stale_ttl: int) -> str:
+    if ttl_ms is None:
+        return "no-cache"
+    ttl = ttl_ms // 1000
+    return (
+        f"public, max-age={max(ttl - stale_ttl, 0)}, "
+        f"stale-while-revalidate={min(ttl, stale_ttl)}"
+    )
+
+
+class GzipBodyCache(AbstractGlobalInstance):
+    # Per-worker cache of gzip-compressed response bodies, by ETag
+    # An ETag names the bytes of a body, so an entry can't get outdated: a popular
+    # response is compressed once per version instead of once per request
+    def __init__(self):
+        self.__cache = TTLLRUCache(
+            max_items=Config.HTTP_GZIP_CACHE_MAX_ITEMS,
+            max_bytes=Config.HTTP_GZIP_CACHE_MAX_BYTES,
+        )
+
+    def compress(self, etag: str, body: bytes) -> bytes:
+        compressed = self.__cache.get(etag)
+        if compressed is None:
+            # No timestamp in the header, the same body always gets the same bytes
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+            self.__cache.set(
+                etag, compressed, len(compressed), Config.HTTP_GZIP_CACHE_TTL
+            )
+        return compressed
+
+
+__all__ = [
+    "GzipBodyCache",
+    "accepts_gzip",
+    "body_etag",
+    "cache_control",
+    "etag_matches",
+    "gzip_etag",
+]
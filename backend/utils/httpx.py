@@ -1,6 +1,8 @@
+import inspect
 from functools import wraps
-from typing import Callable
+from typing import Callable, Tuple, Type
 
+from django.http import JsonResponse
 from pydantic_core import (
     ValidationError,
 )  # Used to catch validation errors from Pydantic
@@ -10,70 +12,87 @@ from config import Config
 from utils.exceptions import MaxRetryExceedException  # Custom exception for retry limit
 
 
-# Decorator to handle Pydantic validation errors and return them in the API response
-def pydantic_exception_handler(status=400):
+# Build the error response for the decorated view
+# Async views are plain Django views, a DRF Response can only be rendered by an APIView
+def error_response(data, status, is_async=False):
+    if is_async:
+        return JsonResponse(data, status=status)
+    return Response(data, status=status)
+
+
+# Wrap a sync or async view, turning the given exceptions into an error response
+# `handler` receives the exception and returns the response data
+def exception_handler(
+    exception_types: Tuple[Type[Exception], ...],
+    handler: Callable[[Exception], dict],
+    status: int,
+):
     def real_decorator(func: Callable):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except exception_types as e:
+                    return error_response(handler(e), status, is_async=True)
+
+            return async_wrapper
+
         @wraps(func)  # Preserve original function signature and attributes
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)  # Execute the wrapped function
-            except ValidationError as e:  # Catch Pydantic validation errors
-                errors = {}
-                # Loop through the validation errors to collect field-specific messages
-                for validation_error in e.errors():
-                    # Extract error message and assign to the field name (location)
-                    errors[validation_error["loc"][0]] = validation_error["msg"]
-                # Return error response with the validation error details and HTTP 400 status
-                return Response(errors, status=status)
+            except exception_types as e:
+                return error_response(handler(e), status)
 
         return wrapper
 
     return real_decorator
 
 
+# Field-specific messages of a Pydantic validation error, by field name
+def validation_errors(e: ValidationError) -> dict:
+    errors = {}
+    # Loop through the validation errors to collect field-specific messages
+    for validation_error in e.errors():
+        # Extract error message and assign to the field name (location)
+        # Errors about the whole body (e.g. invalid JSON) have no location
+        location = validation_error["loc"]
+        field = location[0] if location else "non_field_errors"
+        errors[field] = validation_error["msg"]
+    return errors
+
+
+# Decorator to handle Pydantic validation errors and return them in the API response
+def pydantic_exception_handler(status=400):
+    # Return error response with the validation error details and HTTP 400 status
+    return exception_handler((ValidationError,), validation_errors, status)
+
+
 # Decorator to handle the custom MaxRetryExceedException and return a 429 status
 def max_retry_exceed_exception_handler(status=429):
-    def real_decorator(func: Callable):
-        @wraps(func)  # Preserve original function signature and attributes
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)  # Execute the wrapped function
-            except MaxRetryExceedException:
-                # Return a 429 response indicating that the user should try again later
-                return Response(
-                    {
-                        "error": "Try again after a while",  # User-friendly error message
-                    },
-                    status=status,  # HTTP status 429 (Too Many Requests)
-                )
+    def handler(e: MaxRetryExceedException):
+        # Return a 429 response indicating that the user should try again later
+        return {
+            "error": "Try again after a while",  # User-friendly error message
+        }
 
-        return wrapper
-
-    return real_decorator
+    return exception_handler((MaxRetryExceedException,), handler, status)
 
 
 def unknow_exception_handler(status=500):
-    def real_decorator(func: Callable):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                white_box_error_description = str(e)
-                black_box_error_description = "Unknown exception occured. "
-                "Please enables dev stage to see"
-                description = (
-                    white_box_error_description
-                    if Config.DEV_STAGE
-                    else black_box_error_description
-                )
-                return Response(
-                    {
-                        "error": description,
-                    },
-                    status=status,
-                )
+    def handler(e: Exception):
+        white_box_error_description = str(e)
+        black_box_error_description = "Unknown exception occured. "
+        "Please enables dev stage to see"
+        description = (
+            white_box_error_description
+            if Config.DEV_STAGE
+            else black_box_error_description
+        )
+        return {
+            "error": description,
+        }
 
-        return wrapper
-
-    return real_decorator
+    return exception_handler((Exception,), handler, status)
@@ -0,0 +1,315 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import redis
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+from asgiref.sync import iscoroutinefunction
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Samples of every worker, by metric and sample (e.g. 'name|name{type="repo"}')
+METRICS_REDIS_KEY = "MOLYNEUX_METRICS"
+# Histogram buckets of durations (seconds) and of sizes (bytes, 1 KiB to 16 MiB)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(1024 * 4**power for power in range(8))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _labels_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+# Samples in exposition order: by labels, then the buckets of a histogram by bound
+def _sample_order(sample: str):
+    head, _, bound = sample.partition('le="')
+    if not bound:
+        return sample, 0.0
+    return head, float(bound.split('"', 1)[0])  # float("+Inf") is infinite
+
+
+class Metric(ABC):
+    # Metric of the process, its samples are counted in memory and added to the samples
+    # of every worker when the registry flushes them
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._pending: Dict[Labels, object] = {}  # Counted since the last flush
+        self._registry = registry or REGISTRY
+        self._registry.register(self)
+
+    # Take the values counted since the last flush
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    # Count again values taken by a flush that failed
+    @abstractmethod
+    def _restore(self, pending):
+        pass
+
+    # Samples of taken values, by sample name and labels
+    @abstractmethod
+    def _samples(self, pending) -> Dict[str, float]:
+        pass
+
+    # A forked worker must not flush what its parent counted, nor wait on its lock
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+        self._registry.start()
+
+    def _restore(self, pending):
+        for key, value in pending.items():
+            with self._lock:
+                self._pending[key] = self._pending.get(key, 0) + value
+
+    def _samples(self, pending):
+        return {
+            f"{self.name}{_format_labels(dict(key))}": value
+            for key, value in pending.items()
+        }
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry=None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, registry)
+
+    # Count by bucket (not cumulative, the last bucket is +Inf) followed by the sum
+    def observe(self, value: float, **labels):
+        key = _labels_key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # Bounds are inclusive
+        with self._lock:
+            counts = self._pending.get(key)
+            if counts is None:
+                counts = self._pending[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+        self._registry.start()
+
+    # Observe the duration of the block (seconds)
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _restore(self, pending):
+        for key, counts in pending.items():
+            with self._lock:
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = counts
+                else:
+                    self._pending[key] = [a + b for a, b in zip(current, counts)]
+
+    def _samples(self, pending):
+        samples = {}
+        for key, counts in pending.items():
+            labels = dict(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": str(bound)})
+                samples[f"{self.name}_bucket{bucket_labels}"] = cumulative
+            samples[f"{self.name}_sum{_format_labels(labels)}"] = counts[-1]
+            samples[f"{self.name}_count{_format_labels(labels)}"] = cumulative
+        return samples
+
+
+class MetricsRegistry:
+    # Metrics of the process. Counting only touches memory; a background thread adds
+    # what was counted to a Redis hash every METRICS_FLUSH_INTERVAL seconds, so the
+    # hash holds the samples of every worker and any worker can expose them all.
+    # Redis isn't touched until something is counted
+    def __init__(self):
+        self.__metrics: Dict[str, Metric] = {}
+        self.__redis_client: Optional[redis.Redis] = None
+        self.__flusher: Optional[threading.Thread] = None
+        self.__lock = threading.Lock()
+        os.register_at_fork(after_in_child=self.__after_fork)
+
+    def register(self, metric: Metric):
+        if metric.name in self.__metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.__metrics[metric.name] = metric
+
+    # Start flushing in the background, once per process
+    def start(self):
+        if self.__flusher is not None:
+            return
+        with self.__lock:
+            if self.__flusher is None:
+                self.__flusher = threading.Thread(
+                    target=self.__flush_forever, name="metrics-flush", daemon=True
+                )
+                self.__flusher.start()
+
+    # Add what this worker counted since the last flush to the shared samples
+    # All of it or nothing is added (MULTI), what failed is counted again next time
+    def flush(self):
+        taken = [(metric, metric._take()) for metric in self.__metrics.values()]
+        taken = [(metric, pending) for metric, pending in taken if pending]
+        if not taken:
+            return
+        pipeline = self.__client().pipeline()
+        for metric, pending in taken:
+            for sample, value in metric._samples(pending).items():
+                pipeline.hincrbyfloat(
+                    METRICS_REDIS_KEY, f"{metric.name}|{sample}", value
+                )
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            for metric, pending in taken:
+                metric._restore(pending)
+            raise
+
+    # Samples of every worker in the Prometheus text format
+    def render(self) -> str:
+        self.flush()  # Include what this worker just counted
+        samples: Dict[str, List[Tuple[str, str]]] = {}
+        for field, value in self.__client().hgetall(METRICS_REDIS_KEY).items():
+            name, _, sample = field.decode().partition("|")
+            samples.setdefault(name, []).append((sample, value.decode()))
+
+        lines = []
+        for name, metric in sorted(self.__metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            for sample, value in sorted(
+                samples.get(name, []), key=lambda item: _sample_order(item[0])
+            ):
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Start counting from zero in every worker
+    def reset(self):
+        for metric in self.__metrics.values():
+            metric._take()
+        self.__client().delete(METRICS_REDIS_KEY)
+
+    def __client(self):
+        if self.__redis_client is None:
+            self.__redis_client = redis.Redis.from_url(Config.REDIS_CONNECTION_URL)
+        return self.__redis_client
+
+    def __flush_forever(self):
+        while True:
+            time.sleep(Config.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:  # Kept and flushed with the next samples
+                logger.warning("Failed to flush metrics: %r", e)
+
+    # Threads don't survive a fork, and the child starts with nothing counted
+    def __after_fork(self):
+        self.__lock = threading.Lock()
+        self.__flusher = None
+        self.__redis_client = None
+        for metric in self.__metrics.values():
+            metric._after_fork()
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Duration of the API requests, by view"
+)
+HTTP_RESPONSES = Counter(
+    "http_responses_total", "API responses, by view, method and status"
+)
+
+
+# Time every request and count the responses by status
+# Requests are labelled by view (URL name), never by path, to bound the samples
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    def record(request, response, started):
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, view=view)
+        HTTP_RESPONSES.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            started = time.perf_counter()
+            response = await get_response(request)
+            record(request, response, started)
+            return response
+
+        return async_middleware
+
+    def middleware(request):
+        started = time.perf_counter()
+        response = get_response(request)
+        record(request, response, started)
+        return response
+
+    return middleware
+
+
+# Prometheus endpoint, the samples of every worker
+def metrics_view(request):
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "REGISTRY",
+    "SIZE_BUCKETS",
+    "metrics_middleware",
+    "metrics_view",
+]
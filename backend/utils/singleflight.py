@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from .aio import LoopLocal
+
+
+T = TypeVar("T")
+
+
+# Coalesce concurrent calls for the same key within the process
+# The first caller runs the function, later callers wait for its result (or exception)
+class SingleFlight:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[..., T], *args, **kwargs) -> T:
+        with self.__lock:
+            call = self.__calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = Future()
+                self.__calls[key] = call
+
+        if not is_leader:
+            return call.result()  # Wait for the in-flight call
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+
+# Asyncio counterpart of SingleFlight, calls are coalesced per event loop
+class AsyncSingleFlight:
+    def __init__(self):
+        self.__calls = LoopLocal(dict)
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Awaitable[T]], *args, **kwargs
+    ) -> T:
+        calls: Dict[Hashable, asyncio.Future] = self.__calls.get()
+        call = calls.get(key)
+        if call is not None:
+            return await asyncio.shield(call)  # Wait for the in-flight call
+
+        call = asyncio.ensure_future(func(*args, **kwargs))
+        calls[key] = call
+
+        # Forget the call once it's done, unless a newer call took its place
+        def forget(_):
+            if calls.get(key) is call:
+                del calls[key]
+
+        call.add_done_callback(forget)
+        # Shield the shared call, a cancelled caller must not cancel the waiters
+        return await asyncio.shield(call)
+
+
+__all__ = [
+    "AsyncSingleFlight",
+    "SingleFlight",
+]
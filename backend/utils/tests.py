@@ -0,0 +1,435 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import redis
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from config import Config
+
+from . import codec, http_cache
+from .abs import (
+    AbstractGlobalInstance,
+    SingletonABCMeta,
+    warm_up_middleware,
+    warm_up_process,
+    warm_up_workers,
+)
+from .cache import TTLLRUCache
+from .metrics import METRICS_REDIS_KEY, Counter, Histogram, Metric, MetricsRegistry
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .timing import (
+    PROFILE_FILE_HEADER,
+    ContextThreadPoolExecutor,
+    profiling_middleware,
+    server_timing_middleware,
+    span,
+)
+
+
+class SingleFlightTestCase(TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        func = MagicMock(return_value="result")
+
+        def slow_func():
+            started.set()
+            release.wait(timeout=5)
+            return func()
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(single_flight.do, "key", slow_func)
+            started.wait(timeout=5)
+            followers = [
+                executor.submit(single_flight.do, "key", slow_func) for _ in range(4)
+            ]
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        self.assertEqual(results, ["result"] * 5)
+        func.assert_called_once()
+
+    def test_exception_is_shared_and_key_is_released(self):
+        single_flight = SingleFlight()
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", MagicMock(side_effect=ValueError()))
+
+        # The failed call is forgotten, the next call runs again
+        self.assertEqual(single_flight.do("key", lambda: "retried"), "retried")
+
+
+class AsyncSingleFlightTestCase(TestCase):
+
+    async def test_concurrent_calls_share_one_execution(self):
+        single_flight = AsyncSingleFlight()
+        func = MagicMock(return_value="result")
+
+        async def slow_func():
+            await asyncio.sleep(0.01)
+            return func()
+
+        results = await asyncio.gather(
+            *(single_flight.do("key", slow_func) for _ in range(5))
+        )
+
+        self.assertEqual(results, ["result"] * 5)
+        func.assert_called_once()
+        # Finished calls are forgotten
+        self.assertEqual(await single_flight.do("key", slow_func), "result")
+        self.assertEqual(func.call_count, 2)
+
+
+class TTLLRUCacheTestCase(TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLLRUCache(max_items=2, max_bytes=100)
+        cache.set("a", 1, size=1, ttl=60)
+        cache.set("b", 2, size=1, ttl=60)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.set("c", 3, size=1, ttl=60)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_byte_budget(self):
+        cache = TTLLRUCache(max_items=10, max_bytes=10)
+        cache.set("a", 1, size=6, ttl=60)
+        cache.set("b", 2, size=6, ttl=60)
+        cache.set("too_large", 3, size=11, ttl=60)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertIsNone(cache.get("too_large"))
+        self.assertEqual(cache.size, 6)
+
+    @patch("time.monotonic")
+    def test_expired_entry_is_dropped(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = TTLLRUCache(max_items=10, max_bytes=10)
+        cache.set("a", 1, size=1, ttl=5)
+
+        mock_monotonic.return_value = 105
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_clear_with_prefix(self):
+        cache = TTLLRUCache(max_items=10, max_bytes=10)
+        cache.set("repo|a", 1, size=1, ttl=60)
+        cache.set("user|a", 2, size=1, ttl=60)
+        cache.clear("repo|")
+
+        self.assertIsNone(cache.get("repo|a"))
+        self.assertEqual(cache.get("user|a"), 2)
+
+
+class CodecTestCase(TestCase):
+    data = b'[{"url": "https://api.github.com/repos/django/django"}]' * 20
+
+    def test_round_trip(self):
+        for codec_name, selected_codec in codec.CODECS.items():
+            with self.subTest(codec=codec_name):
+                payload = codec.encode(self.data, codec_name)
+
+                self.assertEqual(payload[:1], selected_codec.header)
+                self.assertEqual(codec.decode(payload), self.data)
+
+    def test_headers_are_unique(self):
+        headers = [selected_codec.header for selected_codec in codec.CODECS.values()]
+        self.assertEqual(len(headers), len(set(headers)))
+
+    def test_legacy_payload_is_returned_as_is(self):
+        self.assertEqual(codec.decode(self.data), self.data)
+
+
+class HttpCacheTestCase(TestCase):
+
+    def test_etag_matches(self):
+        etag = http_cache.body_etag(b"[]")
+
+        self.assertEqual(etag, http_cache.body_etag(b"[]"))
+        self.assertNotEqual(etag, http_cache.body_etag(b"[1]"))
+        self.assertTrue(http_cache.etag_matches(etag, etag))
+        self.assertTrue(http_cache.etag_matches(f'"a", W/{etag}', etag))
+        self.assertTrue(http_cache.etag_matches("*", etag))
+        self.assertFalse(http_cache.etag_matches('"a"', etag))
+        self.assertFalse(http_cache.etag_matches(None, etag))
+        self.assertFalse(
+            http_cache.etag_matches(etag, http_cache.gzip_etag(etag))
+        )  # Another representation
+
+    def test_accepts_gzip(self):
+        for accept_encoding, accepted in (
+            ("gzip, deflate, br", True),
+            ("br;q=1.0, GZIP;q=0.5", True),
+            ("*", True),
+            ("gzip;q=0", False),
+            ("deflate", False),
+            (None, False),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(http_cache.accepts_gzip(accept_encoding), accepted)
+
+    def test_cache_control_follows_ttl(self):
+        self.assertEqual(
+            http_cache.cache_control(5400 * 1000 + 999, 1800),
+            "public, max-age=3600, stale-while-revalidate=1800",
+        )
+        self.assertEqual(
+            http_cache.cache_control(60 * 1000, 1800),
+            "public, max-age=0, stale-while-revalidate=60",
+        )
+        self.assertEqual(http_cache.cache_control(None, 1800), "no-cache")
+
+
+class MetricsRegistryTestCase(TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        # Nothing is flushed in the background during a test
+        patcher = patch.object(self.registry, "start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requests = Counter("requests_total", "Requests", registry=self.registry)
+        self.latency = Histogram(
+            "latency_seconds", "Latency", buckets=(0.1, 1), registry=self.registry
+        )
+
+    @patch("redis.Redis.from_url")
+    def test_flush_adds_samples_counted_since_last_flush(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        self.requests.inc(type="repo")
+        self.requests.inc(2, type="repo")
+        self.latency.observe(0.5, view="search")
+        self.latency.observe(0.1, view="search")
+
+        self.registry.flush()
+
+        self.assertEqual(
+            {
+                call.args[1]: call.args[2]
+                for call in pipeline.hincrbyfloat.call_args_list
+            },
+            {
+                'requests_total|requests_total{type="repo"}': 3,
+                'latency_seconds|latency_seconds_bucket{view="search",le="0.1"}': 1,
+                'latency_seconds|latency_seconds_bucket{view="search",le="1"}': 2,
+                'latency_seconds|latency_seconds_bucket{view="search",le="+Inf"}': 2,
+                'latency_seconds|latency_seconds_sum{view="search"}': 0.6,
+                'latency_seconds|latency_seconds_count{view="search"}': 2,
+            },
+        )
+        pipeline.execute.assert_called_once()
+
+        pipeline.reset_mock()
+        self.registry.flush()  # Nothing new
+        pipeline.execute.assert_not_called()
+
+    @patch("redis.Redis.from_url")
+    def test_failed_flush_is_counted_again(self, mock_redis):
+        pipeline = mock_redis.return_value.pipeline.return_value
+        pipeline.execute.side_effect = redis.ConnectionError()
+        self.requests.inc(type="repo")
+
+        with self.assertRaises(redis.ConnectionError):
+            self.registry.flush()
+        self.requests.inc(type="repo")
+        pipeline.execute.side_effect = None
+        pipeline.hincrbyfloat.reset_mock()
+        self.registry.flush()
+
+        pipeline.hincrbyfloat.assert_called_once_with(
+            METRICS_REDIS_KEY, 'requests_total|requests_total{type="repo"}', 2
+        )
+
+    @patch("redis.Redis.from_url")
+    def test_render_samples_of_every_worker(self, mock_redis):
+        mock_redis.return_value.hgetall.return_value = {
+            b'latency_seconds|latency_seconds_bucket{le="+Inf"}': b"4",
+            b'latency_seconds|latency_seconds_bucket{le="1"}': b"3",
+            b'latency_seconds|latency_seconds_bucket{le="0.1"}': b"1",
+            b"latency_seconds|latency_seconds_count": b"4",
+            b"latency_seconds|latency_seconds_sum": b"2.5",
+            b'requests_total|requests_total{type="repo"}': b"7",
+        }
+
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP latency_seconds Latency\n"
+            "# TYPE latency_seconds histogram\n"
+            'latency_seconds_bucket{le="0.1"} 1\n'
+            'latency_seconds_bucket{le="1"} 3\n'
+            'latency_seconds_bucket{le="+Inf"} 4\n'
+            "latency_seconds_count 4\n"
+            "latency_seconds_sum 2.5\n"
+            "# HELP requests_total Requests\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{type="repo"} 7\n',
+        )
+
+    def test_label_values_are_escaped(self):
+        self.requests.inc(keyword='say "hi"\\')
+
+        self.assertEqual(
+            self.requests._samples(self.requests._take()),
+            {'requests_total{keyword="say \\"hi\\"\\\\"}': 1},
+        )
+
+    def test_metric_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            Counter("requests_total", "Requests", registry=self.registry)
+
+    def test_metric_must_flush_its_values(self):
+        class Gauge(Metric):
+            def _samples(self, pending):
+                return {}
+
+        with self.assertRaises(TypeError):  # No _restore
+            Gauge("temperature", "Temperature", registry=self.registry)
+
+
+class ServerTimingTestCase(TestCase):
+
+    def test_spans_are_summed_by_stage(self):
+        executor = ContextThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+
+        def fetch_page():
+            with span("github"):
+                pass
+
+        def view(request):
+            with span("redis"):
+                pass
+            # Spans of the pool's threads count for the request that submitted them
+            for future in [executor.submit(fetch_page) for _ in range(3)]:
+                future.result()
+            return HttpResponse()
+
+        response = server_timing_middleware(view)(RequestFactory().get("/"))
+
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^redis;dur=[\d.]+, github;dur=[\d.]+;desc="3 spans", total;dur=[\d.]+$',
+        )
+
+    def test_spans_outside_a_request_are_ignored(self):
+        with span("redis"):  # Not in a request, nothing to add it to
+            pass
+
+        response = server_timing_middleware(lambda request: HttpResponse())(
+            RequestFactory().get("/")
+        )
+
+        self.assertRegex(response["Server-Timing"], r"^total;dur=[\d.]+$")
+
+
+class ProfilingTestCase(TestCase):
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.profile_dir = profile_dir.name
+        for name, value in (
+            ("PROFILE_DIR", self.profile_dir),
+            ("PROFILE_TOKEN", "secret"),
+            ("PROFILE_SAMPLE_RATE", 0),
+        ):
+            patcher = patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.middleware = profiling_middleware(lambda request: HttpResponse())
+
+    def test_request_with_token_is_profiled(self):
+        response = self.middleware(RequestFactory().get("/", HTTP_X_PROFILE="secret"))
+
+        self.assertEqual(os.listdir(self.profile_dir), [response[PROFILE_FILE_HEADER]])
+
+    def test_request_without_token_is_not_profiled(self):
+        for headers in ({}, {"HTTP_X_PROFILE": "guess"}):
+            response = self.middleware(RequestFactory().get("/", **headers))
+
+            self.assertNotIn(PROFILE_FILE_HEADER, response)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_requests_are_sampled(self):
+        with patch.object(Config, "PROFILE_SAMPLE_RATE", 1):
+            response = self.middleware(RequestFactory().get("/"))
+
+        self.assertIn(PROFILE_FILE_HEADER, response)
+
+
+class SingletonTestCase(TestCase):
+
+    @patch.object(SingletonABCMeta, "_instances", {})
+    def test_concurrent_calls_build_one_instance(self):
+        built = []
+        barrier = threading.Barrier(8)
+
+        class Service(AbstractGlobalInstance):
+            def __init__(self):
+                built.append(self)
+                time.sleep(0.05)  # Others call while it is being built
+
+        def create():
+            barrier.wait()
+            return Service()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            instances = list(executor.map(lambda _: create(), range(8)))
+
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(instance is built[0] for instance in instances))
+
+    @patch.object(SingletonABCMeta, "_inherited", [])
+    @patch.object(SingletonABCMeta, "_instances", {})
+    def test_forked_process_builds_its_own_instances(self):
+        class Service(AbstractGlobalInstance):
+            pass
+
+        parent_instance = Service()
+        SingletonABCMeta._after_fork()  # As in a forked child
+
+        self.assertIsNot(Service(), parent_instance)
+        self.assertIs(Service(), Service())
+        self.assertIn(parent_instance, SingletonABCMeta._inherited)
+
+    @patch("utils.abs._warm_ups", [])
+    @patch("os.register_at_fork")
+    def test_warm_up_runs_now_and_in_forked_workers(self, mock_register_at_fork):
+        warm_up = MagicMock(__name__="warm_up", side_effect=[ConnectionError(), None])
+
+        with self.assertLogs("utils.abs", level="WARNING"):
+            warm_up_workers(warm_up)  # A failure doesn't stop the boot
+        warm_up_process()  # Already warmed up
+        mock_register_at_fork.assert_not_called()  # Forking does no I/O
+
+        with patch("os.getpid", return_value=-1):  # A worker forked from the app
+            warm_up_process()
+            warm_up_process()
+
+        self.assertEqual(warm_up.call_count, 2)
+
+    @patch("utils.abs._warm_ups", [])
+    def test_forked_worker_warms_up_in_background_on_first_request(self):
+        warmed_up = threading.Event()
+        warm_up = MagicMock(__name__="warm_up")
+        warm_up_workers(warm_up)
+        warm_up.side_effect = warmed_up.set
+        view = warm_up_middleware(lambda request: HttpResponse())
+
+        with patch("os.getpid", return_value=-1):
+            view(RequestFactory().get("/"))
+            self.assertTrue(warmed_up.wait(timeout=5))
+            view(RequestFactory().get("/"))
+
+        self.assertEqual(warm_up.call_count, 2)
@@ -0,0 +1,169 @@
+import contextvars
+import cProfile
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from django.utils.decorators import sync_and_async_middleware
+from asgiref.sync import iscoroutinefunction
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"  # Holding PROFILE_TOKEN, profiles the request
+PROFILE_FILE_HEADER = "X-Profile-File"  # Name of the profile of the response
+
+
+class RequestTimings:
+    # Time spent by a request in each stage (e.g. redis, github), summed over the
+    # spans of the stage. Spans of threads working for the request add up, so a
+    # stage can take longer than the request when its spans ran in parallel
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__stages: Dict[str, List[float]] = {}  # Seconds and count, by stage
+
+    def add(self, stage: str, seconds: float):
+        with self.__lock:
+            timing = self.__stages.setdefault(stage, [0.0, 0])
+            timing[0] += seconds
+            timing[1] += 1
+
+    # Server-Timing header value, the stages in the order they started
+    def header(self, total: float) -> str:
+        with self.__lock:
+            stages = [(stage, *timing) for stage, timing in self.__stages.items()]
+        metrics = [
+            f"{stage};dur={seconds * 1000:.1f}"
+            + (f';desc="{count} spans"' if count > 1 else "")
+            for stage, seconds, count in stages
+        ]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+# Timings of the request being handled, None outside of a request
+_REQUEST_TIMINGS: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+# Time the block as a span of `stage` of the current request, if any
+@contextmanager
+def span(stage: str):
+    timings = _REQUEST_TIMINGS.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - started)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    # Thread pool running every task in the context of the caller that submitted it,
+    # so the spans of a task are added to the timings of the request it works for
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# Report the time spent in each stage of the request in a Server-Timing header
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    if not Config.SERVER_TIMING_ENABLED:
+        return get_response
+
+    def add_header(response, timings, started):
+        response["Server-Timing"] = timings.header(time.perf_counter() - started)
+
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            timings = RequestTimings()
+            token = _REQUEST_TIMINGS.set(timings)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _REQUEST_TIMINGS.reset(token)
+            add_header(response, timings, started)
+            return response
+
+        return async_middleware
+
+    def middleware(request):
+        timings = RequestTimings()
+        token = _REQUEST_TIMINGS.set(timings)
+        started = time.perf_counter()
+        try:
+            response = get_response(request)
+        finally:
+            _REQUEST_TIMINGS.reset(token)
+        add_header(response, timings, started)
+        return response
+
+    return middleware
+
+
+# One profile at a time: a thread's profile would otherwise catch the others' calls
+# on Python versions that profile every thread at once
+_profile_lock = threading.Lock()
+
+
+# Whether to profile a request: sampled with PROFILE_SAMPLE_RATE, or asked for with
+# the PROFILE_HEADER holding PROFILE_TOKEN (no restart needed to profile a request)
+def should_profile(request) -> bool:
+    token = request.headers.get(PROFILE_HEADER)
+    if token and Config.PROFILE_TOKEN:
+        return hmac.compare_digest(token, Config.PROFILE_TOKEN)
+    return random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+# Profile chosen requests with cProfile, dumped in PROFILE_DIR (see pstats/snakeviz)
+# Only the calls of the request thread are profiled, not the pages fetched in the
+# pool. Async requests are never profiled, their coroutines share the event loop
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        return get_response
+
+    def middleware(request):
+        if not should_profile(request) or not _profile_lock.acquire(blocking=False):
+            return get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            response = profiler.runcall(get_response, request)
+        finally:
+            _profile_lock.release()
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        filename = f"{time.time_ns()}-{os.getpid()}-{view.replace(':', '.')}.prof"
+        try:
+            os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(Config.PROFILE_DIR, filename))
+        except OSError as e:
+            logger.warning("Failed to write profile %s: %r", filename, e)
+        else:
+            response[PROFILE_FILE_HEADER] = filename
+        return response
+
+    return middleware
+
+
+__all__ = [
+    "ContextThreadPoolExecutor",
+    "RequestTimings",
+    "profiling_middleware",
+    "server_timing_middleware",
+    "span",
+]
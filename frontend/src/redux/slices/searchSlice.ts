@@ -40,6 +40,8 @@ export const fetchGitHubResults = createAsyncThunk(
       {
         type: type,
         keyword: keyword,
+        // Only the fields rendered by the result cards
+        profile: "card",
       },
     );
     dispatch(storeCache(response.data));